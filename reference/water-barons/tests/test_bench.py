@@ -0,0 +1,21 @@
+import unittest
+
+from water_barons.bench import bench_copy, bench_save, format_results, format_save_results, midgame
+
+
+class TestBench(unittest.TestCase):
+    def test_bench_copy_reports_each_method(self):
+        results = bench_copy(midgame(rounds=2, seed=1, num_players=2), repeat=3)
+        self.assertEqual(set(results), {'fork', 'fork_nolog', 'pickle'})
+        self.assertTrue(all(seconds > 0 for seconds in results.values()))
+        self.assertIn("vs pickle", format_results(results))
+
+    def test_bench_save_reports_time_and_size(self):
+        results = bench_save(midgame(rounds=2, seed=1, num_players=2), repeat=2)
+        self.assertEqual(set(results), {'pickle', 'pickle_zlib', 'binary', 'binary_zlib'})
+        self.assertLess(results['binary_zlib'][1], results['pickle'][1])
+        self.assertIn("of the size of pickle", format_save_results(results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,3 +38,18 @@ class TestCardLoading(unittest.TestCase):
 
         importlib.reload(cards)
         os.remove(tmp_path)
+
+    def test_card_ids_are_stable_and_shared_by_copies(self):
+        import water_barons.cards as cards
+        definitions = cards.card_definitions()
+        self.assertEqual([c.card_id for c in definitions], list(range(len(definitions))))
+        self.assertEqual(len(cards.CARD_IDS), len(definitions))
+        for card in cards.get_all_whim_cards():
+            self.assertEqual(card.card_id, cards.CARD_IDS[(card.card_type, card.name)])
+        importlib.reload(cards)
+        self.assertEqual([c.card_id for c in cards.card_definitions()], [c.card_id for c in definitions])
+        self.assertEqual([c.name for c in cards.card_definitions()], [c.name for c in definitions])
+
+
+if __name__ == '__main__':
+    unittest.main()
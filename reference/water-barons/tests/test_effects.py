@@ -0,0 +1,96 @@
+import os
+import importlib
+import textwrap
+import unittest
+from tempfile import NamedTemporaryFile
+from unittest.mock import patch
+
+from water_barons.effects import (
+    EffectError, compile_upgrade_effect, compile_whim_pre_effect, compile_whim_fallout,
+    ReduceImpactPerFlow, ReduceFacilityImpactType, AllSegmentsShift, DemandShift,
+    GlobalImpact, PlayerEffect, NO_EFFECT,
+)
+from water_barons.game_entities import TrackColor, UpgradeCard, WhimCard
+from water_barons.game_logic import GameLogic
+from water_barons.cards import get_all_upgrade_cards, get_all_whim_cards
+
+
+class TestEffectCompilation(unittest.TestCase):
+    def test_upgrade_effects(self):
+        self.assertEqual(
+            compile_upgrade_effect("Apply_to_facility: reduce_impact_per_flow(TrackColor.PINK, 1)"),
+            ReduceImpactPerFlow(TrackColor.PINK, 1),
+        )
+        self.assertEqual(
+            compile_upgrade_effect("Global_player_passive: reduce_facility_impact_type('Well', TrackColor.BLUE, 1)"),
+            ReduceFacilityImpactType("Well", TrackColor.BLUE, 1),
+        )
+
+    def test_whim_effects(self):
+        self.assertEqual(compile_whim_pre_effect("DemandSegment:Frugalists:current_price:+1"),
+                         DemandShift("Frugalists", "current_price", 1))
+        self.assertEqual(compile_whim_pre_effect("AllSegments:current_demand:+1"),
+                         AllSegmentsShift("current_demand", 1))
+        self.assertEqual(compile_whim_fallout("GlobalImpact:GREY:-1"), GlobalImpact(TrackColor.GREY, -1))
+        self.assertEqual(compile_whim_fallout("PlayerEffect:EcoEliteBuyers:reputation_stars:+1"),
+                         PlayerEffect("EcoEliteBuyers", "reputation_stars", 1))
+        self.assertIs(compile_whim_fallout(""), NO_EFFECT)
+
+    def test_malformed_effects_raise(self):
+        for text in ("reduce_impact_per_flow(TrackColor.PURPLE, 1)",
+                     "Apply_to_facility: reduce_impact_per_flow(TrackColor.PINK)",
+                     "Apply_to_facility: teleport(TrackColor.PINK, 1)"):
+            with self.assertRaises(EffectError):
+                compile_upgrade_effect(text)
+        with self.assertRaises(EffectError):
+            compile_whim_pre_effect("DemandSegment:Nobody:current_demand:+1")
+        with self.assertRaises(EffectError):
+            compile_whim_fallout("PlayerEffect:EcoEliteBuyers:GainReputation:1")
+
+    def test_loaded_cards_carry_compiled_effects(self):
+        self.assertTrue(all(card.effect is not None for card in get_all_upgrade_cards()))
+        self.assertTrue(all(card.pre_effect is not None and card.post_effect is not None
+                            for card in get_all_whim_cards()))
+
+    def test_malformed_content_is_reported_at_load(self):
+        sample = textwrap.dedent(
+            """
+            [[upgrades]]
+            name = "Broken Filter"
+            cost = 1
+            description = "broken"
+            effect_description = "Apply_to_facility: reduce_impact_per_flow(TrackColor.PINK, lots)"
+            """
+        )
+        with NamedTemporaryFile("w+", delete=False) as tmp:
+            tmp.write(sample)
+            tmp_path = tmp.name
+        import water_barons.cards as cards
+        try:
+            with patch.dict(os.environ, {"WATER_BARONS_DATA_FILE": tmp_path}):
+                with self.assertRaisesRegex(EffectError, "Broken Filter"):
+                    importlib.reload(cards)
+        finally:
+            importlib.reload(cards)
+            os.remove(tmp_path)
+
+
+class TestCompiledEffectsInGame(unittest.TestCase):
+    def setUp(self):
+        self.game = GameLogic(num_players=1, player_names=["Alice"])
+
+    def test_all_segments_pre_effect(self):
+        before = {name: seg.current_demand for name, seg in self.game.game_state.demand_segments.items()}
+        self.game.resolve_whim_pre_effect(WhimCard("Heat", "", "AllSegments:current_demand:+1", {}, ""))
+        for name, seg in self.game.game_state.demand_segments.items():
+            self.assertEqual(seg.current_demand, before[name] + 1)
+
+    def test_uncompiled_bad_effect_is_logged(self):
+        player = self.game.game_state.players[0]
+        player.r_and_d.append(UpgradeCard("Odd Tech", 1, "", "Global_player_passive: reduce_facility_impact_type('Well')"))
+        self.game._get_passive_player_impact_reduction(player, ["Well"], {TrackColor.BLUE: 2})
+        self.assertIn("Error parsing R&D effect", self.game.game_state.game_log[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+if np is not None:
+    from water_barons.env import ACTIONS, ACTION_IDS, VectorEnv, WaterBaronsEnv, observation_size
+
+
+def _play_out(env, rng):
+    """Plays random legal actions until the game ends; returns the number of steps and the last step."""
+    obs, info = env.reset()
+    steps = 0
+    while True:
+        action_id = rng.choice(np.flatnonzero(info['action_mask']))
+        obs, reward, terminated, truncated, info = env.step(action_id)
+        steps += 1
+        if terminated or truncated:
+            return steps, (obs, reward, terminated, truncated, info)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestWaterBaronsEnv(unittest.TestCase):
+    def test_reset_shapes_and_mask(self):
+        env = WaterBaronsEnv(opponents=("greedy", "random"), seed=1)
+        obs, info = env.reset()
+        self.assertEqual(obs.shape, (observation_size(3),))
+        self.assertEqual(obs.dtype, np.float32)
+        mask = info['action_mask']
+        self.assertEqual(mask.shape, (len(ACTIONS),))
+        agent = env.game.game_state.players[env.seat]
+        self.assertEqual({ACTIONS[i] for i in np.flatnonzero(mask)}, set(env.game.legal_actions(agent)))
+
+    def test_plays_to_the_end(self):
+        env = WaterBaronsEnv(seed=2, max_rounds=5)
+        steps, (obs, reward, terminated, truncated, info) = _play_out(env, np.random.default_rng(0))
+        self.assertGreater(steps, 0)
+        self.assertIn(reward, (1.0, -1.0))
+        self.assertTrue(terminated or truncated)
+        self.assertFalse(info['action_mask'].any())
+        self.assertIn('ranking', info)
+        with self.assertRaises(RuntimeError):
+            env.step(0)
+
+    def test_seeded_episodes_repeat(self):
+        first = _play_out(WaterBaronsEnv(seed=3, max_rounds=4), np.random.default_rng(5))
+        second = _play_out(WaterBaronsEnv(seed=3, max_rounds=4), np.random.default_rng(5))
+        self.assertEqual(first[0], second[0])
+        np.testing.assert_array_equal(first[1][0], second[1][0])
+
+    def test_illegal_action_is_wasted(self):
+        env = WaterBaronsEnv(seed=4)
+        obs, info = env.reset()
+        illegal = int(np.flatnonzero(~info['action_mask'])[0])
+        env.step(illegal) # Does not raise; the decision is simply lost
+        self.assertFalse(env.done)
+
+    def test_action_table_is_consistent(self):
+        self.assertEqual(len(ACTION_IDS), len(ACTIONS))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestVectorEnv(unittest.TestCase):
+    def test_lockstep_batches_and_autoreset(self):
+        venv = VectorEnv(4, seed=0, max_rounds=2)
+        obs, info = venv.reset(seed=0)
+        self.assertEqual(obs.shape, (4, venv.observation_size))
+        self.assertEqual(info['action_mask'].shape, (4, len(ACTIONS)))
+        rng = np.random.default_rng(1)
+        finished = 0
+        for _ in range(200):
+            actions = venv.sample_legal_actions(rng)
+            self.assertTrue(info['action_mask'][np.arange(4), actions].all())
+            obs, rewards, terminated, truncated, info = venv.step(actions)
+            done = terminated | truncated
+            finished += int(done.sum())
+            for i in np.flatnonzero(done):
+                self.assertIsNotNone(info['final_ranking'][i])
+                self.assertIn(rewards[i], (1.0, -1.0))
+        self.assertGreater(finished, 0)
+        self.assertTrue(info['action_mask'].any(axis=1).all()) # Finished games were reset
+
+
+if __name__ == '__main__':
+    unittest.main()
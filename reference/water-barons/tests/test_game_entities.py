@@ -1,8 +1,9 @@
 import unittest
 from water_barons.game_entities import (
     Player, Card, FacilityCard, DistributionCard, UpgradeCard, WhimCard, GlobalEventCard,
-    DemandSegment, FutureToken, TrackColor, CardType
+    DemandSegment, FutureToken, TrackColor, CardType, ImpactProfile, WaterBatch
 )
+import pickle
 
 class TestGameEntities(unittest.TestCase):
 
@@ -111,5 +112,42 @@ class TestGameEntities(unittest.TestCase):
         self.assertEqual(short_token.matures_at_decrease, 2)
         self.assertIsNone(short_token.matures_at_increase)
 
+    def test_impact_profile_reads_like_a_dict(self):
+        profile = ImpactProfile({TrackColor.GREY: 2, TrackColor.PINK: 1})
+        self.assertEqual(profile[TrackColor.GREY], 2)
+        self.assertEqual(profile[TrackColor.BLUE], 0)
+        self.assertEqual(profile.get(TrackColor.BLUE, 0), 0)
+        self.assertEqual(profile.items(), [(TrackColor.PINK, 1), (TrackColor.GREY, 2)])
+        self.assertEqual(profile, {TrackColor.PINK: 1, TrackColor.GREY: 2, TrackColor.BLUE: 0})
+        self.assertNotEqual(profile, {TrackColor.PINK: 1})
+        copy = profile.copy()
+        copy[TrackColor.PINK] += 3
+        self.assertEqual(profile[TrackColor.PINK], 1)
+        self.assertEqual(copy.amounts, [4, 2, 0, 0])
+
+    def test_water_batch_record(self):
+        profile = ImpactProfile({TrackColor.BLUE: 1})
+        batch = WaterBatch("Deep Well", ["Well"], profile, 4, 1)
+        self.assertEqual(batch['quantity'], 4)
+        batch['quantity'] -= 1
+        self.assertEqual(batch.quantity, 3)
+        self.assertEqual(batch.get('facility_name'), "Deep Well")
+        self.assertIs(batch.copy().base_impact_profile, profile)
+        self.assertFalse(hasattr(batch, '__dict__'))
+
+        player = Player("Alice")
+        player.water_batches.append(batch)
+        self.assertEqual(player.get_total_water_produced(), 3)
+
+    def test_entities_are_slotted_and_picklable(self):
+        facility = FacilityCard("Glacial Tap", 5, 3, {TrackColor.GREY: 1}, ["ARCTIC"])
+        player = Player("Alice")
+        player.facilities[0] = facility
+        for obj in (facility, player, DemandSegment("Frugalists", 4, 1, ""), FutureToken(TrackColor.PINK, True)):
+            self.assertFalse(hasattr(obj, '__dict__'))
+        restored = pickle.loads(pickle.dumps(player))
+        self.assertEqual(restored.facilities[0].impact_profile, {TrackColor.GREY: 1})
+        self.assertEqual(restored.impact_storage, {track: 0 for track in TrackColor})
+
 if __name__ == '__main__':
     unittest.main()
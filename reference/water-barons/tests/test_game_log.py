@@ -0,0 +1,60 @@
+import unittest
+
+from water_barons.game_log import GameLog, LogLevel, LogRecord
+from water_barons.game_entities import TrackColor
+from water_barons.game_logic import GameLogic
+
+
+class Shouty:
+    """Counts how often it is formatted."""
+    def __init__(self):
+        self.formatted = 0
+
+    def __format__(self, spec):
+        self.formatted += 1
+        return "SHOUT"
+
+
+class TestGameLog(unittest.TestCase):
+    def test_formats_only_when_read(self):
+        log = GameLog()
+        arg = Shouty()
+        log.info("{} says {}", "Alice", arg)
+        self.assertEqual(arg.formatted, 0)
+        self.assertEqual(log[-1], "Alice says SHOUT")
+        self.assertEqual(arg.formatted, 1)
+        self.assertEqual(log.records[0], LogRecord(LogLevel.INFO, "{} says {}", ("Alice", arg)))
+
+    def test_reads_like_a_list_of_strings(self):
+        log = GameLog()
+        log.append("Plain {text}")
+        log.info("{} built {} in slot {}.", "Bob", "Well", 2)
+        log.debug("detail")
+        self.assertEqual(len(log), 3)
+        self.assertEqual(log[0], "Plain {text}")
+        self.assertEqual(log[-2:], ["Bob built Well in slot 2.", "detail"])
+        self.assertEqual(list(log), ["Plain {text}", "Bob built Well in slot 2.", "detail"])
+        self.assertIn("Bob built Well in slot 2.", log)
+        self.assertEqual("".join(log[-20:]), "Plain {text}Bob built Well in slot 2.detail")
+
+    def test_level_filters_records(self):
+        log = GameLog(LogLevel.INFO)
+        log.debug("hidden")
+        log.info("shown")
+        self.assertEqual(list(log), ["shown"])
+
+        off = GameLog(LogLevel.OFF)
+        off.info("nothing {}", 1)
+        off.append("nothing")
+        self.assertEqual(len(off), 0)
+        self.assertFalse(off.enabled_for(LogLevel.INFO))
+
+    def test_game_with_logging_off(self):
+        game = GameLogic(num_players=2, player_names=["Alice", "Bob"], seed=3, log_level=LogLevel.OFF)
+        game.game_state.add_global_impact(TrackColor.PINK, 3)
+        game.threshold_check_phase()
+        self.assertEqual(len(game.game_state.game_log), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
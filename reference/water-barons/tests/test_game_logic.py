@@ -1,9 +1,20 @@
+import pickle
+import random
 import unittest
-from unittest.mock import patch, call
+from unittest.mock import call
 from water_barons.game_logic import GameLogic
 from water_barons.game_state import GameState
 from water_barons.game_entities import Player, TrackColor, WhimCard, GlobalEventCard
-from water_barons.cards import get_all_whim_cards
+from water_barons.cards import get_all_whim_cards, GLOBAL_EVENTS_DATA
+from water_barons.actions import (
+    Action, MARKET_SIZE, PASS, PRODUCE_WATER, BUILD_FACILITY, BUILD_DISTRIBUTION, ADD_UPGRADE,
+    SPECULATE, BUY_EVENT_OPTION, DRAFT_PICK,
+)
+from water_barons.bench import midgame
+from water_barons.game_log import LogLevel
+from water_barons.game_state import Phase, RuleFlag
+from water_barons.policies import GreedyPolicy, greedy_sales, make_callbacks
+from hypothesis import given, settings, strategies as st
 
 
 class TestGameLogicInitialization(unittest.TestCase):
@@ -65,22 +76,26 @@ class TestGameLogicPhases(unittest.TestCase):
         self.assertFalse(self.game.game_state.whim_draft_active)
 
 
-    @patch('builtins.print') # Mock print to avoid clutter
-    def test_ops_phase_calls_next_player(self, mock_print):
-        initial_player_name = self.game.game_state.get_current_player().name
+    def _run_round(self, draft_cb=lambda player, options, pick_num: 0, action_cb=lambda player, action_num: None,
+                   sales_cb=lambda player, water, demands, tracks: []):
+        self.game.run_round({'get_player_draft_choice_cb': draft_cb,
+                             'get_player_action_choice_cb': action_cb,
+                             'get_player_sales_choices_cb': sales_cb})
 
+    def test_ops_phase_calls_next_player(self):
         # Mock the callback for action choice. For this test, it doesn't need to do anything complex.
         mock_action_choice_cb = unittest.mock.Mock()
 
-        self.game.ops_phase(get_player_action_choice_cb=mock_action_choice_cb)
+        self._run_round(action_cb=mock_action_choice_cb)
 
-        # After ops phase, current_player_index should be reset to 0 for the next phase
+        # After the round, current_player_index should be reset to 0
         self.assertEqual(self.game.game_state.current_player_index, 0)
 
-        # Ensure the mock was called for each player and each action (2 players * 2 actions = 4 calls)
-        self.assertEqual(mock_action_choice_cb.call_count, len(self.game.game_state.players) * 2)
+        # Ensure the mock was called for each player and each action, in turn order
+        alice, bob = self.game.game_state.players
+        self.assertEqual(mock_action_choice_cb.call_args_list, [call(alice, 1), call(alice, 2), call(bob, 1), call(bob, 2)])
 
-        # Check log for turn indications if necessary (optional, as functionality is implicitly tested by call_count)
+        # Check log for turn indications if necessary (optional, as functionality is implicitly tested by call_args_list)
         log_str = "".join(self.game.game_state.game_log)
         self.assertIn(f"{self.player_names[0]}'s turn", log_str)
         self.assertIn(f"{self.player_names[1]}'s turn", log_str)
@@ -122,12 +137,14 @@ class TestGameLogicPhases(unittest.TestCase):
         self.assertIn(f"{player1.name} added 3 to GREEN track.", "".join(self.game.game_state.game_log))
 
 
-    @patch('builtins.print') # Mock print for crowd_phase
-    def test_crowd_phase_flow(self, mock_print):
-        # Setup: Add some whim cards to crowd_deck
+    def test_crowd_phase_flow(self):
+        # Setup: Whim cards for the crowd_deck, dealt once the draft has built it
         whim1 = WhimCard("WhimA", "", "DemandSegment:Frugalists:current_demand:+1", {}, "GlobalImpact:PINK:+1")
         whim2 = WhimCard("WhimB", "", "DemandSegment:Eco-Elites:current_price:+1", {}, "GlobalImpact:GREY:+1")
-        self.game.game_state.crowd_deck = [whim1, whim2, WhimCard("WhimC", "", "", {}, "")] # num_players + 1 = 3
+        crowd_deck = [whim1, whim2, WhimCard("WhimC", "", "", {}, "")] # num_players + 1 = 3
+
+        def action_cb(player, action_num):
+            self.game.game_state.crowd_deck = crowd_deck
 
         initial_pink_level = self.game.game_state.impact_tracks[TrackColor.PINK].level
         initial_frugalist_demand = self.game.game_state.demand_segments["Frugalists"].current_demand
@@ -142,10 +159,11 @@ class TestGameLogicPhases(unittest.TestCase):
         # Mock the sales callback - for this test, assume no sales are made to simplify
         mock_sales_cb = unittest.mock.Mock(return_value=[]) # Returns empty list = no sales
 
-        self.game.crowd_phase(get_player_sales_choices_cb=mock_sales_cb)
+        self._run_round(action_cb=action_cb, sales_cb=mock_sales_cb)
 
-        # Check pre-effects
-        self.assertEqual(self.game.game_state.demand_segments["Frugalists"].current_demand, initial_frugalist_demand + 1)
+        # Check pre-effects (the demand itself is reset at the end of the round)
+        demands = {opp['name']: opp['demand'] for opp in mock_sales_cb.call_args.args[2]}
+        self.assertEqual(demands["Frugalists"], initial_frugalist_demand + 1)
         # Check post-fallout
         self.assertEqual(self.game.game_state.impact_tracks[TrackColor.PINK].level, initial_pink_level + 1)
         # Check discard
@@ -264,5 +282,169 @@ class TestGameLogicPhases(unittest.TestCase):
         self.assertIn("Winner:", log_output)
 
 
+def _all_action_shapes(game):
+    """A superset of the legal Ops actions: every market index, slot, target and option."""
+    yield Action(PASS)
+    for slot in range(4):
+        yield Action(PRODUCE_WATER, (slot,))
+    for market_index in range(MARKET_SIZE + 1):
+        for slot in range(4):
+            yield Action(BUILD_FACILITY, (market_index, slot))
+            yield Action(BUILD_DISTRIBUTION, (market_index, slot))
+            yield Action(ADD_UPGRADE, (market_index, 'facility', slot))
+        yield Action(ADD_UPGRADE, (market_index, 'route', 0))
+    for track in TrackColor:
+        yield Action(SPECULATE, ('long', track.name))
+        yield Action(SPECULATE, ('short', track.name))
+    for event_data in GLOBAL_EVENTS_DATA:
+        yield Action(BUY_EVENT_OPTION, (event_data["name"],))
+
+
+class TestLegalActions(unittest.TestCase):
+    @settings(max_examples=25, deadline=None)
+    @given(seed=st.integers(0, 10_000), rounds=st.integers(1, 6), coin=st.integers(0, 12))
+    def test_legal_actions_are_exactly_the_accepted_ones(self, seed, rounds, coin):
+        game = midgame(rounds=rounds, seed=seed, num_players=2)
+        for player in game.game_state.players:
+            player.cred_coin = coin
+            legal = set(game.legal_actions(player))
+            for action in _all_action_shapes(game):
+                trial = game.fork(LogLevel.OFF)
+                accepted = trial.apply_action(trial.game_state.players[game.game_state.players.index(player)], action)
+                self.assertEqual(accepted, action in legal, action)
+
+    def test_cached_until_relevant_state_changes(self):
+        game = GameLogic(num_players=2, player_names=["Alice", "Bob"])
+        gs = game.game_state
+        alice = gs.players[0]
+        alice.cred_coin = 6
+        first = game.legal_actions(alice)
+        self.assertIs(game.legal_actions(alice), first)
+        gs.round_number += 1 # Irrelevant
+        alice.reputation_stars += 1
+        self.assertIs(game.legal_actions(alice), first)
+
+        alice.cred_coin = 0
+        poor = game.legal_actions(alice)
+        self.assertIsNot(poor, first)
+        self.assertFalse(any(a.kind == SPECULATE for a in poor))
+
+        alice.cred_coin = 30
+        rich = game.legal_actions(alice)
+        gs.rule_flags |= RuleFlag.MICROPLASTIC_REVELATION
+        self.assertIsNot(game.legal_actions(alice), rich)
+        gs.facility_deck.pop(0)
+        self.assertEqual(game.legal_actions(alice), tuple(game._enumerate_legal_actions(alice)))
+
+    def test_draft_picks(self):
+        game = GameLogic(num_players=2, player_names=["Alice", "Bob"])
+        alice, bob = game.game_state.players
+        picker, options, _ = game.initiate_whim_draft()
+        other = bob if picker is alice else alice
+        self.assertEqual(game.legal_actions(picker), tuple(Action(DRAFT_PICK, (i,)) for i in range(len(options))))
+        self.assertEqual(game.legal_actions(other), ())
+        self.assertFalse(game.apply_action(other, Action(DRAFT_PICK, (0,))))
+        chosen = options[1]
+        self.assertTrue(game.apply_action(picker, Action(DRAFT_PICK, (1,))))
+        self.assertIn(chosen, game.game_state.crowd_deck)
+        game.request_next_whim_draft_pick()
+        self.assertEqual(len(game.legal_actions(picker)) > 0, game._draft_picker() is picker)
+
+
+def _play_by_submit(game, policies, max_rounds):
+    """Plays like run_game(make_callbacks(game, policies), max_rounds), one submit() per decision."""
+    gs = game.game_state
+    game.start_round()
+    while True:
+        decision = game.pending_decision()
+        if decision is None:
+            if gs.phase == Phase.GAME_OVER or gs.round_number >= max_rounds:
+                return
+            game.start_next_round()
+            continue
+        game.submit(decision.player, policies[decision.player.name].decide(game, decision))
+
+
+class TestPhaseStateMachine(unittest.TestCase):
+    def _policies(self, names, seed):
+        return {name: GreedyPolicy(random.Random(seed + i)) for i, name in enumerate(names)}
+
+    def test_decision_sequence_of_a_round(self):
+        game = GameLogic(num_players=2, player_names=["Alice", "Bob"], seed=1, log_level=LogLevel.OFF)
+        gs = game.game_state
+        self.assertEqual(gs.phase, Phase.SETUP)
+        self.assertIsNone(game.pending_decision())
+        game.start_round()
+        seen = []
+        while game.pending_decision() is not None:
+            decision = game.pending_decision()
+            seen.append((decision.phase, decision.player.name, decision.number))
+            choice = 0 if decision.phase == Phase.WHIM_DRAFT else (
+                Action(PASS) if decision.phase == Phase.OPS else [])
+            self.assertTrue(game.submit(decision.player, choice))
+        self.assertEqual(gs.phase, Phase.ROUND_END)
+        draft = [d for d in seen if d[0] == Phase.WHIM_DRAFT]
+        self.assertEqual(len(draft), 2 * len(gs.players))
+        ops = [d[1:] for d in seen if d[0] == Phase.OPS]
+        self.assertEqual(ops, [("Alice", 1), ("Alice", 2), ("Bob", 1), ("Bob", 2)])
+        self.assertEqual(seen.index(next(d for d in seen if d[0] == Phase.OPS)), len(draft))
+
+    def test_only_the_deciding_player_can_submit(self):
+        game = GameLogic(num_players=2, player_names=["Alice", "Bob"], seed=2)
+        game.start_round()
+        picker = game.pending_decision().player
+        other = next(p for p in game.game_state.players if p is not picker)
+        self.assertFalse(game.submit(other, 0))
+        self.assertIs(game.pending_decision().player, picker)
+        self.assertIn("It is not {}'s decision.".format(other.name), game.game_state.game_log)
+        with self.assertRaises(RuntimeError):
+            game.start_round() # A decision is still pending
+
+    def test_malformed_choices_use_up_the_decision(self):
+        game = GameLogic(num_players=2, player_names=["Alice", "Bob"], seed=3, log_level=LogLevel.OFF)
+        alice, bob = game.game_state.players
+        alice.water_batches = [{'facility_name': 'TestFac', 'facility_tags': [], 'base_impact_profile': {},
+                                'quantity': 2, 'production_round': 1}]
+        game.start_round()
+        self.assertFalse(game.submit(game.pending_decision().player, None))
+        while game.game_state.phase == Phase.WHIM_DRAFT:
+            game.submit(game.pending_decision().player, 0)
+        self.assertFalse(game.submit(alice, 3))
+        self.assertFalse(game.submit(alice, None))
+        self.assertIs(game.pending_decision().player, bob)
+        self.assertFalse(game.submit(bob, ("build_facility", 0, 0)))
+        self.assertTrue(game.submit(bob, Action(PASS)))
+        self.assertEqual(game.pending_decision().phase, Phase.CROWD_SALES)
+        self.assertFalse(game.submit(alice, 5))
+        self.assertEqual(game.game_state.phase, Phase.ROUND_END)
+
+    def test_submit_plays_like_run_game(self):
+        names = ["P1", "P2", "P3"]
+        by_callbacks = GameLogic(num_players=3, player_names=names, seed=5)
+        by_callbacks.run_game(make_callbacks(by_callbacks, self._policies(names, 7)), max_rounds=4)
+        by_submit = GameLogic(num_players=3, player_names=names, seed=5)
+        _play_by_submit(by_submit, self._policies(names, 7), max_rounds=4)
+        by_submit.final_scoring()
+        self.assertEqual(list(by_submit.game_state.game_log), list(by_callbacks.game_state.game_log))
+
+    def test_paused_game_resumes_after_fork_and_pickle(self):
+        game = midgame(rounds=3, seed=6, num_players=2)
+        policies = self._policies(["P1", "P2"], 6)
+        game.start_next_round()
+        while game.game_state.phase != Phase.CROWD_SALES:
+            decision = game.pending_decision()
+            game.submit(decision.player, policies[decision.player.name].decide(game, decision))
+        copies = [game.fork(), pickle.loads(pickle.dumps(game))]
+        logs = []
+        for copy in [game] + copies:
+            while copy.pending_decision() is not None:
+                decision = copy.pending_decision()
+                copy.submit(decision.player, greedy_sales(copy, decision.player, decision.options))
+            self.assertEqual(copy.game_state.phase, Phase.ROUND_END)
+            logs.append(list(copy.game_state.game_log))
+        self.assertEqual(logs[1], logs[0])
+        self.assertEqual(logs[2], logs[0])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,14 @@
 import unittest
 import tempfile
 import os
-from water_barons.game_state import GameState, ImpactTrack
+import pickle
+import random
+from water_barons.bench import midgame
+from water_barons.game_log import LogLevel
+from water_barons.game_state import GameState, ImpactTrack, EventTriggerIndex, RuleFlag
 from water_barons.game_entities import TrackColor, Player, GlobalEventCard
 from water_barons.cards import get_all_global_event_tiles # To get some sample events
+from water_barons.policies import GreedyPolicy, make_callbacks
 
 class TestImpactTrack(unittest.TestCase):
     def test_track_creation(self):
@@ -116,5 +121,154 @@ class TestGameState(unittest.TestCase):
             os.remove(path)
 
 
+class TestEventTriggerIndex(unittest.TestCase):
+    def setUp(self):
+        self.low = GlobalEventCard("Low", TrackColor.PINK, 3, "")
+        self.high = GlobalEventCard("High", TrackColor.PINK, 8, "")
+        self.grey = GlobalEventCard("Grey", TrackColor.GREY, 5, "")
+        self.tiles = [self.high, self.grey, self.low]
+        self.index = EventTriggerIndex(self.tiles)
+
+    def test_crossed_and_reached(self):
+        self.assertEqual(self.index.crossed(TrackColor.PINK, 0, 3), [self.low])
+        self.assertEqual(self.index.crossed(TrackColor.PINK, 3, 7), [])
+        self.assertEqual(self.index.crossed(TrackColor.PINK, 2, 10), [self.low, self.high])
+        self.assertEqual(self.index.crossed(TrackColor.PINK, 9, 2), [])
+        self.assertEqual(self.index.reached(TrackColor.PINK, 8), [self.low, self.high])
+        self.assertEqual(self.index.reached(TrackColor.BLUE, 10), [])
+
+    def test_rebuilds_after_in_place_changes(self):
+        self.assertEqual(self.index.reached(TrackColor.GREY, 5), [self.grey])
+        extra = GlobalEventCard("Extra", TrackColor.GREY, 2, "")
+        self.tiles.append(extra)
+        self.assertEqual(self.index.reached(TrackColor.GREY, 5), [extra, self.grey])
+        self.grey.trigger_threshold = 1
+        self.assertEqual(self.index.reached(TrackColor.GREY, 1), [self.grey])
+        self.grey.trigger_track = TrackColor.BLUE
+        self.assertEqual(self.index.reached(TrackColor.BLUE, 1), [self.grey])
+        self.tiles.remove(extra)
+        self.assertEqual(self.index.reached(TrackColor.GREY, 10), [])
+
+    def test_assigning_tiles_rebuilds_the_index(self):
+        gs = GameState(num_players=1, player_names=["Alice"])
+        gs.add_global_impact(TrackColor.PINK, 1)
+        gs.global_event_tiles_available = [self.low]
+        gs.add_global_impact(TrackColor.PINK, 3)
+        self.assertIn(self.low, gs.global_event_tiles_active)
+
+    def test_game_state_sees_tiles_appended_in_place(self):
+        gs = GameState(num_players=1, player_names=["Alice"])
+        gs.global_event_tiles_available = [self.grey]
+        gs.add_global_impact(TrackColor.PINK, 1)
+        gs.global_event_tiles_available.append(self.low)
+        gs.add_global_impact(TrackColor.PINK, 3)
+        self.assertIn(self.low, gs.global_event_tiles_active)
+
+
+class TestRuleFlags(unittest.TestCase):
+    def setUp(self):
+        self.gs = GameState(num_players=1, player_names=["Alice"])
+
+    def test_event_flags_follow_active_events(self):
+        collapse = GlobalEventCard("Aquifer Collapse", TrackColor.BLUE, 8, "")
+        self.gs.trigger_global_event(collapse)
+        self.gs.trigger_global_event(GlobalEventCard("Energy Crisis", TrackColor.GREY, 7, ""))
+        self.assertEqual(self.gs.rule_flags, RuleFlag.AQUIFER_COLLAPSE)
+        self.gs.deactivate_global_event(collapse)
+        self.assertEqual(self.gs.rule_flags, RuleFlag.NONE)
+
+    def test_threshold_effect_flags(self):
+        self.gs.set_threshold_effect("DEP_Level_5_Effect", True)
+        self.assertIn("DEP_Level_5_Effect", self.gs.active_threshold_effects)
+        self.assertTrue(self.gs.rule_flags & RuleFlag.DEP_LEVEL_5)
+        self.gs.set_threshold_effect("DEP_Level_5_Effect", False)
+        self.assertFalse(self.gs.rule_flags & RuleFlag.DEP_LEVEL_5)
+
+    def test_refresh_rule_flags(self):
+        self.gs.global_event_tiles_active.append(GlobalEventCard("Mass Recall", TrackColor.GREEN, 10, ""))
+        self.gs.active_threshold_effects.add("TOX_Level_7_Effect")
+        self.gs.refresh_rule_flags()
+        self.assertEqual(self.gs.rule_flags, RuleFlag.MASS_RECALL | RuleFlag.TOX_LEVEL_7)
+
+
+class TestFork(unittest.TestCase):
+    def setUp(self):
+        self.game = midgame(rounds=3, seed=5, num_players=2)
+        self.gs = self.game.game_state
+
+    def test_fork_sets_every_attribute(self):
+        self.assertEqual(set(vars(self.gs.fork())), set(vars(self.gs)))
+
+    def test_fork_is_independent(self):
+        before = pickle.dumps(self.gs)
+        child = self.gs.fork()
+        player = child.players[0]
+        player.cred_coin += 100
+        player.facilities[0] = player.facilities[0] or child.facility_deck[0].copy()
+        player.facilities[0].upgrades.append(child.upgrade_deck.pop())
+        player.impact_storage[TrackColor.PINK] += 3
+        child.add_global_impact(TrackColor.GREY, 10)
+        child.demand_segments["Eco-Elites"].current_demand = 0
+        child.facility_deck.clear()
+        child.global_event_tiles_available.pop()
+        child.set_threshold_effect("TOX_Level_7_Effect", True)
+        child.rng.random()
+        child.game_log.info("Only in the fork")
+        self.assertEqual(pickle.dumps(self.gs), before)
+
+    def test_fork_shares_card_definitions(self):
+        child = self.gs.fork()
+        self.assertIs(child.facility_deck[0], self.gs.facility_deck[0])
+        self.assertIs(child.whim_deck_source[0], self.gs.whim_deck_source[0])
+        for parent_player, child_player in zip(self.gs.players, child.players):
+            for original, copied in zip(parent_player.facilities, child_player.facilities):
+                if original is not None:
+                    self.assertIsNot(copied, original) # Built cards can be upgraded, so each state has its own
+                    self.assertEqual(copied.name, original.name)
+
+    def test_fork_plays_on_like_the_original(self):
+        results = []
+        for game in (self.game, self.game.fork()):
+            policies = {p.name: GreedyPolicy(random.Random(7)) for p in game.game_state.players}
+            game.run_game(make_callbacks(game, policies), max_rounds=6)
+            gs = game.game_state
+            results.append((gs.round_number, [(p.cred_coin, p.reputation_stars) for p in gs.players],
+                            {c: t.level for c, t in gs.impact_tracks.items()}, list(gs.game_log)))
+        self.assertEqual(results[0], results[1])
+
+    def test_fork_log_level(self):
+        child = self.gs.fork(LogLevel.OFF)
+        self.assertEqual(len(child.game_log), len(self.gs.game_log))
+        child.game_log.info("dropped")
+        self.assertEqual(len(child.game_log), len(self.gs.game_log))
+
+
+class TestChangeJournal(unittest.TestCase):
+    def setUp(self):
+        self.gs = GameState(num_players=2, player_names=["Alice", "Bob"], seed=1)
+
+    def test_detached_by_default(self):
+        self.assertIsNone(self.gs.journal)
+        self.gs.add_global_impact(TrackColor.PINK, 1) # Nothing to record into
+
+    def test_records_until_drained(self):
+        journal = self.gs.attach_journal()
+        self.assertIs(self.gs.attach_journal(), journal)
+        self.assertTrue(journal.drain().everything) # Everything is new to a fresh observer
+        self.gs.add_global_impact(TrackColor.PINK, 1)
+        journal.player_changed(self.gs.players[1])
+        changes = journal.drain()
+        self.assertEqual((changes.tracks, changes.segments, changes.everything, changes.players),
+                         (True, False, False, {"Bob"}))
+        empty = journal.drain()
+        self.assertEqual((empty.tracks, empty.players), (False, set()))
+
+    def test_forks_and_pickles_leave_the_journal_behind(self):
+        journal = self.gs.attach_journal()
+        self.assertIsNone(self.gs.fork().journal)
+        self.assertIsNone(pickle.loads(pickle.dumps(self.gs)).journal)
+        self.assertIs(self.gs.journal, journal)
+
+
 if __name__ == '__main__':
     unittest.main()
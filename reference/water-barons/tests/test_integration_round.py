@@ -9,13 +9,6 @@ class TestIntegrationRound(unittest.TestCase):
         player_names = ["Alice", "Bob"]
         game = GameLogic(num_players=2, player_names=player_names)
 
-        # --- Whim Draft ---
-        pick_info = game.initiate_whim_draft()
-        while pick_info:
-            player, options, pick_num = pick_info
-            game.process_whim_draft_pick(player, 0)
-            pick_info = game.request_next_whim_draft_pick()
-
         # --- Ops Phase ---
         p1, p2 = game.game_state.players
         # Ensure players have enough credits for all actions regardless of
@@ -48,8 +41,6 @@ class TestIntegrationRound(unittest.TestCase):
                 a()
             counters[player.name] += 1
 
-        game.ops_phase(action_cb)
-
         # --- Crowd Phase ---
         def sales_cb(player, water_batches, demand_opps, tracks):
             sales = []
@@ -62,12 +53,13 @@ class TestIntegrationRound(unittest.TestCase):
                     sales.append((demand['name'], qty, revenue, route_card, idx, None))
             return sales
 
-        game.crowd_phase(sales_cb)
-        game.threshold_check_phase()
-        game.reset_round_modifiers()
+        game.run_round({'get_player_draft_choice_cb': lambda player, options, pick_num: 0,
+                        'get_player_action_choice_cb': action_cb,
+                        'get_player_sales_choices_cb': sales_cb})
 
-        # ensure chosen winner
-        game.game_state.players[winner_idx].cred_coin += 10
+        # ensure chosen winner, whatever the round paid out (futures included)
+        winner, loser = game.game_state.players[winner_idx], game.game_state.players[1 - winner_idx]
+        winner.cred_coin = max(winner.cred_coin, loser.cred_coin) + 10
         game.final_scoring()
         log = "".join(game.game_state.game_log)
         return log
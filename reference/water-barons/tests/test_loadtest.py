@@ -0,0 +1,30 @@
+import unittest
+
+from webapp.loadtest import format_report, free_port, percentile, run_load, start_server
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_percentile_is_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual((percentile(values, 50), percentile(values, 95), percentile(values, 99)), (50.0, 95.0, 99.0))
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_clients_play_rounds_against_a_local_server(self):
+        port = free_port()
+        server = start_server(port, {'BROADCAST_WINDOW_MS': '5'})
+        try:
+            report = run_load(f"http://127.0.0.1:{port}", clients=4, rounds=1, timeout=30, server_pid=server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        self.assertEqual(report['failures'], [])
+        self.assertEqual((report['rooms'], report['finished']), (2, 4))
+        self.assertEqual(set(report['latency_ms']), {'connect', 'start_whim_draft', 'submit_whim_draft_choice', 'player_action'})
+        self.assertEqual(report['latency_ms']['player_action']['count'], 8) # Two Ops actions per player
+        self.assertEqual(report['server_seconds']['handle_player_action']['count'], 8)
+        self.assertIn("p99 ms", format_report(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import gc
+import pickle
+import random
+import unittest
+
+from water_barons.actions import Sale
+from water_barons.bench import midgame
+from water_barons.game_logic import GameLogic
+from water_barons.game_log import LogLevel
+from water_barons.game_state import Phase
+from water_barons.mcts import MCTSPolicy, NodePool, candidate_sales, determinize, rewards
+from water_barons.policies import POLICIES, GreedyPolicy, candidate_actions, make_callbacks
+
+
+class TestNodePool(unittest.TestCase):
+    def test_nodes_are_reused_after_release(self):
+        pool = NodePool(size=2)
+        first = pool.acquire("a", 0)
+        first.children["x"] = pool.acquire("x", 1)
+        pool.acquire("y", 1) # Grows past the initial size
+        self.assertEqual(len(pool), 3)
+        self.assertGreaterEqual(pool.capacity, 3)
+        pool.release_all()
+        again = pool.acquire("b", 1)
+        self.assertIs(again, first)
+        self.assertEqual((again.choice, again.mover, again.visits, again.children), ("b", 1, 0, {}))
+
+
+class TestSearchHelpers(unittest.TestCase):
+    def setUp(self):
+        self.game = midgame(rounds=2, seed=3, num_players=2)
+
+    def test_determinize_keeps_markets_and_card_counts(self):
+        gs = self.game.game_state
+        sim = self.game.fork(LogLevel.OFF)
+        determinize(sim, random.Random(1))
+        self.assertEqual(sim.game_state.facility_deck[:3], gs.facility_deck[:3])
+        self.assertCountEqual(sim.game_state.facility_deck, gs.facility_deck)
+        self.assertCountEqual(sim.game_state.whim_deck_source, gs.whim_deck_source)
+
+    def test_rewards_favour_the_leader(self):
+        gs = self.game.game_state
+        gs.players[0].cred_coin = gs.players[1].cred_coin + 20
+        first, second = rewards(self.game)
+        self.assertGreater(first, 0.5)
+        self.assertLess(second, 0.5)
+
+    def test_candidate_sales_include_greedy_and_nothing(self):
+        player = self.game.game_state.players[0]
+        route = next(c for c in self.game.game_state.distribution_deck if c.name == "Plastic Bottles")
+        player.distribution_routes[0] = route.copy()
+        player.water_batches = []
+        demands = self.game._get_current_demand_opportunities([])
+        self.assertEqual(candidate_sales(self.game, player, demands), [()])
+        facility = self.game.game_state.facility_deck[0].copy()
+        player.facilities[0] = facility
+        self.game.action_produce_water(player, 0)
+        plans = candidate_sales(self.game, player, demands)
+        self.assertIn((), plans)
+        self.assertTrue(all(isinstance(sale, Sale) for plan in plans for sale in plan))
+
+
+def paused_at_ops(game: GameLogic) -> GameLogic:
+    """Starts the next round of `game` and drafts the first option for everyone, stopping at the first Ops decision."""
+    game.start_next_round()
+    while game.game_state.phase == Phase.WHIM_DRAFT:
+        decision = game.pending_decision()
+        game.submit(decision.player, 0)
+    return game
+
+
+class TestMCTSPolicy(unittest.TestCase):
+    def setUp(self):
+        self.game = paused_at_ops(midgame(rounds=2, seed=4, num_players=2))
+        self.player = self.game.pending_decision().player
+
+    def test_needs_a_budget(self):
+        with self.assertRaises(ValueError):
+            MCTSPolicy(iterations=None, time_limit=None)
+
+    def test_registered_as_policy(self):
+        self.assertIs(POLICIES["mcts"], MCTSPolicy)
+
+    def test_search_leaves_the_game_untouched(self):
+        before = pickle.dumps(self.game.game_state)
+        policy = MCTSPolicy(random.Random(0), iterations=30)
+        action = policy.choose_action(self.game, self.player, 1)
+        self.assertIn(action, candidate_actions(self.game, self.player))
+        self.assertEqual(sum(visits for visits, _ in policy.last_stats.values()), 30)
+        self.assertEqual(pickle.dumps(self.game.game_state), before)
+
+    def test_time_limit(self):
+        policy = MCTSPolicy(random.Random(0), iterations=None, time_limit=0.05)
+        policy.choose_action(self.game, self.player, 1)
+        self.assertGreater(sum(visits for visits, _ in policy.last_stats.values()), 0)
+
+    def test_root_parallel_search_merges_workers(self):
+        with MCTSPolicy(random.Random(0), iterations=10, workers=2) as policy:
+            action = policy.choose_action(self.game, self.player, 1)
+            executor = policy._executor
+        self.assertIsNone(policy._executor)
+        with self.assertRaises(RuntimeError): # Shut down on leaving the block
+            executor.submit(int)
+        self.assertIn(action, candidate_actions(self.game, self.player))
+        self.assertEqual(sum(visits for visits, _ in policy.last_stats.values()), 20)
+
+    def test_dropped_policy_shuts_its_workers_down(self):
+        policy = MCTSPolicy(random.Random(0), iterations=10, workers=2)
+        policy.choose_action(self.game, self.player, 1)
+        executor = policy._executor
+        del policy
+        gc.collect()
+        with self.assertRaises(RuntimeError):
+            executor.submit(int)
+
+    def test_needs_a_pending_decision(self):
+        other = next(p for p in self.game.game_state.players if p is not self.player)
+        with self.assertRaises(ValueError):
+            MCTSPolicy(random.Random(0), iterations=5).choose_action(self.game, other, 1)
+
+    def test_plays_full_games(self):
+        game = GameLogic(num_players=2, player_names=["M", "G"], seed=8, log_level=LogLevel.OFF)
+        policies = {"M": MCTSPolicy(random.Random(1), iterations=20), "G": GreedyPolicy(random.Random(2))}
+        ranking = game.run_game(make_callbacks(game, policies), max_rounds=4)
+        self.assertEqual(len(ranking), 2)
+        self.assertGreater(len(game.game_state.whim_discard_pile), 0) # Drafted Whims were played
+
+
+if __name__ == '__main__':
+    unittest.main()
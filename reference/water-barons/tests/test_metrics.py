@@ -0,0 +1,62 @@
+import unittest
+
+from webapp import app as web
+from webapp.metrics import MetricsRegistry
+from webapp.rooms import RoomManager
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry(prefix='t_')
+        latency = registry.histogram('seconds', "Latency.", ('handler',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.observe(value, handler='a"b')
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE t_seconds histogram', lines)
+        self.assertIn('t_seconds_bucket{handler="a\\"b",le="0.1"} 1', lines)
+        self.assertIn('t_seconds_bucket{handler="a\\"b",le="1"} 3', lines)
+        self.assertIn('t_seconds_bucket{handler="a\\"b",le="+Inf"} 4', lines)
+        self.assertIn('t_seconds_count{handler="a\\"b"} 4', lines)
+        self.assertIn('t_seconds_sum{handler="a\\"b"} 4.05', lines)
+
+    def test_counters_and_labels(self):
+        registry = MetricsRegistry(prefix='t_')
+        sent = registry.counter('sent_total', "Sent.", ('event',))
+        sent.inc(2, event='x')
+        sent.inc(event='x')
+        registry.gauge('rooms', "Rooms.", lambda: 7)
+        text = registry.render()
+        self.assertIn('t_sent_total{event="x"} 3\n', text)
+        self.assertIn('t_rooms 7\n', text)
+        with self.assertRaises(ValueError):
+            sent.inc(kind='x')
+
+
+class TestMetricsPage(unittest.TestCase):
+    def setUp(self):
+        self.saved_rooms, self.saved_window = web.rooms, web.broadcasts.window
+        web.rooms = RoomManager()
+        web.broadcasts.window = 0
+
+    def tearDown(self):
+        web.rooms, web.broadcasts.window = self.saved_rooms, self.saved_window
+
+    def test_handlers_and_broadcasts_are_measured(self):
+        before = web.handler_seconds.count(handler='on_start_whim_draft')
+        client = web.socketio.test_client(web.app, query_string="room=metrics")
+        client.emit('start_whim_draft')
+        client.disconnect()
+        self.assertEqual(web.handler_seconds.count(handler='on_start_whim_draft'), before + 1)
+        response = web.app.test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.get_data(as_text=True)
+        for sample in ('water_barons_handler_seconds_count{handler="handle_connect"}',
+                       'water_barons_serialize_seconds_count', 'water_barons_broadcast_seconds_count',
+                       'water_barons_messages_sent_total{event="state_snapshot"}',
+                       'water_barons_payload_bytes_bucket{event="state_snapshot",le="+Inf"}'):
+            self.assertIn(sample, text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import random
+import unittest
+
+from water_barons.game_logic import GameLogic
+from water_barons.policies import GreedyPolicy, RandomPolicy
+from water_barons.actions import Sale
+from water_barons.replay import GameRecord, ReplayError, encode_choice, play_recorded, replay
+
+
+def _snapshot(game):
+    gs = game.game_state
+    return (
+        gs.round_number,
+        [(p.name, p.cred_coin, p.reputation_stars, [f.name if f else None for f in p.facilities])
+         for p in gs.players],
+        {color: track.level for color, track in gs.impact_tracks.items()},
+        list(gs.game_log),
+    )
+
+
+class TestSeededGames(unittest.TestCase):
+    def test_same_seed_same_decks(self):
+        a = GameLogic(num_players=2, player_names=["A", "B"], seed=42)
+        b = GameLogic(num_players=2, player_names=["A", "B"], seed=42)
+        self.assertEqual([c.name for c in a.game_state.facility_deck],
+                         [c.name for c in b.game_state.facility_deck])
+        self.assertEqual([c.name for c in a.game_state.whim_deck_source],
+                         [c.name for c in b.game_state.whim_deck_source])
+        self.assertEqual(a.game_state.seed, 42)
+
+    def test_unseeded_game_records_its_seed(self):
+        game = GameLogic(num_players=1, player_names=["A"])
+        again = GameLogic(num_players=1, player_names=["A"], seed=game.game_state.seed)
+        self.assertEqual([c.name for c in game.game_state.facility_deck],
+                         [c.name for c in again.game_state.facility_deck])
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        policies = {"P1": GreedyPolicy(random.Random(1)), "P2": RandomPolicy(random.Random(2))}
+        self.game, self.record = play_recorded(7, policies, max_rounds=6)
+
+    def test_replay_reproduces_game(self):
+        self.assertTrue(self.record.decisions)
+        self.assertEqual(_snapshot(replay(self.record)), _snapshot(self.game))
+
+    def test_encode_round_trip(self):
+        data = self.record.encode()
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(GameRecord.decode(data), self.record)
+        self.assertEqual(_snapshot(replay(GameRecord.decode(data))), _snapshot(self.game))
+
+    def test_truncated_record_raises(self):
+        truncated = self.record._replace(decisions=self.record.decisions[:-3])
+        with self.assertRaises(ReplayError):
+            replay(truncated)
+
+    def test_only_decisions_can_be_encoded(self):
+        self.assertEqual(encode_choice([Sale("Frugalists", 0, 0, 2)]), {"s": [["Frugalists", 0, 0, 2]]})
+        for bad in (None, "1", 1.0, Sale("Frugalists", 0, 0, 2)):
+            with self.assertRaises(ValueError):
+                encode_choice(bad)
+
+
+if __name__ == '__main__':
+    unittest.main()
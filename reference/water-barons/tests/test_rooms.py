@@ -0,0 +1,357 @@
+import os
+import tempfile
+import time
+import unittest
+
+from water_barons.game_state import Phase
+from water_barons.savefile import encode_state
+from water_barons.store import GameStore
+from webapp import app as web
+from webapp.rooms import RoomError, RoomManager
+from webapp.serialization import serialize_game_views
+from webapp.sync import apply_delta
+
+
+class TestRoomManager(unittest.TestCase):
+    def test_seats_then_observers(self):
+        rooms = RoomManager(players_per_room=2, max_observers_per_room=1)
+        room, first = rooms.join("r1", "s1")
+        _, second = rooms.join("r1", "s2")
+        _, observer = rooms.join("r1", "s3")
+        self.assertEqual((first.name, second.name, observer), ("Player 1", "Player 2", None))
+        self.assertIs(room.player_for_sid("s2"), second)
+        self.assertEqual(room.sid_for(first), "s1")
+        self.assertEqual(sorted(room.members), ["s1", "s2", "s3"])
+        with self.assertRaises(RoomError):
+            rooms.join("r1", "s4")
+
+    def test_room_cap_and_room_ids(self):
+        rooms = RoomManager(max_rooms=1)
+        rooms.join("r1", "s1")
+        with self.assertRaises(RoomError):
+            rooms.join("r2", "s2")
+        with self.assertRaises(RoomError):
+            rooms.join("no spaces", "s3")
+        self.assertEqual(len(rooms), 1)
+
+    def test_seat_is_freed_and_empty_rooms_dropped(self):
+        rooms = RoomManager()
+        room, _ = rooms.join("r1", "s1")
+        rooms.join("r1", "s2")
+        self.assertIs(rooms.leave("s1"), room)
+        _, player = rooms.join("r1", "s3")
+        self.assertEqual(player.name, "Player 1")
+        rooms.leave("s2")
+        rooms.leave("s3")
+        self.assertIsNone(rooms.room_of("s3"))
+        self.assertEqual(len(rooms), 0)
+
+    def test_token_reclaims_a_free_seat(self):
+        rooms = RoomManager()
+        room, player = rooms.join("r1", "s1")
+        rooms.join("r1", "s2")
+        token = room.tokens[player.name]
+        rooms.leave("s1")
+        self.assertIsNone(room.player_for_sid("s1"))
+        _, again = rooms.join("r1", "s3", token=token)
+        self.assertIs(again, player)
+        self.assertEqual(room.sid_for(player), "s3")
+        self.assertEqual(room.tokens[player.name], token)
+
+    def test_token_dies_when_someone_else_takes_the_seat(self):
+        rooms = RoomManager()
+        room, player = rooms.join("r1", "s1")
+        rooms.join("r1", "s2")
+        token = room.tokens[player.name]
+        rooms.leave("s1")
+        _, taker = rooms.join("r1", "s3")
+        self.assertIs(taker, player)
+        self.assertNotEqual(room.tokens[player.name], token)
+        _, stranger = rooms.join("r1", "s4", token=token)
+        self.assertIsNone(stranger)
+
+    def test_seat_is_held_during_the_grace_period(self):
+        rooms = RoomManager(reconnect_grace=60)
+        room, player = rooms.join("r1", "s1")
+        token = room.tokens[player.name]
+        rooms.leave("s1")
+        self.assertIn("r1", rooms.rooms) # Kept for the player to come back
+        self.assertEqual(rooms.join("r1", "s2")[1].name, "Player 2")
+        self.assertIsNone(rooms.join("r1", "s3")[1])
+        self.assertIs(rooms.join("r1", "s4", token=token)[1], player)
+
+    def test_reconnect_with_a_known_version_resumes_from_it(self):
+        rooms = RoomManager()
+        room, player = rooms.join("r1", "s1")
+        room.sync.publish({'x': 1})
+        room.sync.ack("s1", 1)
+        rooms.join("r1", "s2")
+        rooms.leave("s1")
+        room.sync.publish({'x': 2})
+        rooms.join("r1", "s3", token=room.tokens[player.name], version=1)
+        self.assertEqual(room.sync.messages(["s3"])[0][1], 'state_delta')
+        rooms.join("r1", "s4", version=1) # An observer without a seat's token starts over
+        self.assertEqual(room.sync.messages(["s4"])[0][1], 'state_snapshot')
+
+
+class TestRoomEviction(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = GameStore(os.path.join(self.dir.name, 'games.sqlite3'))
+        self.reload_times = []
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def manager(self, **kwargs):
+        return RoomManager(store=self.store, on_reload=self.reload_times.append, **kwargs)
+
+    def test_idle_room_is_evicted_and_reloaded_on_use(self):
+        rooms = self.manager(idle_ttl=60)
+        room, player = rooms.join("r1", "s1")
+        rooms.join("r1", "s2")
+        room.start_round()
+        pending = room.game.pending_decision()
+        self.assertEqual(rooms.evict_idle(time.monotonic() + 61), 1)
+        self.assertFalse(room.resident)
+        self.assertEqual((rooms.resident_count, rooms.evicted_count, rooms.evictions), (0, 1, 1))
+        self.assertIs(rooms.room_of("s1"), room)
+        self.assertTrue(room.resident)
+        self.assertEqual(room.player_for_sid("s1").name, player.name)
+        self.assertEqual(room.game.pending_decision().player.name, pending.player.name)
+        self.assertEqual((rooms.reloads, len(self.reload_times)), (1, 1))
+
+    def test_least_recently_used_room_is_evicted_over_the_cap(self):
+        rooms = self.manager(max_resident=1)
+        first, _ = rooms.join("r1", "s1")
+        second, _ = rooms.join("r2", "s2")
+        self.assertEqual((first.resident, second.resident), (False, True))
+        rooms.room_of("s1")
+        self.assertEqual((first.resident, second.resident), (True, False))
+        self.assertEqual(len(rooms), 2)
+
+    def test_evicted_room_is_dropped_without_reloading(self):
+        rooms = self.manager(idle_ttl=60)
+        room, _ = rooms.join("r1", "s1")
+        rooms.evict_idle(time.monotonic() + 61)
+        rooms.leave("s1")
+        self.assertEqual(len(rooms), 0)
+        self.assertFalse(room.resident)
+        self.assertEqual(rooms.reloads, 0)
+
+    def test_store_for_eviction_only(self):
+        rooms = self.manager(idle_ttl=60, journal=False)
+        room, _ = rooms.join("r1", "s1")
+        rooms.join("r1", "s2")
+        room.start_round()
+        pending = room.game.pending_decision()
+        self.assertIsNone(room.store)
+        self.assertNotIn("r1", self.store)
+        rooms.evict_idle(time.monotonic() + 61)
+        self.assertEqual(self.store.journal("r1"), [])
+        self.assertIs(rooms.room_of("s1"), room)
+        self.assertEqual(room.game.pending_decision().player.name, pending.player.name)
+        rooms.evict_idle(time.monotonic() + 61)
+        rooms.leave("s1")
+        rooms.leave("s2")
+        self.assertNotIn("r1", self.store)
+
+    def test_store_without_journal_drops_reloaded_games(self):
+        rooms = self.manager(max_resident=1, journal=False)
+        rooms.join("a", "s1")
+        rooms.join("b", "s2")
+        self.assertEqual(self.store.game_ids(), ["a"])
+        rooms.room_of("s1")
+        self.assertEqual(self.store.game_ids(), ["b"])
+        rooms.leave("s1")
+        rooms.leave("s2")
+        self.assertEqual(len(rooms), 0)
+        self.assertEqual(self.store.game_ids(), [])
+
+    def test_unreadable_stored_game_refuses_the_join(self):
+        rooms = self.manager()
+        rooms.join("r1", "s1")
+        rooms.leave("s1")
+        self.store.db.execute("UPDATE snapshots SET format = 1 WHERE game_id = 'r1'")
+        with self.assertRaises(RoomError):
+            rooms.join("r1", "s2")
+
+    def test_no_eviction_without_a_store(self):
+        rooms = RoomManager(idle_ttl=60, max_resident=1)
+        first, _ = rooms.join("r1", "s1")
+        rooms.join("r2", "s2")
+        self.assertEqual(rooms.evict_idle(time.monotonic() + 61), 0)
+        self.assertTrue(first.resident)
+
+
+class TestWebappRooms(unittest.TestCase):
+    def setUp(self):
+        self.saved_rooms = web.rooms
+        web.rooms = RoomManager(max_rooms=2)
+        self.saved_window = web.broadcasts.window
+        web.broadcasts.window = 0 # Send each update at once; see test_updates_in_a_window_are_coalesced
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            if client.is_connected():
+                client.disconnect()
+        web.rooms = self.saved_rooms
+        web.broadcasts.window = self.saved_window
+
+    def connect(self, room_id, auth=None):
+        client = web.socketio.test_client(web.app, query_string=f"room={room_id}", auth=auth)
+        self.clients.append(client)
+        return client
+
+    def test_broadcasts_stay_in_their_room(self):
+        a1, a2, b1 = self.connect("a"), self.connect("a"), self.connect("b")
+        for client in (a1, a2, b1):
+            client.get_received()
+        a1.emit('start_whim_draft')
+        self.assertIn('state_snapshot', [m['name'] for m in a2.get_received()])
+        self.assertEqual(b1.get_received(), [])
+        self.assertEqual(web.rooms.rooms["b"].game.game_state.phase, Phase.SETUP)
+
+    def test_connection_refused_over_the_room_cap(self):
+        self.connect("a")
+        self.connect("b")
+        self.assertFalse(self.connect("c").is_connected())
+
+    def test_plays_a_round_through_submit(self):
+        clients = {}
+        for client in (self.connect("a"), self.connect("a")):
+            assigned = next(m for m in client.get_received() if m['name'] == 'assign_player_id')
+            clients[assigned['args'][0]['playerId']] = client
+        game = web.rooms.rooms["a"].game
+        next(iter(clients.values())).emit('start_whim_draft')
+        while game.pending_decision() is not None:
+            decision = game.pending_decision()
+            client = clients[decision.player.name]
+            if decision.phase == Phase.WHIM_DRAFT:
+                client.emit('submit_whim_draft_choice', {'chosen_card_index': 0})
+            else:
+                client.emit('player_action', {'action_type': 'pass', 'payload': {}})
+        self.assertEqual(game.game_state.phase, Phase.ROUND_END)
+        self.assertEqual(len(game.game_state.crowd_cards_in_play), 0)
+
+    def test_acked_clients_get_deltas_and_resync_gets_a_snapshot(self):
+        client = self.connect("a")
+        [snapshot] = [m['args'][0] for m in client.get_received() if m['name'] == 'state_snapshot']
+        client.emit('state_ack', {'version': snapshot['version']})
+        client.emit('start_whim_draft')
+        [delta] = [m['args'][0] for m in client.get_received() if m['name'] == 'state_delta']
+        self.assertEqual(delta['base'], snapshot['version'])
+        state = apply_delta(snapshot['state'], delta['ops'])
+        room = web.rooms.rooms["a"]
+        self.assertEqual(state, serialize_game_views(room.game.game_state)[0])
+        client.emit('state_resync')
+        self.assertEqual([m['name'] for m in client.get_received()], ['state_snapshot', 'private_state'])
+
+    def test_reconnecting_player_gets_its_seat_and_a_delta(self):
+        first, second = self.connect("a"), self.connect("a")
+        received = first.get_received()
+        assigned = next(m['args'][0] for m in received if m['name'] == 'assign_player_id')
+        snapshot = next(m['args'][0] for m in received if m['name'] == 'state_snapshot')
+        first.emit('state_ack', {'version': snapshot['version']})
+        first.disconnect()
+        second.emit('start_whim_draft')
+        back = self.connect("a", auth={'token': assigned['reconnectToken'], 'version': snapshot['version']})
+        received = back.get_received()
+        again = next(m['args'][0] for m in received if m['name'] == 'assign_player_id')
+        self.assertEqual(again['playerId'], assigned['playerId'])
+        [delta] = [m['args'][0] for m in received if m['name'] == 'state_delta']
+        self.assertEqual(delta['base'], snapshot['version'])
+        self.assertNotIn('state_snapshot', [m['name'] for m in received])
+
+    def test_evicted_room_sends_a_snapshot_once_reloaded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = GameStore(os.path.join(directory, 'games.sqlite3'))
+            web.rooms = RoomManager(store=store, idle_ttl=60)
+            client = self.connect("a")
+            snapshot = next(m['args'][0] for m in client.get_received() if m['name'] == 'state_snapshot')
+            client.emit('state_ack', {'version': snapshot['version']})
+            web.rooms.evict_idle(time.monotonic() + 61)
+            client.emit('start_whim_draft')
+            received = client.get_received()
+            [fresh] = [m['args'][0] for m in received if m['name'] == 'state_snapshot']
+            self.assertGreater(fresh['version'], snapshot['version'])
+            self.assertEqual(fresh['state']['phase'], 'WHIM_DRAFT')
+            self.assertNotIn('error_message', [m['name'] for m in received])
+            client.disconnect()
+            store.close()
+
+    def test_malformed_draft_choice_passes_the_pick(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = GameStore(os.path.join(directory, 'games.sqlite3'))
+            web.rooms = RoomManager(store=store)
+            clients = {}
+            for client in (self.connect("a"), self.connect("a")):
+                assigned = next(m for m in client.get_received() if m['name'] == 'assign_player_id')
+                clients[assigned['args'][0]['playerId']] = client
+            game = web.rooms.rooms["a"].game
+            next(iter(clients.values())).emit('start_whim_draft')
+            for data in ({}, {'chosen_card_index': None}):
+                client = clients[game.pending_decision().player.name]
+                client.get_received()
+                client.emit('submit_whim_draft_choice', data)
+                self.assertIn('error_message', [m['name'] for m in client.get_received()])
+            self.assertEqual(len(game.game_state.crowd_deck), 0)
+            self.assertEqual(encode_state(store.load("a").game_state), encode_state(game.game_state))
+            for client in clients.values():
+                client.disconnect()
+            store.close()
+
+    def test_draft_options_go_only_to_the_picker(self):
+        clients = {}
+        for client in (self.connect("a"), self.connect("a")):
+            assigned = next(m for m in client.get_received() if m['name'] == 'assign_player_id')
+            clients[assigned['args'][0]['playerId']] = client
+        observer = self.connect("a")
+        observer.get_received()
+        next(iter(clients.values())).emit('start_whim_draft')
+        picker = web.rooms.rooms["a"].game.pending_decision().player.name
+        for name, client in clients.items():
+            private = [m['args'][0]['state'] for m in client.get_received() if m['name'] == 'private_state']
+            self.assertEqual(any('draft' in part for part in private), name == picker)
+        received = observer.get_received()
+        self.assertNotIn('private_state', [m['name'] for m in received])
+        [delta] = [m['args'][0] for m in received if m['name'] == 'state_delta' or m['name'] == 'state_snapshot']
+        self.assertNotIn('water_batches', str(delta))
+
+    def test_updates_in_a_window_are_coalesced(self):
+        web.broadcasts.window = 0.05
+        clients = {}
+        for client in (self.connect("a"), self.connect("a")):
+            assigned = next(m for m in client.get_received() if m['name'] == 'assign_player_id')
+            clients[assigned['args'][0]['playerId']] = client
+        game = web.rooms.rooms["a"].game
+        watcher = next(iter(clients.values()))
+        watcher.emit('start_whim_draft')
+        while game.pending_decision() is not None and game.game_state.phase == Phase.WHIM_DRAFT:
+            clients[game.pending_decision().player.name].emit('submit_whim_draft_choice', {'chosen_card_index': 0})
+        self.assertEqual([m['name'] for m in watcher.get_received()], [])
+        web.socketio.sleep(0.1) # Lets the flush run
+        updates = [m for m in watcher.get_received() if m['name'] in ('state_snapshot', 'state_delta')]
+        self.assertEqual(len(updates), 1)
+
+    def test_event_floods_are_dropped(self):
+        client = self.connect("a")
+        client.get_received()
+        for _ in range(web.event_limiter.burst + 5):
+            client.emit('state_resync')
+        snapshots = [m for m in client.get_received() if m['name'] == 'state_snapshot']
+        self.assertLessEqual(len(snapshots), web.event_limiter.burst)
+        self.assertGreater(len(snapshots), 0)
+
+    def test_out_of_turn_action_is_refused(self):
+        first, second = self.connect("a"), self.connect("a")
+        first.get_received()
+        second.get_received()
+        first.emit('player_action', {'action_type': 'pass', 'payload': {}})
+        self.assertEqual([m['name'] for m in first.get_received()], ['error_message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
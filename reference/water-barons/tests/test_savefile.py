@@ -0,0 +1,148 @@
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+from water_barons.bench import midgame
+from water_barons.game_entities import GlobalEventCard, TrackColor
+from water_barons.game_logic import GameLogic
+from water_barons.game_state import GameState, Phase
+from water_barons.policies import GreedyPolicy, RandomPolicy
+from water_barons.savefile import (
+    _CARD_LISTS, SAVE_FORMAT_VERSION, SaveFormatError, decode_state, encode_state,
+)
+
+
+def _dump(gs):
+    """Everything play depends on, as plain data."""
+    ids = lambda cards: [card.card_id for card in cards]
+    return {
+        'rng': gs.rng.getstate(), 'seed': gs.seed, 'round': gs.round_number, 'phase': gs.phase,
+        'current': gs.current_player_index, 'ops': gs.ops_action_num, 'flags': gs.rule_flags,
+        'market': gs.aqua_futures_market_open, 'uninhabitable': gs.uninhaitable,
+        'tracks': [(t.color, t.level, t.max_level) for t in gs.impact_tracks.values()],
+        'round_start': gs.track_levels_at_round_start,
+        'segments': [(s.name, s.current_demand, s.current_price) for s in gs.demand_segments.values()],
+        'cards': {name: ids(getattr(gs, name)) for name in _CARD_LISTS},
+        'previous_events': sorted(ids(gs.previously_active_events_this_round)),
+        'draft': (gs.whim_draft_active, gs.whim_draft_order, gs.whim_draft_current_picker_idx_in_order,
+                  gs.whim_draft_player_picks_remaining),
+        'crowd_demands': [dict(opp, original_segment_rules=opp['original_segment_rules'].name)
+                          for opp in gs.crowd_demands],
+        'counters': gs.game_wide_counters, 'effects': gs.active_threshold_effects,
+        'eco_elites': gs.round_sales_to_eco_elites,
+        'log': (gs.game_log.level, [(r.level, r.kind, r.text) for r in gs.game_log.records]),
+        'players': [(
+            p.name, p.cred_coin, p.reputation_stars, p.triggered_global_events, p.draw_extra_whim_flag,
+            p.impact_storage.amounts, p.total_impact_contributed.amounts,
+            [(f.card_id, ids(f.upgrades)) if f else None for f in p.facilities],
+            [(r.card_id, r.is_active) if r else None for r in p.distribution_routes],
+            ids(p.r_and_d), ids(p.hand_cards),
+            [(t.track, t.is_long, t.purchase_price, t.matures_at_increase, t.matures_at_decrease, t.payout)
+             for t in p.futures_tokens],
+            [(o.event_name, o.purchase_price, o.payout, o.has_matured) for o in p.event_options],
+            [(b.facility_name, b.facility_tags, b.base_impact_profile.amounts, b.quantity, b.production_round)
+             for b in p.water_batches],
+            p.routes_built_this_game,
+        ) for p in gs.players],
+    }
+
+
+def _decide(game, policies):
+    decision = game.pending_decision()
+    return decision.player, policies[decision.player.name].decide(game, decision)
+
+
+def _play_steps(game, policies, steps):
+    """Plays `steps` decisions (or round starts) on, stopping at the end of the game."""
+    for _ in range(steps):
+        gs = game.game_state
+        if gs.phase == Phase.GAME_OVER:
+            return
+        if game.pending_decision() is None:
+            game.start_round() if gs.phase == Phase.SETUP else game.start_next_round()
+        else:
+            game.submit(*_decide(game, policies))
+
+
+def _policies(seed):
+    return {"P1": GreedyPolicy(random.Random(seed)), "P2": RandomPolicy(random.Random(seed + 1)),
+            "P3": RandomPolicy(random.Random(seed + 2))}
+
+
+class TestSaveFormat(unittest.TestCase):
+    def test_round_trip_at_every_phase(self):
+        for seed in range(3):
+            game = GameLogic(3, ["P1", "P2", "P3"], seed=seed)
+            policies = _policies(seed)
+            phases = set()
+            while game.game_state.phase != Phase.GAME_OVER and game.game_state.round_number <= 6:
+                gs = game.game_state
+                phases.add(gs.phase)
+                self.assertEqual(_dump(decode_state(encode_state(gs))), _dump(gs))
+                _play_steps(game, policies, 1)
+            self.assertTrue({Phase.SETUP, Phase.WHIM_DRAFT, Phase.OPS, Phase.CROWD_SALES} <= phases)
+
+    def test_loaded_game_plays_on_identically(self):
+        game = GameLogic(3, ["P1", "P2", "P3"], seed=11)
+        _play_steps(game, _policies(11), 40)
+        loaded = GameLogic.from_state(decode_state(encode_state(game.game_state)))
+        _play_steps(game, _policies(12), 120)
+        _play_steps(loaded, _policies(12), 120)
+        self.assertEqual(_dump(loaded.game_state), _dump(game.game_state))
+
+    def test_built_cards_are_each_players_own(self):
+        gs = decode_state(encode_state(midgame(rounds=4, seed=2).game_state))
+        built = [f for p in gs.players for f in p.facilities if f is not None]
+        self.assertTrue(built)
+        self.assertEqual(len({id(f) for f in built}), len(built))
+        self.assertEqual(len({id(f.upgrades) for f in built}), len(built))
+
+    def test_log_reads_the_same(self):
+        gs = midgame(rounds=3, seed=4).game_state
+        self.assertEqual(list(decode_state(encode_state(gs)).game_log), list(gs.game_log))
+
+    def test_smaller_than_pickle(self):
+        gs = midgame(rounds=3, seed=4).game_state
+        self.assertLess(len(encode_state(gs)), len(pickle.dumps(gs, pickle.HIGHEST_PROTOCOL)) / 2)
+        self.assertEqual(_dump(decode_state(encode_state(gs, compress=False))), _dump(gs))
+
+    def test_rejects_other_data(self):
+        data = encode_state(midgame(rounds=1, seed=1).game_state)
+        for bad in (b"", b"not a save", data[:len(data) // 2],
+                    data[:4] + (SAVE_FORMAT_VERSION + 1).to_bytes(2, 'little') + data[6:],
+                    pickle.dumps(GameState(1, ["A"]))):
+            with self.assertRaises(SaveFormatError):
+                decode_state(bad)
+
+    def test_cards_without_ids_cannot_be_saved(self):
+        gs = GameState(2, ["A", "B"])
+        gs.global_event_tiles_available.append(GlobalEventCard("Custom", TrackColor.PINK, 3, ""))
+        with self.assertRaises(SaveFormatError):
+            encode_state(gs)
+
+
+class TestSaveFiles(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'game.sav')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_and_load_file(self):
+        gs = midgame(rounds=2, seed=3).game_state
+        gs.save_to_file(self.path)
+        self.assertEqual(_dump(GameState.load_from_file(self.path)), _dump(gs))
+
+    def test_pickled_saves_are_rejected(self):
+        gs = midgame(rounds=2, seed=3).game_state
+        with open(self.path, 'wb') as f:
+            pickle.dump(gs, f)
+        with self.assertRaises(SaveFormatError):
+            GameState.load_from_file(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import random
+import unittest
+
+from water_barons.actions import Action, PASS
+from water_barons.game_logic import GameLogic
+from water_barons.game_log import LogLevel
+from water_barons.game_state import Phase
+from water_barons.policies import POLICIES
+from webapp import app as web
+from webapp.serialization import (PRIVATE_PLAYER_FIELDS, StateSerializer, card_catalog_json, serialize_game_state,
+                                  serialize_game_views)
+
+
+class TestStateSerializer(unittest.TestCase):
+    def test_cached_view_matches_a_fresh_one_after_every_decision(self):
+        for seed in range(6):
+            names = ["A", "B", "C"]
+            game = GameLogic(num_players=3, player_names=names, seed=seed, log_level=LogLevel.INFO)
+            rng = random.Random(seed)
+            policies = {name: POLICIES[rng.choice(["greedy", "random"])](random.Random(seed + i))
+                        for i, name in enumerate(names)}
+            serializer = StateSerializer(game.game_state)
+            gs = game.game_state
+            game.start_round()
+            while gs.round_number <= 8:
+                decision = game.pending_decision()
+                if decision is None:
+                    if gs.phase == Phase.GAME_OVER:
+                        break
+                    game.start_next_round()
+                else:
+                    game.submit(decision.player, policies[decision.player.name].decide(game, decision))
+                self.assertEqual(serializer.serialize(), serialize_game_state(gs), f"seed {seed}, round {gs.round_number}")
+                self.assertEqual(serializer.serialize_views(), serialize_game_views(gs))
+
+    def test_untouched_fragments_are_reused(self):
+        game = GameLogic(num_players=2, player_names=["A", "B"], seed=1)
+        serializer = StateSerializer(game.game_state)
+        game.start_round()
+        while game.game_state.phase == Phase.WHIM_DRAFT:
+            game.submit(game.pending_decision().player, 0)
+        before = serializer.serialize()
+        acting = game.pending_decision().player
+        game.submit(acting, Action(PASS))
+        after = serializer.serialize()
+        idle = 1 - game.game_state.players.index(acting)
+        self.assertIs(after['players'][idle], before['players'][idle])
+        self.assertIs(after['impact_tracks'], before['impact_tracks'])
+        self.assertIs(after['demand_segments'], before['demand_segments'])
+
+    def test_public_view_leaves_out_private_fields(self):
+        game = GameLogic(num_players=2, player_names=["A", "B"], seed=2)
+        public, private = StateSerializer(game.game_state).serialize_views()
+        whole = serialize_game_state(game.game_state)
+        for player, full in zip(public['players'], whole['players']):
+            self.assertFalse(set(PRIVATE_PLAYER_FIELDS) & set(player))
+            self.assertEqual(dict(player, **private[player['name']]), full)
+
+    def test_close_detaches_the_journal(self):
+        game = GameLogic(num_players=2, player_names=["A", "B"])
+        serializer = StateSerializer(game.game_state)
+        self.assertIsNotNone(game.game_state.journal)
+        serializer.close()
+        self.assertIsNone(game.game_state.journal)
+
+
+class TestCardCatalog(unittest.TestCase):
+    def test_state_refers_to_cards_by_catalog_id(self):
+        game = GameLogic(num_players=2, player_names=["A", "B"], seed=3)
+        game.start_game()
+        builder = game.game_state.players[0]
+        builder.cred_coin = 100
+        self.assertTrue(game.action_build_facility(builder, game.game_state.facility_deck[0], 0))
+        self.assertTrue(game.action_produce_water(builder, 0))
+        state = serialize_game_state(game.game_state)
+        catalog = {card['id']: card for card in json.loads(card_catalog_json()[0])['cards']}
+        player = state['players'][0]
+        [facility] = [f for f in player['facilities'] if f is not None]
+        self.assertIsInstance(facility, int)
+        self.assertEqual(catalog[facility]['card_type'], 'FACILITY')
+        self.assertEqual(player['water_batches'][0]['facility_id'], facility)
+        self.assertEqual(state['card_catalog'], card_catalog_json()[1])
+
+    def test_catalog_is_served_with_an_etag(self):
+        client = web.app.test_client()
+        first = client.get('/catalog')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.get_etag()[0], card_catalog_json()[1])
+        again = client.get('/catalog', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
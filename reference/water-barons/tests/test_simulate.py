@@ -0,0 +1,76 @@
+import unittest
+
+from water_barons.actions import Action, Sale, BUILD_FACILITY, BUILD_DISTRIBUTION, PRODUCE_WATER
+from water_barons.game_logic import GameLogic
+from water_barons.policies import candidate_actions
+from water_barons.simulate import play_game, run_batch, summarize
+
+
+class TestApplyAction(unittest.TestCase):
+    def setUp(self):
+        self.game = GameLogic(num_players=2, player_names=["Alice", "Bob"])
+        self.player = self.game.game_state.players[0]
+        self.player.cred_coin = 30
+
+    def test_build_facility_takes_card_from_market(self):
+        deck = self.game.game_state.facility_deck
+        card = deck[1]
+        initial_len = len(deck)
+        self.assertTrue(self.game.apply_action(self.player, Action(BUILD_FACILITY, (1, 2))))
+        self.assertEqual(self.player.facilities[2].name, card.name)
+        self.assertIsNot(self.player.facilities[2], card) # Players build their own instance
+        self.assertEqual(len(deck), initial_len - 1)
+
+    def test_invalid_actions_are_rejected(self):
+        self.assertFalse(self.game.apply_action(self.player, Action(BUILD_FACILITY, (5, 0))))
+        self.assertFalse(self.game.apply_action(self.player, Action(PRODUCE_WATER, (0,))))
+        self.assertFalse(self.game.apply_action(self.player, Action("teleport", ())))
+        self.assertFalse(self.game.apply_action(self.player, Action(PRODUCE_WATER, ())))
+
+    def test_candidate_actions_are_accepted(self):
+        for action in candidate_actions(self.game, self.player):
+            self.assertIn(action.kind, ("pass", "produce_water", "build_facility", "build_distribution",
+                                        "add_upgrade", "speculate", "buy_event_option"))
+        self.assertTrue(self.game.apply_action(self.player, Action(BUILD_DISTRIBUTION, (0, 0))))
+
+
+class TestResolveSales(unittest.TestCase):
+    def test_sales_are_clamped_and_priced(self):
+        game = GameLogic(num_players=1, player_names=["Alice"])
+        player = game.game_state.players[0]
+        route = next(c for c in game.game_state.distribution_deck if c.name == "Plastic Bottles")
+        player.distribution_routes[0] = route
+        player.water_batches = [
+            {'facility_name': 'Glacial Tap', 'facility_tags': [], 'base_impact_profile': {},
+             'quantity': 3, 'production_round': 1}
+        ]
+        demands = game._get_current_demand_opportunities([])
+
+        resolved = game.resolve_sales(player, [
+            Sale("Connoisseurs", 0, 0, 5),   # clamped to the demand of 1, +1 for Glacial source
+            Sale("Frugalists", 0, 1, 2),     # empty route slot
+            Sale("Frugalists", 0, 0, 5),     # clamped to the 2 cubes left in the batch
+        ], demands)
+
+        self.assertEqual([(r[0], r[1], r[2]) for r in resolved],
+                         [("Connoisseurs", 1, 5), ("Frugalists", 2, 2)])
+
+
+class TestSimulate(unittest.TestCase):
+    def test_play_game_is_reproducible(self):
+        first = play_game(7, ["greedy", "random"], max_rounds=5)
+        second = play_game(7, ["greedy", "random"], max_rounds=5)
+        self.assertEqual(first, second)
+        self.assertLessEqual(first['rounds'], 5)
+        self.assertEqual(len(first['vp']), 2)
+
+    def test_run_batch_in_process_pool(self):
+        results = run_batch(4, ["random", "random"], workers=2, max_rounds=3)
+        self.assertEqual([r['seed'] for r in results], [0, 1, 2, 3])
+        summary = summarize(results, ["random", "random"], elapsed=1.0)
+        self.assertEqual(summary['games'], 4)
+        self.assertEqual(sum(seat['wins'] for seat in summary['seats']), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import os
+import pickle
+import random
+import zlib
+import tempfile
+import unittest
+
+from water_barons.game_logic import GameLogic
+from water_barons.game_state import Phase
+from water_barons.policies import GreedyPolicy, Policy
+from water_barons.store import GameStore, StoreError, start_entry
+from webapp.rooms import Room, RoomManager
+
+
+def _state(game):
+    gs = game.game_state
+    return (gs.round_number, gs.phase, list(gs.game_log),
+            [(p.name, p.cred_coin, p.reputation_stars, [f.name if f else None for f in p.facilities],
+              [w.quantity for w in p.water_batches]) for p in gs.players],
+            {color: track.level for color, track in gs.impact_tracks.items()},
+            [c.name for c in gs.facility_deck], gs.rng.getstate())
+
+
+def _play(room, rounds, policy):
+    """Plays `rounds` rounds in `room` through its journaled entry points."""
+    game = room.game
+    for _ in range(rounds):
+        if game.game_state.phase == Phase.GAME_OVER:
+            return
+        room.start_round()
+        decision = game.pending_decision()
+        while decision is not None:
+            room.submit(decision.player, policy.decide(game, decision))
+            decision = game.pending_decision()
+
+
+def _play_recording(room, rounds, policy, step):
+    """Like `_play`, returning {(round, 0): state at the round's start, (round, step): state `step` moves in}."""
+    states = {}
+    game = room.game
+    for _ in range(rounds):
+        room.start_round()
+        round_number = game.game_state.round_number
+        states[round_number, 0] = _state(game)
+        moves = 0
+        decision = game.pending_decision()
+        while decision is not None:
+            room.submit(decision.player, policy.decide(game, decision))
+            moves += 1
+            if moves == step:
+                states[round_number, step] = _state(game)
+            decision = game.pending_decision()
+    return states
+
+
+class TestGameStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'games.sqlite3')
+        self.store = GameStore(self.path, snapshot_every=7)
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def _room(self, room_id='r', seed=5):
+        room = Room(room_id, 2, seed=seed, store=self.store)
+        self.store.create(room_id, room.game)
+        return room
+
+    def test_load_replays_journal_to_live_state(self):
+        room = self._room()
+        _play(room, 3, GreedyPolicy(random.Random(3)))
+        loaded = self.store.load('r')
+        self.assertEqual(_state(loaded), _state(room.game))
+        self.assertEqual(loaded.pending_decision(), None)
+
+    def test_reloaded_game_plays_on_identically(self):
+        room = self._room()
+        _play(room, 2, GreedyPolicy(random.Random(3)))
+        self.store.close()
+        reopened = GameStore(self.path, snapshot_every=7)
+        resumed = Room('r', game=reopened.load('r'), store=reopened)
+        room.store = None # Plays on unjournaled, for comparison
+        _play(room, 2, GreedyPolicy(random.Random(4)))
+        _play(resumed, 2, GreedyPolicy(random.Random(4)))
+        self.assertEqual(_state(resumed.game), _state(room.game))
+        reopened.close()
+
+    def test_snapshots_every_n_entries(self):
+        room = self._room()
+        _play(room, 2, GreedyPolicy(random.Random(3)))
+        (last_seq,) = self.store.db.execute("SELECT last_seq FROM games WHERE game_id = 'r'").fetchone()
+        (snap_seq,) = self.store.db.execute("SELECT seq FROM snapshots WHERE game_id = 'r'").fetchone()
+        self.assertGreater(last_seq, 7)
+        self.assertEqual(snap_seq, last_seq - last_seq % 7)
+        self.assertEqual(len(self.store.journal('r', after=snap_seq)), last_seq % 7)
+        self.assertEqual(len(self.store.journal('r')), last_seq)
+
+    def test_snapshots_of_older_stores_are_rejected(self):
+        room = self._room()
+        _play(room, 1, GreedyPolicy(random.Random(3)))
+        self.store.db.execute("UPDATE snapshots SET format = 1, state = ? WHERE game_id = 'r'",
+                              (zlib.compress(pickle.dumps(room.game.game_state)),))
+        with self.assertRaises(StoreError):
+            self.store.load('r')
+
+    def test_seek_restores_any_round(self):
+        room = self._room()
+        states = _play_recording(room, 5, GreedyPolicy(random.Random(3)), step=3)
+        self.assertEqual(self.store.keyframe_rounds('r'), [1, 2, 3, 4, 5])
+        for (round_number, step), state in states.items():
+            self.assertEqual(_state(self.store.seek('r', round_number, step)), state)
+        with self.assertRaises(StoreError):
+            self.store.seek('r', 6)
+
+    def test_seek_between_sparse_keyframes(self):
+        self.store.keyframe_every = 3
+        room = self._room()
+        states = _play_recording(room, 6, GreedyPolicy(random.Random(3)), step=2)
+        self.assertEqual(self.store.keyframe_rounds('r'), [1, 4])
+        self.assertEqual(_state(self.store.seek('r', 6, 2)), states[6, 2])
+        self.assertEqual(_state(self.store.seek('r', 3)), states[3, 0])
+
+    def test_seek_in_a_long_game_reads_only_the_journal_after_its_keyframe(self):
+        room = self._room()
+        states = _play_recording(room, 60, Policy(random.Random(3)), step=4) # Passing players: the game goes on
+        (seq,) = self.store.db.execute("SELECT seq FROM keyframes WHERE game_id = 'r' AND round = 57").fetchone()
+        self.store.db.execute("DELETE FROM journal WHERE game_id = 'r' AND seq <= ?", (seq,))
+        self.assertEqual(_state(self.store.seek('r', 57, 4)), states[57, 4])
+
+    def test_wal_mode(self):
+        (mode,) = self.store.db.execute("PRAGMA journal_mode").fetchone()
+        self.assertEqual(mode, 'wal')
+
+    def test_unknown_games(self):
+        self.assertIsNone(self.store.load('missing'))
+        self.assertNotIn('missing', self.store)
+        with self.assertRaises(StoreError):
+            self.store.record('missing', GameLogic(1, ['A'], seed=1), start_entry())
+
+    def test_create_replaces_and_delete_removes(self):
+        room = self._room()
+        _play(room, 1, GreedyPolicy(random.Random(3)))
+        fresh = self._room(seed=6)
+        self.assertEqual(self.store.journal('r'), [])
+        self.assertEqual(_state(self.store.load('r')), _state(fresh.game))
+        self.store.delete('r')
+        self.assertEqual(self.store.game_ids(), [])
+
+
+class TestRoomManagerStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'games.sqlite3')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_restarted_manager_reloads_room_on_first_join(self):
+        store = GameStore(self.path)
+        manager = RoomManager(store=store)
+        room, _ = manager.join('table', 'sid-1')
+        self.assertEqual(store.game_ids(), ['table'])
+        _play(room, 1, GreedyPolicy(random.Random(3)))
+        expected = _state(room.game)
+        store.close()
+
+        restarted = RoomManager(store=GameStore(self.path))
+        self.assertNotIn('table', restarted.rooms) # Nothing is loaded before someone joins
+        reloaded, _ = restarted.join('table', 'sid-2')
+        self.assertEqual(_state(reloaded.game), expected)
+        restarted.store.close()
+
+    def test_dropped_room_is_snapshotted(self):
+        store = GameStore(self.path)
+        manager = RoomManager(store=store)
+        room, _ = manager.join('table', 'sid-1')
+        _play(room, 1, GreedyPolicy(random.Random(3)))
+        manager.leave('sid-1')
+        self.assertNotIn('table', manager.rooms)
+        (last_seq,) = store.db.execute("SELECT last_seq FROM games").fetchone()
+        (snap_seq,) = store.db.execute("SELECT seq FROM snapshots").fetchone()
+        self.assertEqual(snap_seq, last_seq)
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import copy
+import json
+import unittest
+
+from hypothesis import given, strategies as st
+
+from webapp.sync import PacketJSON, SharedPayload, StateSync, apply_delta, diff_states
+
+json_values = st.recursive(
+    st.none() | st.booleans() | st.integers(-5, 5) | st.text(max_size=3),
+    lambda children: st.lists(children, max_size=4) | st.dictionaries(st.text(max_size=2), children, max_size=4),
+    max_leaves=20,
+)
+
+
+class TestDiff(unittest.TestCase):
+    @given(json_values, json_values)
+    def test_apply_of_diff_gives_the_new_state(self, old, new):
+        ops = diff_states(old, new)
+        self.assertEqual(apply_delta(copy.deepcopy(old), ops), new)
+
+    def test_only_changed_fields_are_sent(self):
+        old = {'round': 1, 'players': [{'coin': 5, 'name': 'A'}, {'coin': 7, 'name': 'B'}]}
+        new = {'round': 1, 'players': [{'coin': 5, 'name': 'A'}, {'coin': 3, 'name': 'B'}]}
+        self.assertEqual(diff_states(old, new), [['set', ['players', 1, 'coin'], 3]])
+        self.assertEqual(diff_states(old, old), [])
+
+    def test_rolling_log_window_slides(self):
+        old = {'log': [f"line {i}" for i in range(20)]}
+        new = {'log': [f"line {i}" for i in range(2, 22)]}
+        self.assertEqual(diff_states(old, new), [['slide', ['log'], 2, ["line 20", "line 21"]]])
+
+
+class TestStateSync(unittest.TestCase):
+    def test_snapshot_then_deltas_from_the_acked_version(self):
+        sync = StateSync()
+        sync.add("a")
+        sync.publish({'x': 1, 'y': 1})
+        [(sids, event, payload)] = sync.messages()
+        self.assertEqual((sids, event, payload), (["a"], 'state_snapshot', {'version': 1, 'state': {'x': 1, 'y': 1}}))
+        self.assertTrue(sync.ack("a", 1))
+        self.assertEqual(sync.messages(), [])
+        sync.publish({'x': 2, 'y': 1})
+        sync.publish({'x': 2, 'y': 2})
+        [(_, event, payload)] = sync.messages()
+        self.assertEqual(event, 'state_delta')
+        self.assertEqual((payload['base'], payload['version']), (1, 3))
+        self.assertEqual(apply_delta({'x': 1, 'y': 1}, payload['ops']), {'x': 2, 'y': 2})
+
+    def test_unchanged_state_keeps_its_version(self):
+        sync = StateSync()
+        self.assertEqual(sync.publish({'x': 1}), 1)
+        self.assertEqual(sync.publish({'x': 1}), 1)
+
+    def test_clients_sharing_a_base_share_a_payload(self):
+        sync = StateSync()
+        for sid in ("a", "b", "c"):
+            sync.add(sid)
+        sync.publish({'x': 1})
+        sync.ack("a", 1)
+        sync.ack("b", 1)
+        sync.publish({'x': 2})
+        events = {event: sorted(sids) for sids, event, _ in sync.messages()}
+        self.assertEqual(events, {'state_delta': ["a", "b"], 'state_snapshot': ["c"]})
+
+    def test_clients_too_far_behind_get_a_snapshot(self):
+        sync = StateSync(history_size=2)
+        sync.add("a")
+        sync.publish({'x': 0})
+        sync.ack("a", 1)
+        for x in range(1, 4):
+            sync.publish({'x': x})
+        self.assertFalse(sync.ack("a", 1)) # Version 1 is gone
+        [(_, event, _)] = sync.messages()
+        self.assertEqual(event, 'state_snapshot')
+
+    def test_payloads_are_built_once_per_version(self):
+        sync = StateSync()
+        sync.add("a")
+        sync.publish({'x': 1})
+        [(_, _, first)] = sync.messages()
+        sync.add("b")
+        [(_, _, second)] = sync.messages(["b"])
+        self.assertIs(first, second)
+        self.assertIsInstance(first, SharedPayload)
+        sync.publish({'x': 2})
+        [(_, _, third)] = sync.messages(["b"])
+        self.assertIsNot(third, first)
+
+    def test_private_parts_go_to_their_player_when_they_change(self):
+        sync = StateSync()
+        sync.add("p", player_name="A")
+        sync.add("o")
+        sync.publish({'x': 1}, {'A': {'hand': [1]}})
+        private = [(sids, payload) for sids, event, payload in sync.messages() if event == 'private_state']
+        self.assertEqual(private, [(["p"], {'version': 1, 'state': {'hand': [1]}})])
+        sync.ack("p", 1)
+        sync.publish({'x': 1}, {'A': {'hand': [1]}})
+        self.assertEqual(sync.messages(["p"]), [])
+        sync.publish({'x': 1}, {'A': {'hand': [1, 2]}})
+        self.assertEqual([event for _, event, _ in sync.messages(["p"])], ['private_state'])
+        sync.resync("p")
+        self.assertEqual([event for _, event, _ in sync.messages(["p"])], ['state_snapshot', 'private_state'])
+
+
+class TestPacketJSON(unittest.TestCase):
+    def test_shared_payloads_are_spliced_in(self):
+        payload = SharedPayload({'version': 2, 'ops': [['set', ['x'], "é"]]})
+        packet = ['state_delta', payload]
+        self.assertEqual(PacketJSON.dumps(packet, separators=(',', ':')), json.dumps(packet, separators=(',', ':')))
+        payload['version'] = 3 # The encoding is cached: payloads must not change once sent
+        self.assertEqual(json.loads(PacketJSON.dumps(packet))[1]['version'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,6 +18,7 @@ class TestTabletopExport(unittest.TestCase):
             self.assertGreater(len(data["facilities"]), 0)
             self.assertIn("whims", data)
             self.assertGreater(len(data["whims"]), 0)
+            self.assertNotIn("card_id", data["facilities"][0])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,57 @@
+import unittest
+
+from webapp.throttle import BroadcastCoalescer, RateLimiter
+
+
+class TestBroadcastCoalescer(unittest.TestCase):
+    def setUp(self):
+        self.flushed = []
+        self.background = []
+        self.coalescer = BroadcastCoalescer(0.05, self.flushed.append,
+                                            lambda fn, *args: self.background.append((fn, args)), lambda seconds: None)
+
+    def run_background(self):
+        tasks, self.background[:] = list(self.background), []
+        for fn, args in tasks:
+            fn(*args)
+
+    def test_requests_in_a_window_flush_once(self):
+        for key in ("a", "a", "b", "a"):
+            self.coalescer.request(key)
+        self.assertEqual(self.flushed, [])
+        self.run_background()
+        self.assertEqual(sorted(self.flushed), ["a", "b"])
+        self.coalescer.request("a")
+        self.run_background()
+        self.assertEqual(self.flushed.count("a"), 2)
+        self.assertEqual((self.coalescer.requested, self.coalescer.flushed), (5, 3))
+
+    def test_zero_window_flushes_at_once(self):
+        self.coalescer.window = 0
+        self.coalescer.request("a")
+        self.assertEqual(self.flushed, ["a"])
+        self.assertEqual(self.background, [])
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_bursts_then_the_steady_rate(self):
+        now = [0.0]
+        limiter = RateLimiter(rate=2, burst=3, clock=lambda: now[0])
+        self.assertEqual([limiter.allow("s") for _ in range(4)], [True, True, True, False])
+        self.assertTrue(limiter.allow("other")) # Buckets are per client
+        now[0] = 0.5
+        self.assertEqual([limiter.allow("s") for _ in range(2)], [True, False])
+        now[0] = 100.0
+        self.assertEqual(sum(limiter.allow("s") for _ in range(10)), 3) # Refills up to the burst only
+        self.assertEqual(limiter.dropped, 9)
+
+    def test_forgotten_clients_start_full(self):
+        limiter = RateLimiter(rate=0, burst=1, clock=lambda: 0.0)
+        self.assertTrue(limiter.allow("s"))
+        self.assertFalse(limiter.allow("s"))
+        limiter.forget("s")
+        self.assertTrue(limiter.allow("s"))
+
+
+if __name__ == '__main__':
+    unittest.main()
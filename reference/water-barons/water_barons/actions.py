@@ -0,0 +1,49 @@
+"""Plain-data descriptions of player decisions.
+
+Ops actions and Crowd-phase sales are expressed as small tuples so that
+non-interactive players (bots, simulations, replays) can hand them to
+`GameLogic.apply_action` / `GameLogic.resolve_sales` instead of driving the
+`action_*` methods with live card objects the way the CLI does.
+"""
+from typing import NamedTuple, Tuple
+
+# Number of cards shown from the top of each deck when buying, as in the CLI.
+MARKET_SIZE = 3
+
+# Ops action kinds. The names match the `action_type` values used by the webapp.
+BUILD_FACILITY = "build_facility"          # args: (market_index, slot_index)
+PRODUCE_WATER = "produce_water"            # args: (facility_slot_index,)
+BUILD_DISTRIBUTION = "build_distribution"  # args: (market_index, slot_index)
+ADD_UPGRADE = "add_upgrade"                # args: (market_index, 'facility' | 'route', slot_index)
+SPECULATE = "speculate"                    # args: ('long' | 'short', track_name)
+BUY_EVENT_OPTION = "buy_event_option"      # args: (event_name,)
+PASS = "pass"                              # args: ()
+
+# Not an Ops action: the Whim draft pick offered to the player whose pick it is.
+DRAFT_PICK = "draft_pick"                  # args: (option_index,)
+
+ACTION_KINDS = (
+    BUILD_FACILITY, PRODUCE_WATER, BUILD_DISTRIBUTION, ADD_UPGRADE,
+    SPECULATE, BUY_EVENT_OPTION, PASS,
+)
+
+EVENT_OPTION_COST = 4
+SPECULATE_COST = 2
+MAX_FUTURES_TOKENS = 3
+
+
+class Action(NamedTuple):
+    """A single Ops action, e.g. Action(BUILD_FACILITY, (0, 2))."""
+    kind: str
+    args: Tuple = ()
+
+
+class Sale(NamedTuple):
+    """Sell `quantity` cubes from one water batch to a demand segment via a route slot."""
+    segment_name: str
+    batch_index: int
+    route_slot: int
+    quantity: int
+
+
+PASS_ACTION = Action(PASS)
@@ -0,0 +1,100 @@
+"""Micro-benchmarks for copying and saving game states.
+
+Compares `GameState.fork()` with a `pickle` round trip on a mid-game state, and
+the binary save format (water_barons/savefile.py) with pickle in round-trip time
+and size, e.g.:
+
+    python -m water_barons.bench --rounds 5 --repeat 2000
+"""
+import argparse
+import pickle
+import random
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from water_barons.game_logic import GameLogic
+from water_barons.game_log import LogLevel
+from water_barons.policies import GreedyPolicy, make_callbacks
+from water_barons.savefile import decode_state, encode_state
+
+
+def midgame(rounds: int = 5, seed: int = 0, num_players: int = 3) -> GameLogic:
+    """A game played `rounds` rounds into by greedy bots, with a full game log."""
+    player_names = [f"P{i + 1}" for i in range(num_players)]
+    game = GameLogic(num_players=num_players, player_names=player_names, seed=seed)
+    policies = {name: GreedyPolicy(random.Random(seed * 1009 + seat)) for seat, name in enumerate(player_names)}
+    game.run_game(make_callbacks(game, policies), max_rounds=rounds)
+    return game
+
+
+def time_per_call(fn: Callable[[], object], repeat: int) -> float:
+    """Mean seconds per call of `fn` over `repeat` calls."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_copy(game: GameLogic, repeat: int = 1000) -> Dict[str, float]:
+    """Seconds per copy of `game.game_state` for each copying method."""
+    gs = game.game_state
+    return {
+        'fork': time_per_call(gs.fork, repeat),
+        'fork_nolog': time_per_call(lambda: gs.fork(LogLevel.OFF), repeat),
+        'pickle': time_per_call(lambda: pickle.loads(pickle.dumps(gs, pickle.HIGHEST_PROTOCOL)), repeat),
+    }
+
+
+def bench_save(game: GameLogic, repeat: int = 200) -> Dict[str, Tuple[float, int]]:
+    """(seconds per save-and-load round trip, bytes saved) of `game.game_state` for each save format."""
+    gs = game.game_state
+    formats = {
+        'pickle': (lambda: pickle.dumps(gs, pickle.HIGHEST_PROTOCOL), pickle.loads),
+        'pickle_zlib': (lambda: zlib.compress(pickle.dumps(gs, pickle.HIGHEST_PROTOCOL), 6),
+                        lambda data: pickle.loads(zlib.decompress(data))),
+        'binary': (lambda: encode_state(gs, compress=False), decode_state),
+        'binary_zlib': (lambda: encode_state(gs), decode_state),
+    }
+    results = {}
+    for name, (save, load) in formats.items():
+        size = len(save())
+        results[name] = (time_per_call(lambda: load(save()), repeat), size)
+    return results
+
+
+def format_save_results(results: Dict[str, Tuple[float, int]]) -> str:
+    baseline_seconds, baseline_size = results['pickle']
+    return "\n".join(
+        f"  {name:<11} {seconds * 1e6:9.1f} us/round trip {size:7d} bytes"
+        f"  ({baseline_seconds / seconds:4.1f}x the speed, {size / baseline_size:4.0%} of the size of pickle)"
+        for name, (seconds, size) in results.items()
+    )
+
+
+def format_results(results: Dict[str, float]) -> str:
+    baseline = results['pickle']
+    return "\n".join(
+        f"  {name:<11} {seconds * 1e6:9.1f} us/copy  ({baseline / seconds:5.1f}x vs pickle)"
+        for name, seconds in results.items()
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark copying Water Barons game states.")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds to play before copying")
+    parser.add_argument("--players", type=int, default=3, help="Number of players")
+    parser.add_argument("--repeat", type=int, default=2000, help="Copies per method")
+    parser.add_argument("--save-repeat", type=int, default=200, help="Save-and-load round trips per format")
+    parser.add_argument("--seed", type=int, default=0, help="Game seed")
+    args = parser.parse_args(argv)
+
+    game = midgame(args.rounds, args.seed, args.players)
+    print(f"Game state at round {game.game_state.round_number}, {len(game.game_state.game_log)} log records:")
+    print(format_results(bench_copy(game, args.repeat)))
+    print("Saving and loading:")
+    print(format_save_results(bench_save(game, args.save_repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,11 @@ try:
 except ModuleNotFoundError:  # pragma: no cover - fallback for older Python
     import tomli as tomllib
 from water_barons.game_entities import (
-    FacilityCard, DistributionCard, UpgradeCard, WhimCard, GlobalEventCard,
-    TrackColor
+    Card, CardType, FacilityCard, DistributionCard, UpgradeCard, WhimCard, GlobalEventCard,
+    TrackColor, ImpactProfile
+)
+from water_barons.effects import (
+    EffectError, compile_upgrade_effect, compile_whim_pre_effect, compile_whim_fallout
 )
 
 _DATA_FILE = Path(
@@ -24,12 +27,55 @@ WHIMS_DATA = _RAW_DATA.get("whims", [])
 GLOBAL_EVENTS_DATA = _RAW_DATA.get("global_events", [])
 ACTIONS_DATA = _RAW_DATA.get("actions", [])
 
-def _convert_profile(profile_dict: dict) -> dict:
-    return {TrackColor[key]: value for key, value in profile_dict.items()}
+
+def _compile_content_effects() -> None:
+    """Compile every effect string in the content file, reporting all malformed ones at once."""
+    problems = []
+    sources = [(UPGRADES_DATA, "effect_description", compile_upgrade_effect)]
+    sources += [(WHIMS_DATA, "pre_round_effect", compile_whim_pre_effect),
+                (WHIMS_DATA, "post_round_fallout", compile_whim_fallout)]
+    for entries, field, compiler in sources:
+        for data in entries:
+            text = data.get(field, "")
+            try:
+                compiler(text)
+            except EffectError as e:
+                problems.append(f"{data.get('name', '?')}: {field} '{text}': {e}")
+    if problems:
+        raise EffectError(f"Malformed effects in {_DATA_FILE}:\n  " + "\n  ".join(problems))
+
+
+_compile_content_effects()
+
+# Stable integer IDs for the card definitions: numbered in content-file order, kind by kind in
+# this order, so the same content file always gives the same IDs. Copies of a card share its ID.
+_CARD_KINDS = (
+    (CardType.FACILITY, FACILITIES_DATA),
+    (CardType.DISTRIBUTION, DISTRIBUTION_DATA),
+    (CardType.UPGRADE, UPGRADES_DATA),
+    (CardType.WHIM, WHIMS_DATA),
+    (CardType.GLOBAL_EVENT, GLOBAL_EVENTS_DATA),
+)
+_FIRST_CARD_ID: dict[CardType, int] = {}
+CARD_IDS: dict[tuple[CardType, str], int] = {} # (card type, name) -> ID of its first definition
+_next_id = 0
+for _card_type, _entries in _CARD_KINDS:
+    _FIRST_CARD_ID[_card_type] = _next_id
+    for _data in _entries:
+        CARD_IDS.setdefault((_card_type, _data["name"]), _next_id)
+        _next_id += 1
+
+
+def _with_id(card: Card, card_type: CardType, index: int) -> Card:
+    card.card_id = _FIRST_CARD_ID[card_type] + index
+    return card
+
+def _convert_profile(profile_dict: dict) -> ImpactProfile:
+    return ImpactProfile({TrackColor[key]: value for key, value in profile_dict.items()})
 
 def get_all_facility_cards() -> list[FacilityCard]:
     cards: list[FacilityCard] = []
-    for data in FACILITIES_DATA:
+    for index, data in enumerate(FACILITIES_DATA):
         impact_profile = _convert_profile(data.get("impact_profile", {}))
         card = FacilityCard(
             name=data["name"],
@@ -38,12 +84,13 @@ def get_all_facility_cards() -> list[FacilityCard]:
             impact_profile=impact_profile,
             tags=data.get("tags", []),
         )
+        _with_id(card, card.card_type, index)
         cards.extend([card] * int(data.get("copies", 1)))
     return cards
 
 def get_all_distribution_cards() -> list[DistributionCard]:
     cards: list[DistributionCard] = []
-    for data in DISTRIBUTION_DATA:
+    for index, data in enumerate(DISTRIBUTION_DATA):
         impact_mod = {}
         for key, details in data.get("impact_modifier", {}).items():
             mod = details.copy()
@@ -57,45 +104,59 @@ def get_all_distribution_cards() -> list[DistributionCard]:
             impact_modifier=impact_mod,
             special_effect=data.get("special_effect"),
         )
+        _with_id(card, card.card_type, index)
         cards.extend([card] * int(data.get("copies", 1)))
     return cards
 
 def get_all_upgrade_cards() -> list[UpgradeCard]:
     cards: list[UpgradeCard] = []
-    for data in UPGRADES_DATA:
+    for index, data in enumerate(UPGRADES_DATA):
         card = UpgradeCard(
             name=data["name"],
             cost=data["cost"],
             description=data["description"],
             effect_description=data["effect_description"],
             type=data.get("type", "GENERIC_UPGRADE"),
+            effect=compile_upgrade_effect(data["effect_description"]),
         )
+        _with_id(card, card.card_type, index)
         cards.extend([card] * int(data.get("copies", 1)))
     return cards
 
 def get_all_whim_cards() -> list[WhimCard]:
     cards: list[WhimCard] = []
-    for data in WHIMS_DATA:
+    for index, data in enumerate(WHIMS_DATA):
         card = WhimCard(
             name=data["name"],
             trigger_condition=data["trigger_condition"],
             pre_round_effect=data["pre_round_effect"],
             demand_shift=data.get("demand_shift", {}),
             post_round_fallout=data["post_round_fallout"],
+            pre_effect=compile_whim_pre_effect(data["pre_round_effect"]),
+            post_effect=compile_whim_fallout(data["post_round_fallout"]),
         )
+        _with_id(card, card.card_type, index)
         cards.extend([card] * int(data.get("copies", 1)))
     return cards
 
 def get_all_global_event_tiles() -> list[GlobalEventCard]:
     cards = []
-    for data in GLOBAL_EVENTS_DATA:
+    for index, data in enumerate(GLOBAL_EVENTS_DATA):
         card = GlobalEventCard(
             name=data["name"],
             trigger_track=TrackColor[data["trigger_track"]],
             trigger_threshold=data["trigger_threshold"],
             effect_description=data["effect_description"],
         )
-        cards.append(card)
+        cards.append(_with_id(card, CardType.GLOBAL_EVENT, index))
+    return cards
+
+def card_definitions() -> list[Card]:
+    """One card per definition in the content file, in card ID order."""
+    cards: list[Card] = []
+    for loader in (get_all_facility_cards, get_all_distribution_cards, get_all_upgrade_cards,
+                   get_all_whim_cards, get_all_global_event_tiles):
+        cards.extend({card.card_id: card for card in loader()}.values())
     return cards
 
 # ACTIONS_DATA is exported for external use
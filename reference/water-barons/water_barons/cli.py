@@ -121,7 +121,7 @@ class CLI:
 
     def _handle_player_action_choice(self, player, action_num: int):
         """CLI callback for player to choose an action during Ops Phase.
-        This function is called by GameLogic.ops_phase.
+        This function is called by GameLogic.run_round.
         It then calls the specific game_logic.action_* methods.
         """
         self._display_player_dashboard(player)
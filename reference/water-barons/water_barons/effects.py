@@ -0,0 +1,244 @@
+"""Compiled card effects.
+
+Upgrade, Whim pre-round and Whim fallout effects are written as small strings in
+`game_content.toml`, e.g.::
+
+    Apply_to_facility: reduce_impact_per_flow(TrackColor.PINK, 1)
+    DemandSegment:Connoisseurs:current_demand:+2
+    GlobalImpact:PINK:+2
+
+This module parses each string once into an immutable, typed effect object.
+`cards.py` compiles all content when it is loaded, so malformed effects surface
+as an `EffectError` at load time and the game loop only dispatches on the
+compiled objects.
+"""
+from functools import lru_cache
+from typing import NamedTuple, Optional, Union
+import re
+
+from water_barons.game_entities import TrackColor
+from water_barons import game_metadata
+
+
+class EffectError(ValueError):
+    """Raised when an effect string cannot be compiled."""
+
+
+# --- Upgrade effects ---
+
+class ReduceImpactPerFlow(NamedTuple):
+    """Facility upgrade: each Flow of the facility adds `amount` less of `track`."""
+    track: TrackColor
+    amount: int
+
+
+class OnSellRemoveImpact(NamedTuple):
+    """Route upgrade: remove `amount` of `track` from storage after selling via the route."""
+    track: TrackColor
+    amount: int
+
+
+class AtCleanupReduceGlobalImpact(NamedTuple):
+    """Facility tag: lower the global `track` by `amount` during the Threshold Check."""
+    track: TrackColor
+    amount: int
+
+
+class ReduceFacilityImpactType(NamedTuple):
+    """R&D passive: facilities tagged `tag` add `amount` less of `track` per Flow."""
+    tag: str
+    track: TrackColor
+    amount: int
+
+
+# --- Whim effects ---
+
+class DemandShift(NamedTuple):
+    """Change `attribute` of one demand segment by `value`."""
+    segment: str
+    attribute: str
+    value: int
+
+
+class AllSegmentsShift(NamedTuple):
+    """Change `attribute` of every demand segment by `value`."""
+    attribute: str
+    value: int
+
+
+class GlobalImpact(NamedTuple):
+    """Add `value` (possibly negative) to a global impact track."""
+    track: TrackColor
+    value: int
+
+
+class PlayerEffect(NamedTuple):
+    """Change a numeric attribute of the players selected by `target` by `value`."""
+    target: str
+    attribute: str
+    value: int
+
+
+class NoEffect(NamedTuple):
+    """An empty effect string."""
+
+
+class InvalidEffect(NamedTuple):
+    """
+    An effect that failed to compile. Only produced for cards that were not loaded
+    through `cards.py` (content files raise `EffectError` instead), so that the
+    game loop can log the problem the way it always has.
+    """
+    text: str
+    error: str
+
+
+Effect = Union[
+    ReduceImpactPerFlow, OnSellRemoveImpact, AtCleanupReduceGlobalImpact, ReduceFacilityImpactType,
+    DemandShift, AllSegmentsShift, GlobalImpact, PlayerEffect, NoEffect, InvalidEffect,
+]
+
+NO_EFFECT = NoEffect()
+
+SEGMENT_ATTRIBUTES = ("current_demand", "current_price")
+PLAYER_ATTRIBUTES = ("cred_coin", "reputation_stars")
+PLAYER_TARGETS = ("EcoEliteBuyers",)
+
+_CALL_RE = re.compile(r"^\s*(?:(\w+)\s*:\s*)?(\w+)\s*\((.*)\)\s*$")
+
+
+def _parse_track(text: str) -> TrackColor:
+    name = text.strip()
+    if name.startswith("TrackColor."):
+        name = name[len("TrackColor."):]
+    try:
+        return TrackColor[name.upper()]
+    except KeyError:
+        raise EffectError(f"unknown track '{text.strip()}'") from None
+
+
+def _parse_int(text: str) -> int:
+    try:
+        return int(text.strip())
+    except ValueError:
+        raise EffectError(f"expected an integer, got '{text.strip()}'") from None
+
+
+def _expect_args(name: str, args: list, count: int):
+    if len(args) != count:
+        raise EffectError(f"{name}() takes {count} arguments, got {len(args)}")
+
+
+def _parse_upgrade_effect(text: str) -> Effect:
+    match = _CALL_RE.match(text)
+    if not match:
+        raise EffectError("expected 'Scope: function(arguments)'")
+    _scope, name, arg_text = match.groups()
+    args = [a.strip() for a in arg_text.split(",")] if arg_text.strip() else []
+
+    if name in ("reduce_impact_per_flow", "on_sell_remove_impact", "at_cleanup_reduce_global_impact"):
+        _expect_args(name, args, 2)
+        effect_type = {
+            "reduce_impact_per_flow": ReduceImpactPerFlow,
+            "on_sell_remove_impact": OnSellRemoveImpact,
+            "at_cleanup_reduce_global_impact": AtCleanupReduceGlobalImpact,
+        }[name]
+        return effect_type(_parse_track(args[0]), _parse_int(args[1]))
+    if name == "reduce_facility_impact_type":
+        _expect_args(name, args, 3)
+        return ReduceFacilityImpactType(args[0].strip("'\""), _parse_track(args[1]), _parse_int(args[2]))
+    raise EffectError(f"unknown upgrade effect '{name}'")
+
+
+def _parse_whim_pre_effect(text: str) -> Effect:
+    if not text.strip():
+        return NO_EFFECT
+    parts = text.split(':')
+    effect_type = parts[0]
+    if effect_type == "DemandSegment":
+        if len(parts) != 4:
+            raise EffectError("expected 'DemandSegment:<segment>:<attribute>:<value>'")
+        segment, attribute, value = parts[1], parts[2], _parse_int(parts[3])
+        known_segments = [d["name"] for d in game_metadata.DEMAND_SEGMENTS_DATA]
+        if segment not in known_segments:
+            raise EffectError(f"unknown demand segment '{segment}'")
+        if attribute not in SEGMENT_ATTRIBUTES:
+            raise EffectError(f"unknown demand segment attribute '{attribute}'")
+        return DemandShift(segment, attribute, value)
+    if effect_type == "AllSegments":
+        if len(parts) != 3:
+            raise EffectError("expected 'AllSegments:<attribute>:<value>'")
+        if parts[1] not in SEGMENT_ATTRIBUTES:
+            raise EffectError(f"unknown demand segment attribute '{parts[1]}'")
+        return AllSegmentsShift(parts[1], _parse_int(parts[2]))
+    raise EffectError(f"unknown pre-round effect type '{effect_type}'")
+
+
+def _parse_whim_fallout(text: str) -> Effect:
+    if not text.strip():
+        return NO_EFFECT
+    parts = text.split(':')
+    effect_type = parts[0]
+    if effect_type == "GlobalImpact":
+        if len(parts) != 3:
+            raise EffectError("expected 'GlobalImpact:<track>:<value>'")
+        return GlobalImpact(_parse_track(parts[1]), _parse_int(parts[2]))
+    if effect_type == "PlayerEffect":
+        if len(parts) != 4:
+            raise EffectError("expected 'PlayerEffect:<target>:<attribute>:<value>'")
+        target, attribute, value = parts[1], parts[2], _parse_int(parts[3])
+        if target not in PLAYER_TARGETS:
+            raise EffectError(f"unknown player target '{target}'")
+        if attribute not in PLAYER_ATTRIBUTES:
+            raise EffectError(f"unknown player attribute '{attribute}'")
+        return PlayerEffect(target, attribute, value)
+    raise EffectError(f"unknown post-fallout effect type '{effect_type}'")
+
+
+@lru_cache(maxsize=None)
+def compile_upgrade_effect(text: str) -> Effect:
+    """Compiles an upgrade's `effect_description`. Raises EffectError if malformed."""
+    return _parse_upgrade_effect(text)
+
+
+@lru_cache(maxsize=None)
+def compile_whim_pre_effect(text: str) -> Effect:
+    """Compiles a Whim's `pre_round_effect`. Raises EffectError if malformed."""
+    return _parse_whim_pre_effect(text)
+
+
+@lru_cache(maxsize=None)
+def compile_whim_fallout(text: str) -> Effect:
+    """Compiles a Whim's `post_round_fallout`. Raises EffectError if malformed."""
+    return _parse_whim_fallout(text)
+
+
+def _compile_or_invalid(compiler, text: str) -> Effect:
+    try:
+        return compiler(text)
+    except EffectError as e:
+        return InvalidEffect(text, str(e))
+
+
+def upgrade_effect(card) -> Effect:
+    """Returns the compiled effect of an UpgradeCard, compiling it on first use if needed."""
+    effect: Optional[Effect] = card.effect
+    if effect is None:
+        effect = card.effect = _compile_or_invalid(compile_upgrade_effect, card.effect_description)
+    return effect
+
+
+def whim_pre_effect(card) -> Effect:
+    """Returns the compiled pre-round effect of a WhimCard, compiling it on first use if needed."""
+    effect: Optional[Effect] = card.pre_effect
+    if effect is None:
+        effect = card.pre_effect = _compile_or_invalid(compile_whim_pre_effect, card.pre_round_effect)
+    return effect
+
+
+def whim_fallout(card) -> Effect:
+    """Returns the compiled post-round fallout of a WhimCard, compiling it on first use if needed."""
+    effect: Optional[Effect] = card.post_effect
+    if effect is None:
+        effect = card.post_effect = _compile_or_invalid(compile_whim_fallout, card.post_round_fallout)
+    return effect
@@ -0,0 +1,282 @@
+"""Gym-style training environment.
+
+`WaterBaronsEnv` seats one learning agent among bot opponents. `reset()` and
+`step(action_id)` follow the Gymnasium conventions: `reset` returns
+`(observation, info)` and `step` returns `(observation, reward, terminated,
+truncated, info)`. Every `info` carries `action_mask`, a boolean array over
+`ACTIONS` built from `GameLogic.legal_actions`.
+
+The agent is asked for its Whim draft picks and Ops actions. Its Crowd-phase
+sales are made by `greedy_sales`. Observations are fixed-size float32 arrays
+(see `observation_size`). The reward is 0 until the game ends, then +1 if the
+agent ranks first and -1 otherwise.
+
+`VectorEnv` steps many environments in lockstep and returns batched arrays,
+resetting finished environments automatically.
+
+NumPy is needed for this module only, so the rest of the game runs without it.
+"""
+import random
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without NumPy
+    np = None
+
+from water_barons import game_metadata
+from water_barons.actions import (
+    Action, MARKET_SIZE, PASS, PRODUCE_WATER, BUILD_FACILITY, BUILD_DISTRIBUTION, ADD_UPGRADE,
+    SPECULATE, BUY_EVENT_OPTION, DRAFT_PICK,
+)
+from water_barons.cards import GLOBAL_EVENTS_DATA
+from water_barons.game_entities import Player, TrackColor
+from water_barons.game_log import LogLevel
+from water_barons.game_logic import GameLogic, FACILITY_UPGRADE_TYPES, PendingDecision
+from water_barons.game_state import Phase, RuleFlag
+from water_barons.policies import POLICIES, Policy, greedy_sales
+
+_FACILITY_SLOTS = len(Player("").facilities)
+_ROUTE_SLOTS = len(Player("").distribution_routes)
+_DRAFT_OPTIONS = 3
+_EVENT_NAMES = [event_data["name"] for event_data in GLOBAL_EVENTS_DATA]
+_SEGMENT_NAMES = [segment_data["name"] for segment_data in game_metadata.DEMAND_SEGMENTS_DATA]
+_RULE_FLAGS = [int(flag) for flag in RuleFlag if flag] # Plain ints: IntFlag operators are slow
+
+
+def _action_table() -> Tuple[Action, ...]:
+    actions = [Action(PASS)]
+    actions += [Action(PRODUCE_WATER, (slot,)) for slot in range(_FACILITY_SLOTS)]
+    for market_index in range(MARKET_SIZE):
+        actions += [Action(BUILD_FACILITY, (market_index, slot)) for slot in range(_FACILITY_SLOTS)]
+    for market_index in range(MARKET_SIZE):
+        actions += [Action(BUILD_DISTRIBUTION, (market_index, slot)) for slot in range(_ROUTE_SLOTS)]
+    for market_index in range(MARKET_SIZE):
+        actions += [Action(ADD_UPGRADE, (market_index, 'facility', slot)) for slot in range(_FACILITY_SLOTS)]
+        actions.append(Action(ADD_UPGRADE, (market_index, 'route', 0)))
+    for track in TrackColor:
+        actions += [Action(SPECULATE, ('long', track.name)), Action(SPECULATE, ('short', track.name))]
+    actions += [Action(BUY_EVENT_OPTION, (name,)) for name in _EVENT_NAMES]
+    actions += [Action(DRAFT_PICK, (i,)) for i in range(_DRAFT_OPTIONS)]
+    return tuple(actions)
+
+
+ACTIONS: Tuple[Action, ...] = _action_table()  # action_id -> Action
+ACTION_IDS: Dict[Action, int] = {action: i for i, action in enumerate(ACTIONS)}
+
+# Observation layout: global features, then one block per seat starting with the agent's
+_GLOBAL_FEATURES = (
+    1 + 2 + 1                               # round, decision kind (draft, ops), action number
+    + len(TrackColor) + len(_RULE_FLAGS) + len(_EVENT_NAMES)
+    + 2 * len(_SEGMENT_NAMES)               # demand, price
+    + 3 * MARKET_SIZE + 2 * MARKET_SIZE + 3 * MARKET_SIZE  # facility, route and upgrade markets
+    + 1                                     # draft options on offer
+)
+_PLAYER_FEATURES = 2 + len(TrackColor) + 3 * _FACILITY_SLOTS + _ROUTE_SLOTS + 4
+
+
+def observation_size(num_players: int) -> int:
+    """Length of the observation vector for a game of `num_players`."""
+    return _GLOBAL_FEATURES + num_players * _PLAYER_FEATURES
+
+
+def _market(deck: list) -> list:
+    """The market cards on top of `deck`, padded with None to MARKET_SIZE."""
+    market = deck[:MARKET_SIZE]
+    return market + [None] * (MARKET_SIZE - len(market))
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("water_barons.env needs NumPy; install it with `pip install numpy`.")
+
+
+class WaterBaronsEnv:
+    """
+    One learning agent at seat `seat` against `opponents` (policy names from `POLICIES` or
+    `Policy` instances, one per other seat). Games are capped at `max_rounds` rounds.
+    """
+
+    def __init__(self, opponents: Sequence[Union[str, Policy]] = ("greedy",), seat: int = 0,
+                 max_rounds: int = 30, seed: Optional[int] = None, log_level: LogLevel = LogLevel.OFF):
+        _require_numpy()
+        self.num_players = len(opponents) + 1
+        if not 0 <= seat < self.num_players:
+            raise ValueError(f"Seat {seat} does not exist in a {self.num_players}-player game.")
+        self.seat = seat
+        self.max_rounds = max_rounds
+        self.log_level = log_level
+        self.rng = random.Random(seed)
+        self._opponent_specs = list(opponents)
+        self.player_names = [f"P{i + 1}" for i in range(self.num_players)]
+        self.observation_size = observation_size(self.num_players)
+        self.num_actions = len(ACTIONS)
+        self.game: Optional[GameLogic] = None
+        self.policies: Dict[int, Policy] = {}
+        self._decision: Optional[PendingDecision] = None  # The agent's decision being asked for
+        self.done = True
+
+    # --- Gym API ---
+
+    def reset(self, seed: Optional[int] = None) -> Tuple["np.ndarray", dict]:
+        """Starts a new game (seeded from `seed`, else from the environment's RNG)."""
+        if seed is not None:
+            self.rng.seed(seed)
+        game_seed = self.rng.getrandbits(63)
+        self.game = GameLogic(self.num_players, self.player_names, seed=game_seed, log_level=self.log_level)
+        seats = [i for i in range(self.num_players) if i != self.seat]
+        self.policies = {
+            seat: POLICIES[spec](random.Random(game_seed + seat)) if isinstance(spec, str) else spec
+            for seat, spec in zip(seats, self._opponent_specs)
+        }
+        self.done = False
+        self.game.start_round()
+        self._advance()
+        return self.observation(), {'action_mask': self.action_mask(), 'seed': game_seed}
+
+    def step(self, action_id: int) -> Tuple["np.ndarray", float, bool, bool, dict]:
+        """
+        Takes ACTIONS[action_id] for the agent and plays on until its next decision or the end.
+        An action outside the mask is wasted (a draft pick passes, an Ops action does nothing).
+        """
+        if self.done:
+            raise RuntimeError("step() called on a finished game; call reset() first.")
+        # An Action of the wrong kind is an invalid choice: a draft pick passes, an Ops action does nothing
+        self.game.submit(self._decision.player, ACTIONS[int(action_id)])
+        self._advance()
+        reward = 0.0
+        info = {'action_mask': self.action_mask()}
+        if self.done:
+            ranking = self.game.final_scoring()
+            won = bool(ranking) and ranking[0][0] == self.player_names[self.seat]
+            reward = 1.0 if won else -1.0
+            info['ranking'] = ranking
+        truncated = self.done and not self.game.game_state.uninhaitable
+        return self.observation(), reward, self.done and not truncated, truncated, info
+
+    # --- Internals ---
+
+    def _advance(self) -> None:
+        """Answers bot decisions (and the agent's sales) until the agent must decide or the game ends."""
+        game = self.game
+        gs = game.game_state
+        agent = gs.players[self.seat]
+        while True:
+            decision = game.pending_decision()
+            if decision is None:
+                if gs.phase == Phase.GAME_OVER or gs.round_number >= self.max_rounds:
+                    self._decision = None
+                    self.done = True
+                    return
+                game.start_next_round()
+                continue
+            player = decision.player
+            if player is agent:
+                if decision.phase != Phase.CROWD_SALES:
+                    self._decision = decision
+                    return
+                answer = greedy_sales(game, player, decision.options)
+            else:
+                answer = self.policies[gs.players.index(player)].decide(game, decision)
+            game.submit(player, answer)
+
+    def action_mask(self, out: Optional["np.ndarray"] = None) -> "np.ndarray":
+        """Booleans over ACTIONS: which actions the agent can take now (all False once the game is over)."""
+        mask = np.zeros(len(ACTIONS), dtype=bool) if out is None else out
+        mask[:] = False
+        if not self.done:
+            for action in self.game.legal_actions(self.game.game_state.players[self.seat]):
+                mask[ACTION_IDS[action]] = True
+        return mask
+
+    def observation(self, out: Optional["np.ndarray"] = None) -> "np.ndarray":
+        """The agent's view of the game as a float32 vector (written into `out` if given)."""
+        features = self._features()
+        if out is None:
+            return np.asarray(features, dtype=np.float32)
+        out[:] = features
+        return out
+
+    def _features(self) -> List[float]:
+        gs = self.game.game_state
+        kind = self._decision.phase if self._decision else None
+        f: List[float] = [gs.round_number, kind == Phase.WHIM_DRAFT, kind == Phase.OPS,
+                          self._decision.number if kind == Phase.OPS else 0]
+        f += [track.level for track in gs.impact_tracks.values()] # Metadata order, the same in every game
+        rule_flags = int(gs.rule_flags)
+        f += [rule_flags & flag != 0 for flag in _RULE_FLAGS]
+        active = {event_card.name for event_card in gs.global_event_tiles_active}
+        f += [name in active for name in _EVENT_NAMES]
+        for name in _SEGMENT_NAMES:
+            segment = gs.demand_segments.get(name)
+            f += [segment.current_demand, segment.current_price] if segment else [0, 0]
+        for card in _market(gs.facility_deck):
+            f += (1, card.cost, card.base_output) if card else (0, 0, 0)
+        for card in _market(gs.distribution_deck):
+            f += (1, card.cost) if card else (0, 0)
+        for card in _market(gs.upgrade_deck):
+            f += (1, card.cost, card.type in FACILITY_UPGRADE_TYPES) if card else (0, 0, 0)
+        f.append(len(self._decision.options) if kind == Phase.WHIM_DRAFT else 0)
+
+        for offset in range(self.num_players):
+            player = gs.players[(self.seat + offset) % self.num_players]
+            f += [player.cred_coin, player.reputation_stars]
+            f += player.impact_storage.amounts
+            for facility in player.facilities:
+                f += (1, facility.base_output, len(facility.upgrades)) if facility else (0, 0, 0)
+            f += [route is not None and route.is_active for route in player.distribution_routes]
+            f += [len(player.futures_tokens), len(player.event_options),
+                  player.get_total_water_produced(), len(player.routes_built_this_game)]
+        return f
+
+
+class VectorEnv:
+    """
+    `num_envs` environments stepped in lockstep. Observations, rewards, flags and masks come
+    back as batched arrays; an environment that finishes is reset at once, and its returned
+    row is the first observation of the new game (the finished game's ranking is in
+    `infos['final_ranking']`).
+    """
+
+    def __init__(self, num_envs: int, opponents: Sequence[Union[str, Policy]] = ("greedy",), seat: int = 0,
+                 max_rounds: int = 30, seed: Optional[int] = None):
+        _require_numpy()
+        seeds = random.Random(seed)
+        self.envs = [WaterBaronsEnv(opponents, seat, max_rounds, seed=seeds.getrandbits(63))
+                     for _ in range(num_envs)]
+        self.num_envs = num_envs
+        self.observation_size = self.envs[0].observation_size
+        self.num_actions = len(ACTIONS)
+        self._obs = np.zeros((num_envs, self.observation_size), dtype=np.float32)
+        self._masks = np.zeros((num_envs, self.num_actions), dtype=bool)
+
+    def reset(self, seed: Optional[int] = None) -> Tuple["np.ndarray", dict]:
+        seeds = random.Random(seed)
+        for i, env in enumerate(self.envs):
+            env.reset(seeds.getrandbits(63) if seed is not None else None)
+            env.observation(self._obs[i])
+            env.action_mask(self._masks[i])
+        return self._obs.copy(), {'action_mask': self._masks.copy()}
+
+    def step(self, action_ids) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray", dict]:
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        final_ranking = [None] * self.num_envs
+        for i, (env, action_id) in enumerate(zip(self.envs, action_ids)):
+            _, rewards[i], terminated[i], truncated[i], info = env.step(action_id)
+            if env.done:
+                final_ranking[i] = info.get('ranking')
+                env.reset()
+            env.observation(self._obs[i])
+            env.action_mask(self._masks[i])
+        return self._obs.copy(), rewards, terminated, truncated, {
+            'action_mask': self._masks.copy(), 'final_ranking': final_ranking,
+        }
+
+    def sample_legal_actions(self, rng: Optional["np.random.Generator"] = None) -> "np.ndarray":
+        """A uniformly random legal action per environment, e.g. for smoke tests and baselines."""
+        rng = rng if rng is not None else np.random.default_rng()
+        scores = rng.random(self._masks.shape)
+        scores[~self._masks] = -1.0
+        return scores.argmax(axis=1)
@@ -1,5 +1,7 @@
+import copy
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Mapping, Iterator, Tuple, Union
 
 class TrackColor(Enum):
     PINK = auto()    # μP – Microplastics
@@ -7,6 +9,69 @@ class TrackColor(Enum):
     BLUE = auto()    # DEP – Depletion
     GREEN = auto()   # TOX – Chemical Residue
 
+# Slot of each track in ImpactProfile arrays (a plain attribute is cheaper to read than `.value`)
+for _index, _color in enumerate(TrackColor):
+    _color.index = _index
+
+class ImpactProfile:
+    """
+    Amounts per impact track, stored as a fixed 4-slot array indexed by TrackColor.
+    Reads like the Dict[TrackColor, int] it replaces: a missing track is 0, and
+    iteration, `items()` and `len()` cover the tracks with a non-zero amount.
+    """
+    __slots__ = ("amounts",)
+
+    def __init__(self, profile: Optional[Mapping[TrackColor, int]] = None):
+        self.amounts: List[int] = [0, 0, 0, 0]
+        if profile:
+            for color, amount in profile.items():
+                self.amounts[color.index] = amount
+
+    def __getitem__(self, color: TrackColor) -> int:
+        return self.amounts[color.index]
+
+    def __setitem__(self, color: TrackColor, amount: int):
+        self.amounts[color.index] = amount
+
+    def get(self, color: TrackColor, default: int = 0) -> int:
+        return self.amounts[color.index] or default
+
+    def __contains__(self, color: object) -> bool:
+        return isinstance(color, TrackColor) and self.amounts[color.index] != 0
+
+    def keys(self) -> List[TrackColor]:
+        return [color for color in TrackColor if self.amounts[color.index]]
+
+    def values(self) -> List[int]:
+        return [amount for amount in self.amounts if amount]
+
+    def items(self) -> List[Tuple[TrackColor, int]]:
+        return [(color, self.amounts[color.index]) for color in TrackColor if self.amounts[color.index]]
+
+    def __iter__(self) -> Iterator[TrackColor]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return sum(1 for amount in self.amounts if amount)
+
+    def copy(self) -> "ImpactProfile":
+        clone = ImpactProfile()
+        clone.amounts = self.amounts.copy()
+        return clone
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ImpactProfile):
+            return self.amounts == other.amounts
+        if isinstance(other, Mapping):
+            return all(self.amounts[color.index] == other.get(color, 0) for color in TrackColor) and \
+                all(isinstance(color, TrackColor) for color in other)
+        return NotImplemented
+
+    __hash__ = None # Mutable
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
 class CardType(Enum):
     FACILITY = auto()
     DISTRIBUTION = auto()
@@ -16,26 +81,39 @@ class CardType(Enum):
 
 class Card:
     """Base class for all cards in the game."""
+    __slots__ = ("name", "card_type", "cost", "description", "card_id")
+
     def __init__(self, name: str, card_type: CardType, cost: int = 0, description: str = ""):
         self.name = name
         self.card_type = card_type
         self.cost = cost
         self.description = description
+        self.card_id: Optional[int] = None # Set for cards loaded from the content file (see cards.CARD_IDS)
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.name}, Cost: {self.cost})"
 
 class FacilityCard(Card):
     """Represents a facility that produces water."""
-    def __init__(self, name: str, cost: int, base_output: int, impact_profile: Dict[TrackColor, int], tags: List[str] = None):
+    __slots__ = ("base_output", "impact_profile", "tags", "upgrades")
+
+    def __init__(self, name: str, cost: int, base_output: int, impact_profile: Mapping[TrackColor, int], tags: List[str] = None):
         super().__init__(name, CardType.FACILITY, cost)
         self.base_output = base_output
-        self.impact_profile = impact_profile # e.g., {TrackColor.GREY: 1, TrackColor.PINK: 1}
+        self.impact_profile = ImpactProfile(impact_profile) # e.g., {TrackColor.GREY: 1, TrackColor.PINK: 1}
         self.tags = tags if tags else []
         self.upgrades: List[UpgradeCard] = []
 
+    def copy(self) -> "FacilityCard":
+        """A copy with its own upgrades list, e.g. the instance a player builds from a shared deck card."""
+        clone = copy.copy(self)
+        clone.upgrades = self.upgrades.copy()
+        return clone
+
 class DistributionCard(Card):
     """Represents a distribution method for water."""
+    __slots__ = ("impact_modifier", "is_active", "special_effect")
+
     def __init__(self, name: str, cost: int, description: str, impact_modifier: Optional[Dict[str, int]] = None, special_effect: Optional[str] = None): # Added special_effect parameter
         super().__init__(name, CardType.DISTRIBUTION, cost, description)
         self.impact_modifier = impact_modifier if impact_modifier else {}
@@ -49,54 +127,90 @@ class DistributionCard(Card):
         # if name == "Drone Drops" and self.special_effect is None:
         #     self.special_effect = "draw_extra_whim_next_round"
 
+    def copy(self) -> "DistributionCard":
+        """A copy with its own `is_active` flag, e.g. the instance a player builds from a shared deck card."""
+        return copy.copy(self)
+
 
 class UpgradeCard(Card):
     """Represents an upgrade or mitigation that can be applied."""
-    def __init__(self, name: str, cost: int, description: str, effect_description: str, type: str = "GENERIC_UPGRADE"): # Added type
+    __slots__ = ("effect_description", "effect", "type", "target_route_slot")
+
+    def __init__(self, name: str, cost: int, description: str, effect_description: str, type: str = "GENERIC_UPGRADE", effect=None): # Added type
         super().__init__(name, CardType.UPGRADE, cost, description)
         self.effect_description = effect_description
+        self.effect = effect # Compiled form of effect_description (see effects.py)
         self.type = type # e.g., "FACILITY_UPGRADE", "ROUTE_UPGRADE", "R&D", "FACILITY_TAG"
         self.target_route_slot: Optional[int] = None # For route-specific upgrades if needed
 
 class WhimCard(Card):
     """Represents a Whim card that affects demand and game conditions."""
-    def __init__(self, name: str, trigger_condition: str, pre_round_effect: str, demand_shift: Dict[str, int], post_round_fallout: str):
+    __slots__ = ("trigger_condition", "pre_round_effect", "demand_shift", "post_round_fallout", "pre_effect", "post_effect")
+
+    def __init__(self, name: str, trigger_condition: str, pre_round_effect: str, demand_shift: Dict[str, int], post_round_fallout: str,
+                 pre_effect=None, post_effect=None):
         super().__init__(name, CardType.WHIM, 0) # Whims are drafted, not bought
         self.trigger_condition = trigger_condition # e.g., "μP < 5"
         self.pre_round_effect = pre_round_effect
         self.demand_shift = demand_shift # e.g., {"Connoisseurs_demand": 2}
         self.post_round_fallout = post_round_fallout # e.g., "Add +2 μP overall"
+        # Compiled forms of pre_round_effect / post_round_fallout (see effects.py)
+        self.pre_effect = pre_effect
+        self.post_effect = post_effect
 
 class GlobalEventCard(Card):
     """Represents a Global Event tile."""
+    __slots__ = ("trigger_track", "trigger_threshold", "effect_description")
+
     def __init__(self, name: str, trigger_track: TrackColor, trigger_threshold: int, effect_description: str):
         super().__init__(name, CardType.GLOBAL_EVENT, 0)
         self.trigger_track = trigger_track
         self.trigger_threshold = trigger_threshold
         self.effect_description = effect_description
 
+@dataclass(slots=True)
+class WaterBatch:
+    """
+    Water cubes produced by one Flow action. The tags and impact profile are the
+    producing facility's own objects, not copies; treat them as read-only.
+    Also readable as a dict (`batch['quantity']`) like the dicts it replaces.
+    """
+    facility_name: str
+    facility_tags: List[str]
+    base_impact_profile: ImpactProfile
+    quantity: int
+    production_round: int
+
+    # Subscript access maps to attributes; both resolve in C
+    __getitem__ = object.__getattribute__
+    __setitem__ = object.__setattr__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def copy(self) -> "WaterBatch":
+        return WaterBatch(self.facility_name, self.facility_tags, self.base_impact_profile,
+                          self.quantity, self.production_round)
+
+@dataclass(slots=True, eq=False)
 class Player:
     """Represents a player in the game."""
-    def __init__(self, name: str):
-        self.name = name
-        self.cred_coin: int = 10 # Starting cash, placeholder
-        self.facilities: List[Optional[FacilityCard]] = [None] * 3
-        self.distribution_routes: List[Optional[DistributionCard]] = [None] * 2
-        self.r_and_d: List[UpgradeCard] = [] # Passive techs
-        self.impact_storage: Dict[TrackColor, int] = {track: 0 for track in TrackColor}
-        self.total_impact_contributed: Dict[TrackColor, int] = {track: 0 for track in TrackColor} # For tie-breaking
-        self.futures_tokens: List[FutureToken] = [] # Max 3 (track-based futures)
-        self.event_options: List[EventOption] = [] # For event-based futures
-        self.reputation_stars: int = 0
-        self.hand_cards: List[Card] = [] # Could be used for drafting or holding unbuilt facilities
-        # self.water_cubes_produced: int = 0 # Replaced by water_batches
-        self.water_batches: List[Dict[str, any]] = []
-        # Each dict: {'facility_name': str, 'facility_tags': List[str],
-        #             'base_impact_profile': Dict[TrackColor, int], 'quantity': int,
-        #             'production_round': int}
-        self.triggered_global_events: int = 0
-        self.draw_extra_whim_flag: bool = False # For Drone Drops effect
-        self.routes_built_this_game: set[str] = set() # For Diversity Bonus
+    name: str
+    cred_coin: int = field(default=10, init=False) # Starting cash, placeholder
+    facilities: List[Optional[FacilityCard]] = field(default_factory=lambda: [None] * 3, init=False)
+    distribution_routes: List[Optional[DistributionCard]] = field(default_factory=lambda: [None] * 2, init=False)
+    r_and_d: List[UpgradeCard] = field(default_factory=list, init=False) # Passive techs
+    impact_storage: ImpactProfile = field(default_factory=ImpactProfile, init=False)
+    total_impact_contributed: ImpactProfile = field(default_factory=ImpactProfile, init=False) # For tie-breaking
+    futures_tokens: List["FutureToken"] = field(default_factory=list, init=False) # Max 3 (track-based futures)
+    event_options: List["EventOption"] = field(default_factory=list, init=False) # For event-based futures
+    reputation_stars: int = field(default=0, init=False)
+    hand_cards: List[Card] = field(default_factory=list, init=False) # Could be used for drafting or holding unbuilt facilities
+    # Water produced this round, one WaterBatch per Flow action (dicts with the same keys also work)
+    water_batches: List[Union[WaterBatch, Dict[str, any]]] = field(default_factory=list, init=False)
+    triggered_global_events: int = field(default=0, init=False)
+    draw_extra_whim_flag: bool = field(default=False, init=False) # For Drone Drops effect
+    routes_built_this_game: set[str] = field(default_factory=set, init=False) # For Diversity Bonus
 
     def get_total_water_produced(self) -> int:
         """Calculates total water available from all batches."""
@@ -107,6 +221,8 @@ class Player:
 
 class DemandSegment:
     """Represents a customer demand segment."""
+    __slots__ = ("name", "current_demand", "current_price", "values_description")
+
     def __init__(self, name: str, base_demand: int, base_price: int, values_description: str):
         self.name = name
         self.current_demand = base_demand
@@ -117,26 +233,32 @@ class DemandSegment:
     def __repr__(self):
         return f"DemandSegment({self.name}, Demand: {self.current_demand}, Price: {self.current_price})"
 
+@dataclass(slots=True, eq=False)
 class FutureToken:
     """Represents a futures token in the Aqua-Futures Market."""
-    def __init__(self, track: TrackColor, is_long: bool, purchase_price: int = 2):
-        self.track = track
-        self.is_long = is_long # True for Long, False for Short
-        self.purchase_price = purchase_price
-        self.matures_at_increase: Optional[int] = 2 if is_long else None # Increase of >= 2 steps
-        self.matures_at_decrease: Optional[int] = 2 if not is_long else None # Decrease of >=2 steps
-        self.payout = 5
+    track: TrackColor
+    is_long: bool # True for Long, False for Short
+    purchase_price: int = 2
+    matures_at_increase: Optional[int] = field(default=None, init=False) # Increase of >= 2 steps
+    matures_at_decrease: Optional[int] = field(default=None, init=False) # Decrease of >=2 steps
+    payout: int = field(default=5, init=False)
+
+    def __post_init__(self):
+        if self.is_long:
+            self.matures_at_increase = 2
+        else:
+            self.matures_at_decrease = 2
 
     def __repr__(self):
         return f"FutureToken({'Long' if self.is_long else 'Short'} {self.track.name}, Cost: {self.purchase_price})"
 
+@dataclass(slots=True, eq=False)
 class EventOption:
     """Represents an Event Option in the Aqua-Futures Market (Advanced Variant)."""
-    def __init__(self, event_name: str, purchase_price: int = 4, payout: int = 10):
-        self.event_name = event_name # Name of the GlobalEventCard it's tied to
-        self.purchase_price = purchase_price
-        self.payout = payout
-        self.has_matured: bool = False
+    event_name: str # Name of the GlobalEventCard it's tied to
+    purchase_price: int = 4
+    payout: int = 10
+    has_matured: bool = field(default=False, init=False)
 
     def __repr__(self):
         return f"EventOption({self.event_name}, Cost: {self.purchase_price}, Payout: {self.payout})"
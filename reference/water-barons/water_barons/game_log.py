@@ -0,0 +1,89 @@
+"""Structured game log.
+
+Game logic records log entries as a message template plus its arguments, e.g.
+``log.info("{} built {} in slot {}.", player.name, card.name, slot + 1)``, and
+the text is only formatted when someone reads the log. Reading works like the
+old ``List[str]`` log (indexing, slicing, iteration, ``in``, ``len``), so the
+CLI and the web app keep using ``game_log[-20:]`` and friends unchanged.
+
+Headless runs set the level to ``LogLevel.OFF``, which turns every call into an
+early return.
+"""
+from enum import IntEnum
+from typing import Iterator, List, NamedTuple, Optional, Union
+
+
+class LogLevel(IntEnum):
+    DEBUG = 10  # Step-by-step detail (per-upgrade reductions, phase bookkeeping)
+    INFO = 20   # What players see: actions, sales, events, scores
+    OFF = 100   # Null sink: nothing is recorded
+
+
+class LogRecord(NamedTuple):
+    level: LogLevel
+    kind: str     # Message template; identifies the kind of event
+    args: tuple   # Template arguments; a record without arguments is plain text
+
+    @property
+    def text(self) -> str:
+        return self.kind.format(*self.args) if self.args else self.kind
+
+
+class GameLog:
+    """Append-only list of LogRecords that reads like a list of strings."""
+
+    __slots__ = ("level", "_records")
+
+    def __init__(self, level: LogLevel = LogLevel.DEBUG):
+        self.level = level
+        self._records: List[LogRecord] = []
+
+    def enabled_for(self, level: LogLevel) -> bool:
+        return level >= self.level
+
+    def log(self, level: LogLevel, kind: str, *args) -> None:
+        if level >= self.level:
+            self._records.append(LogRecord(level, kind, args))
+
+    def info(self, kind: str, *args) -> None:
+        if LogLevel.INFO >= self.level:
+            self._records.append(LogRecord(LogLevel.INFO, kind, args))
+
+    def debug(self, kind: str, *args) -> None:
+        if LogLevel.DEBUG >= self.level:
+            self._records.append(LogRecord(LogLevel.DEBUG, kind, args))
+
+    def append(self, text: str) -> None:
+        """Records an already formatted message at INFO level (kept for callers of the old list API)."""
+        if LogLevel.INFO >= self.level:
+            self._records.append(LogRecord(LogLevel.INFO, text, ()))
+
+    def copy(self, level: Optional[LogLevel] = None) -> "GameLog":
+        """A copy of the log (records are immutable and shared), optionally at another level."""
+        clone = GameLog(self.level if level is None else level)
+        clone._records = self._records.copy()
+        return clone
+
+    @property
+    def records(self) -> List[LogRecord]:
+        return self._records
+
+    def clear(self) -> None:
+        self._records.clear()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[str]:
+        return (record.text for record in self._records)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [record.text for record in self._records[index]]
+        return self._records[index].text
+
+    def __contains__(self, text: object) -> bool:
+        return any(record.text == text for record in self._records)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
@@ -1,45 +1,87 @@
-import random
-from typing import List, Tuple, Optional, Dict # Added Optional, Dict
-from water_barons.game_state import GameState
+from typing import List, NamedTuple, Tuple, Optional, Dict # Added Optional, Dict
+from water_barons.game_state import GameState, RuleFlag, Phase
+from water_barons.game_log import LogLevel
 from water_barons.game_entities import (
     Player, Card, WhimCard, FacilityCard, DistributionCard,
-    UpgradeCard, FutureToken, TrackColor, GlobalEventCard, EventOption
+    UpgradeCard, FutureToken, TrackColor, GlobalEventCard, EventOption,
+    ImpactProfile, WaterBatch,
 )
 from water_barons.cards import (
     get_all_facility_cards, get_all_distribution_cards,
-    get_all_upgrade_cards, get_all_whim_cards, get_all_global_event_tiles
+    get_all_upgrade_cards, get_all_whim_cards, get_all_global_event_tiles,
+    GLOBAL_EVENTS_DATA,
 )
+from water_barons.effects import (
+    upgrade_effect, whim_pre_effect, whim_fallout, InvalidEffect,
+    ReduceImpactPerFlow, OnSellRemoveImpact, AtCleanupReduceGlobalImpact, ReduceFacilityImpactType,
+    DemandShift, AllSegmentsShift, GlobalImpact, PlayerEffect,
+)
+from water_barons.actions import (
+    Action, Sale, MARKET_SIZE, EVENT_OPTION_COST, SPECULATE_COST, MAX_FUTURES_TOKENS,
+    BUILD_FACILITY, PRODUCE_WATER, BUILD_DISTRIBUTION, ADD_UPGRADE,
+    SPECULATE, BUY_EVENT_OPTION, PASS, DRAFT_PICK,
+)
+
+FACILITY_UPGRADE_TYPES = ("FACILITY_UPGRADE", "FACILITY_TAG") # Upgrade types that snap beneath a facility
+
+class PendingDecision(NamedTuple):
+    """A decision the round is waiting for, as reported by `GameLogic.pending_decision`."""
+    phase: Phase    # WHIM_DRAFT, OPS or CROWD_SALES
+    player: Player
+    number: int     # The player's draft pick number or Ops action number (1-based); 0 for sales
+    options: list   # The Whim options on offer, or the demand opportunities to sell to; [] for Ops
+
 
 class GameLogic:
     """Handles the core game loop and phase transitions."""
-    def __init__(self, num_players: int, player_names: List[str]):
-        self.game_state = GameState(num_players, player_names)
+    def __init__(self, num_players: int, player_names: List[str], seed: Optional[int] = None,
+                 log_level: LogLevel = LogLevel.DEBUG):
+        """
+        `seed` fixes every shuffle of this game; by default a fresh seed is drawn and kept on the state.
+        `log_level` filters the game log; headless runs pass LogLevel.OFF to skip logging entirely.
+        """
+        self.game_state = GameState(num_players, player_names, seed=seed, log_level=log_level)
+        self._legal_actions_cache: Dict[str, tuple] = {} # player name -> (state stamp, actions)
         self._initialize_decks()
         # Further initialization like dealing starting hands or resources if any
 
+    def fork(self, log_level: Optional[LogLevel] = None) -> "GameLogic":
+        """An independent copy of this game to play ahead on; see `GameState.fork`."""
+        return GameLogic.from_state(self.game_state.fork(log_level))
+
+    @classmethod
+    def from_state(cls, game_state: GameState) -> "GameLogic":
+        """The game played on `game_state`, e.g. one loaded from a save, as it stands."""
+        game = cls.__new__(cls)
+        game.game_state = game_state
+        game._legal_actions_cache = {}
+        return game
+
     def _initialize_decks(self):
-        """Populates and shuffles all card decks."""
+        """Populates and shuffles all card decks with the game's own RNG."""
+        rng = self.game_state.rng
         self.game_state.facility_deck = get_all_facility_cards()
-        random.shuffle(self.game_state.facility_deck)
+        rng.shuffle(self.game_state.facility_deck)
 
         self.game_state.distribution_deck = get_all_distribution_cards()
-        random.shuffle(self.game_state.distribution_deck)
+        rng.shuffle(self.game_state.distribution_deck)
 
         self.game_state.upgrade_deck = get_all_upgrade_cards()
-        random.shuffle(self.game_state.upgrade_deck)
+        rng.shuffle(self.game_state.upgrade_deck)
 
         self.game_state.whim_deck_source = get_all_whim_cards() # All available Whims
-        random.shuffle(self.game_state.whim_deck_source)
+        rng.shuffle(self.game_state.whim_deck_source)
         # Crowd deck is formed during Whim Draft phase
 
-        self.game_state.global_event_tiles_available = get_all_global_event_tiles()
-        random.shuffle(self.game_state.global_event_tiles_available)
+        global_event_tiles = get_all_global_event_tiles()
+        rng.shuffle(global_event_tiles)
+        self.game_state.global_event_tiles_available = global_event_tiles
 
-        self.game_state.game_log.append("Decks initialized and shuffled.")
+        self.game_state.game_log.info("Decks initialized and shuffled.")
 
     def start_game(self):
         """Starts the game loop."""
-        self.game_state.game_log.append(f"Game starting with players: {[p.name for p in self.game_state.players]}.")
+        self.game_state.game_log.info("Game starting with players: {}.", [p.name for p in self.game_state.players])
         # Potentially deal initial cards or assign starting resources here
         # For now, we assume players start with some CredCoin as defined in Player class.
 
@@ -59,7 +101,7 @@ class GameLogic:
     # --- Phase Implementations (Placeholders) ---
     def initiate_whim_draft(self):
         """Sets up the state for starting a Whim Draft."""
-        self.game_state.game_log.append("\n-- Whim Draft Phase Initiated --")
+        self.game_state.game_log.info("\n-- Whim Draft Phase Initiated --")
         num_picks_per_player = 2
         num_players = len(self.game_state.players)
 
@@ -67,7 +109,7 @@ class GameLogic:
         for idx, p in enumerate(self.game_state.players):
             if p.draw_extra_whim_flag:
                 self.game_state.whim_draft_player_picks_remaining[idx] += 1
-                self.game_state.game_log.append(f"{p.name} gets an extra Whim draft pick this round from Drone Drops effect.")
+                self.game_state.game_log.info("{} gets an extra Whim draft pick this round from Drone Drops effect.", p.name)
                 p.draw_extra_whim_flag = False # Reset flag
 
         # Construct the full snake draft order
@@ -105,7 +147,7 @@ class GameLogic:
         self.game_state.whim_draft_current_picker_idx_in_order = 0
         self.game_state.whim_draft_active = True
         self.game_state.crowd_deck = [] # Clear existing crowd deck for new draft
-        self.game_state.game_log.append(f"Whim draft order: {[self.game_state.players[i].name for i in self.game_state.whim_draft_order]}")
+        self.game_state.game_log.debug("Whim draft order: {}", [self.game_state.players[i].name for i in self.game_state.whim_draft_order])
         return self.request_next_whim_draft_pick()
 
     def request_next_whim_draft_pick(self) -> Optional[Tuple[Player, List[WhimCard], int]]:
@@ -119,8 +161,8 @@ class GameLogic:
             gs.whim_draft_active = False
             gs.whim_draft_options_sent_to_player = []
             if gs.crowd_deck: # Only shuffle if cards were drafted
-                 random.shuffle(gs.crowd_deck)
-            gs.game_log.append(f"Whim Draft Concluded. Crowd Deck has {len(gs.crowd_deck)} cards.")
+                 gs.rng.shuffle(gs.crowd_deck)
+            gs.game_log.info("Whim Draft Concluded. Crowd Deck has {} cards.", len(gs.crowd_deck))
             return None
 
         current_player_actual_idx = gs.whim_draft_order[gs.whim_draft_current_picker_idx_in_order]
@@ -133,13 +175,13 @@ class GameLogic:
 
         # Replenish whim_deck_source if empty
         if not gs.whim_deck_source and gs.whim_discard_pile:
-            gs.game_log.append("Whim source deck empty, reshuffling discard pile.")
+            gs.game_log.info("Whim source deck empty, reshuffling discard pile.")
             gs.whim_deck_source.extend(gs.whim_discard_pile)
             gs.whim_discard_pile = []
-            random.shuffle(gs.whim_deck_source)
+            gs.rng.shuffle(gs.whim_deck_source)
 
         if not gs.whim_deck_source:
-            gs.game_log.append(f"Whim source deck depleted. {player.name} cannot make pick {pick_num_for_player}.")
+            gs.game_log.info("Whim source deck depleted. {} cannot make pick {}.", player.name, pick_num_for_player)
             gs.whim_draft_current_picker_idx_in_order += 1 # Skip this player's turn
             return self.request_next_whim_draft_pick() # Try for next player
 
@@ -147,7 +189,7 @@ class GameLogic:
         options = gs.whim_deck_source[:num_options_to_show]
 
         if not options:
-            gs.game_log.append(f"No Whim cards available for {player.name} to draft for pick {pick_num_for_player}.")
+            gs.game_log.info("No Whim cards available for {} to draft for pick {}.", player.name, pick_num_for_player)
             gs.whim_draft_current_picker_idx_in_order += 1 # Skip
             return self.request_next_whim_draft_pick()
 
@@ -161,7 +203,7 @@ class GameLogic:
         """
         gs = self.game_state
         if not gs.whim_draft_active or not gs.whim_draft_options_sent_to_player:
-            gs.game_log.append(f"Error: Whim draft not active or no options were sent to {player.name}.")
+            gs.game_log.info("Error: Whim draft not active or no options were sent to {}.", player.name)
             return False
 
         options = gs.whim_draft_options_sent_to_player
@@ -173,12 +215,12 @@ class GameLogic:
             if chosen_card in gs.whim_deck_source: # Ensure card is still in source (it should be)
                 gs.whim_deck_source.remove(chosen_card)
                 gs.crowd_deck.append(chosen_card)
-                gs.game_log.append(f"{player.name} drafted Whim card (Pick {pick_num_for_player}): {chosen_card.name}.")
+                gs.game_log.info("{} drafted Whim card (Pick {}): {}.", player.name, pick_num_for_player, chosen_card.name)
             else: # Should not happen if options are from source
-                gs.game_log.append(f"Error: Card {chosen_card.name} not found in source deck for {player.name}'s pick.")
+                gs.game_log.info("Error: Card {} not found in source deck for {}'s pick.", chosen_card.name, player.name)
                 # Potentially auto-pick first available if error, or just fail the pick
         else:
-            gs.game_log.append(f"{player.name} made an invalid choice or passed on pick {pick_num_for_player}. No card drafted for this pick.")
+            gs.game_log.info("{} made an invalid choice or passed on pick {}. No card drafted for this pick.", player.name, pick_num_for_player)
             # If passing is allowed and means no card, this is fine. If a card must be picked, this is an error.
             # For now, passing means no card drafted for this specific pick.
 
@@ -186,40 +228,6 @@ class GameLogic:
         gs.whim_draft_current_picker_idx_in_order += 1
         return True
 
-    def whim_draft_phase(self, get_player_draft_choice_cb):
-        """Runs the interactive Whim draft using the provided callback."""
-        next_pick = self.initiate_whim_draft()
-        while next_pick:
-            player, options, pick_num = next_pick
-            try:
-                choice = get_player_draft_choice_cb(player, options, pick_num)
-            except Exception:
-                choice = -1
-            if choice is None:
-                choice = -1
-            self.process_whim_draft_pick(player, choice)
-            next_pick = self.request_next_whim_draft_pick()
-
-
-    def ops_phase(self, get_player_action_choice_cb):
-        """
-        Each player takes 2 actions.
-        `get_player_action_choice_cb(player, action_num)` is used for CLI interaction.
-        """
-        self.game_state.game_log.append("\n-- Ops Phase --")
-        for i in range(len(self.game_state.players)):
-            player = self.game_state.get_current_player()
-            self.game_state.game_log.append(f"\n{player.name}'s turn (Ops Phase).")
-            for action_num in range(1, 3): # 2 actions per player
-                self.game_state.game_log.append(f"{player.name}, Action {action_num}:")
-                # Player chooses action via callback to CLI
-                # The callback `get_player_action_choice_cb` will handle the interaction
-                # and then call the appropriate game logic action method based on player's choice.
-                # Example: if player chooses 'Build Facility', cli calls self.action_build_facility(player, chosen_card_data)
-                get_player_action_choice_cb(player, action_num)
-            self.game_state.next_player()
-        self.game_state.current_player_index = 0 # Reset for Crowd Phase turn order
-
     # --- Action Methods (called by CLI based on player choice) ---
 
     def action_build_facility(self, player: Player, facility_card: FacilityCard, slot_index: int) -> bool:
@@ -227,71 +235,61 @@ class GameLogic:
         # Check game-wide limits
         if facility_card.name == "Glacial Tap":
             if self.game_state.game_wide_counters.get("GlacialTap_built", 0) >= 2:
-                self.game_state.game_log.append(f"Cannot build {facility_card.name}: Limit of 2 per game already reached.")
+                self.game_state.game_log.info("Cannot build {}: Limit of 2 per game already reached.", facility_card.name)
                 return False
 
         # Check for Aquifer Collapse event preventing Well construction
-        aquifer_collapse_active = any(event.name == "Aquifer Collapse" for event in self.game_state.global_event_tiles_active)
-        if "Well" in facility_card.name and aquifer_collapse_active: # Assuming "Well" is in the name string
-            self.game_state.game_log.append(f"Cannot build {facility_card.name}: Aquifer Collapse active, new Wells prohibited.")
+        aquifer_collapse_active = self.game_state.rule_flags & RuleFlag.AQUIFER_COLLAPSE
+        if aquifer_collapse_active and "Well" in facility_card.name: # Assuming "Well" is in the name string
+            self.game_state.game_log.info("Cannot build {}: Aquifer Collapse active, new Wells prohibited.", facility_card.name)
             return False
 
         if player.cred_coin >= facility_card.cost and player.facilities[slot_index] is None:
+            if self.game_state.journal is not None:
+                self.game_state.journal.player_changed(player)
             player.cred_coin -= facility_card.cost
-            player.facilities[slot_index] = facility_card
+            # Deck cards are shared definitions; the player gets their own instance to upgrade
+            player.facilities[slot_index] = facility_card.copy()
 
             if facility_card.name == "Glacial Tap":
                 self.game_state.game_wide_counters["GlacialTap_built"] = self.game_state.game_wide_counters.get("GlacialTap_built", 0) + 1
 
-            self.game_state.game_log.append(
-                f"{player.name} built {facility_card.name} in slot {slot_index + 1} for {facility_card.cost} CC."
+            self.game_state.game_log.info(
+                "{} built {} in slot {} for {} CC.",
+                player.name, facility_card.name, slot_index + 1, facility_card.cost
             )
             return True
         else:
             if player.cred_coin < facility_card.cost:
-                self.game_state.game_log.append(f"{player.name} cannot afford {facility_card.name}.")
+                self.game_state.game_log.info("{} cannot afford {}.", player.name, facility_card.name)
             if player.facilities[slot_index] is not None:
-                self.game_state.game_log.append(f"Slot {slot_index + 1} is already occupied.")
+                self.game_state.game_log.info("Slot {} is already occupied.", slot_index + 1)
             return False
 
-    def _apply_facility_upgrade_effects_on_flow(self, player: Player, facility: FacilityCard, current_impact: dict[TrackColor, int]) -> dict[TrackColor, int]:
+    def _apply_facility_upgrade_effects_on_flow(self, player: Player, facility: FacilityCard, current_impact: ImpactProfile) -> ImpactProfile:
         """Applies effects of upgrades on a facility's impact profile during Flow action."""
         modified_impact = current_impact.copy()
         for upgrade in facility.upgrades:
-            # Example: "Apply_to_facility: reduce_impact_per_flow(TrackColor.PINK, 1)"
-            if "reduce_impact_per_flow" in upgrade.effect_description:
-                try:
-                    parts = upgrade.effect_description.split('(')[1].split(')')[0].split(',')
-                    track_str = parts[0].split('.')[1].strip() # TrackColor.PINK -> PINK
-                    amount = int(parts[1].strip())
-                    track_color_to_reduce = TrackColor[track_str]
-
-                    modified_impact[track_color_to_reduce] = max(0, modified_impact.get(track_color_to_reduce, 0) - amount)
-                    self.game_state.game_log.append(f"  Upgrade '{upgrade.name}' reduced {track_color_to_reduce.name} impact by {amount}.")
-                except Exception as e:
-                    self.game_state.game_log.append(f"  Error parsing upgrade effect '{upgrade.effect_description}': {e}")
+            effect = upgrade_effect(upgrade)
+            if isinstance(effect, ReduceImpactPerFlow):
+                modified_impact[effect.track] = max(0, modified_impact.get(effect.track, 0) - effect.amount)
+                self.game_state.game_log.debug("  Upgrade '{}' reduced {} impact by {}.", upgrade.name, effect.track.name, effect.amount)
+            elif isinstance(effect, InvalidEffect) and "reduce_impact_per_flow" in effect.text:
+                self.game_state.game_log.info("  Error parsing upgrade effect '{}': {}", effect.text, effect.error)
         return modified_impact
 
-    def _get_passive_player_impact_reduction(self, player:Player, facility_tags: List[str], original_impact_profile: dict[TrackColor, int]) -> dict[TrackColor, int]:
+    def _get_passive_player_impact_reduction(self, player:Player, facility_tags: List[str], original_impact_profile: ImpactProfile) -> ImpactProfile:
         """Checks player's R&D for passive impact reductions (e.g. Aquifer Recharge Tech)."""
-        reductions = {tc: 0 for tc in TrackColor}
+        reductions = ImpactProfile()
         for rd_tech in player.r_and_d:
-            if "reduce_facility_impact_type" in rd_tech.effect_description:
-                # E.g., "Global_player_passive: reduce_facility_impact_type('Well', TrackColor.BLUE, 1)"
-                try:
-                    details = rd_tech.effect_description.split('(')[1].split(')')[0].split(',')
-                    target_tag = details[0].strip().replace("'", "") # 'Well'
-                    track_str = details[1].split('.')[1].strip() # TrackColor.BLUE -> BLUE
-                    amount = int(details[2].strip())
-
-                    if target_tag in facility_tags: # Check if facility has the target tag (e.g. "Well")
-                        track_color_to_reduce = TrackColor[track_str]
-                        # Check if original impact profile has this track color
-                        if track_color_to_reduce in original_impact_profile and original_impact_profile[track_color_to_reduce] > 0:
-                             reductions[track_color_to_reduce] += amount
-                             self.game_state.game_log.append(f"  R&D Tech '{rd_tech.name}' passively reduces {track_color_to_reduce.name} impact by {amount} for facilities tagged '{target_tag}'.")
-                except Exception as e:
-                    self.game_state.game_log.append(f"  Error parsing R&D effect '{rd_tech.effect_description}': {e}")
+            effect = upgrade_effect(rd_tech)
+            if isinstance(effect, ReduceFacilityImpactType):
+                # Only reduce tracks the facility actually impacts
+                if effect.tag in facility_tags and original_impact_profile.get(effect.track, 0) > 0:
+                    reductions[effect.track] += effect.amount
+                    self.game_state.game_log.debug("  R&D Tech '{}' passively reduces {} impact by {} for facilities tagged '{}'.", rd_tech.name, effect.track.name, effect.amount, effect.tag)
+            elif isinstance(effect, InvalidEffect) and "reduce_facility_impact_type" in effect.text:
+                self.game_state.game_log.info("  Error parsing R&D effect '{}': {}", effect.text, effect.error)
         return reductions
 
 
@@ -299,31 +297,30 @@ class GameLogic:
         """Player uses a facility to produce water."""
         facility = player.facilities[facility_slot_index]
         if facility:
+            if self.game_state.journal is not None:
+                self.game_state.journal.player_changed(player)
             water_produced = facility.base_output
 
             # Static Track Effects (e.g., DEP Level 5: Wells output –1)
-            if "DEP_Level_5_Effect" in self.game_state.active_threshold_effects and "Well" in facility.tags: # Assuming "Well" tag
+            rule_flags = self.game_state.rule_flags
+            if rule_flags & RuleFlag.DEP_LEVEL_5 and "Well" in facility.tags: # Assuming "Well" tag
                 water_produced = max(0, water_produced - 1)
-                self.game_state.game_log.append(f"  DEP_Level_5_Effect active, {facility.name} (Well) output reduced by 1.")
+                self.game_state.game_log.info("  DEP_Level_5_Effect active, {} (Well) output reduced by 1.", facility.name)
 
-            # Global Event Effects (e.g., Aquifer Collapse, Heatwave Frenzy)
-            for event in self.game_state.global_event_tiles_active:
-                if event.name == "Aquifer Collapse" and "Well" in facility.tags:
-                    water_produced = water_produced // 2 # Halved
-                    self.game_state.game_log.append(f"  Aquifer Collapse active, {facility.name} (Well) output halved to {water_produced}.")
-                elif event.name == "Heatwave Frenzy":
-                    water_produced = max(0, water_produced - 1)
-                    self.game_state.game_log.append(f"  Heatwave Frenzy active, {facility.name} output reduced by 1 (overheat).")
+            # Global Event Effects (e.g., Aquifer Collapse, Heatwave Frenzy), always applied in this order
+            if rule_flags & RuleFlag.AQUIFER_COLLAPSE and "Well" in facility.tags:
+                water_produced = water_produced // 2 # Halved
+                self.game_state.game_log.info("  Aquifer Collapse active, {} (Well) output halved to {}.", facility.name, water_produced)
+            if rule_flags & RuleFlag.HEATWAVE_FRENZY:
+                water_produced = max(0, water_produced - 1)
+                self.game_state.game_log.info("  Heatwave Frenzy active, {} output reduced by 1 (overheat).", facility.name)
 
             # Add produced water as a distinct batch
             if water_produced > 0:
-                player.water_batches.append({
-                    'facility_name': facility.name,
-                    'facility_tags': facility.tags.copy(), # Store a copy of tags at time of production
-                    'base_impact_profile': facility.impact_profile.copy(), # Store base impact for quality checks
-                    'quantity': water_produced,
-                    'production_round': self.game_state.round_number
-                })
+                # The batch refers to the facility's tags and base impact (used for quality checks) without copying them
+                player.water_batches.append(WaterBatch(
+                    facility.name, facility.tags, facility.impact_profile, water_produced, self.game_state.round_number
+                ))
 
             # Handle Impacts
             current_facility_impact = facility.impact_profile.copy()
@@ -333,8 +330,7 @@ class GameLogic:
                 current_facility_impact[TrackColor.PINK] = current_facility_impact.get(TrackColor.PINK, 0) - 1
                 # Ensure it doesn't go negative if base impact was 0 or low
                 current_facility_impact[TrackColor.PINK] = max(0, current_facility_impact[TrackColor.PINK])
-                self.game_state.game_log.append(f"  {facility.name} inherently mitigates 1 μP.")
-
+                self.game_state.game_log.debug("  {} inherently mitigates 1 μP.", facility.name)
             # Apply facility-specific upgrade effects (e.g. Microplastic Filter)
             current_facility_impact = self._apply_facility_upgrade_effects_on_flow(player, facility, current_facility_impact)
 
@@ -348,35 +344,38 @@ class GameLogic:
                 if amount > 0 : # Only add positive impact
                     player.impact_storage[track_color] = player.impact_storage.get(track_color, 0) + amount
 
-            self.game_state.game_log.append(
-                f"{player.name} activated {facility.name}, producing {water_produced} water. "
-                f"Net impacts added to storage: {current_facility_impact} (after upgrades/mitigations)."
+            self.game_state.game_log.info(
+                "{} activated {}, producing {} water. Net impacts added to storage: {} (after upgrades/mitigations).",
+                player.name, facility.name, water_produced, current_facility_impact
             )
             return True
-        self.game_state.game_log.append(f"{player.name} failed to activate facility in slot {facility_slot_index + 1}.")
+        self.game_state.game_log.info("{} failed to activate facility in slot {}.", player.name, facility_slot_index + 1)
         return False
 
     def action_build_distribution(self, player: Player, dist_card: DistributionCard, slot_index: int) -> bool:
         """Player builds a distribution route."""
         # Check for Microplastic Revelation making Plastic Bottles unusable
-        microplastic_revelation_active = any(event.name == "Microplastic Revelation" for event in self.game_state.global_event_tiles_active)
-        if dist_card.name == "Plastic Bottles" and microplastic_revelation_active and not dist_card.is_active: # Assuming is_active flag
-             self.game_state.game_log.append(f"Cannot build {dist_card.name}: Microplastic Revelation has made them unusable.")
+        microplastic_revelation_active = self.game_state.rule_flags & RuleFlag.MICROPLASTIC_REVELATION
+        if dist_card.name == "Plastic Bottles" and microplastic_revelation_active:
+             self.game_state.game_log.info("Cannot build {}: Microplastic Revelation has made them unusable.", dist_card.name)
              return False
 
         if player.cred_coin >= dist_card.cost and player.distribution_routes[slot_index] is None:
+            if self.game_state.journal is not None:
+                self.game_state.journal.player_changed(player)
             player.cred_coin -= dist_card.cost
-            player.distribution_routes[slot_index] = dist_card
+            player.distribution_routes[slot_index] = dist_card.copy() # Own instance, e.g. for is_active
             player.routes_built_this_game.add(dist_card.name) # Track for Diversity Bonus
-            self.game_state.game_log.append(
-                f"{player.name} built {dist_card.name} route in slot {slot_index+1} for {dist_card.cost} CC."
+            self.game_state.game_log.info(
+                "{} built {} route in slot {} for {} CC.",
+                player.name, dist_card.name, slot_index+1, dist_card.cost
             )
             return True
         else:
             if player.cred_coin < dist_card.cost:
-                 self.game_state.game_log.append(f"{player.name} cannot afford {dist_card.name}.")
+                 self.game_state.game_log.info("{} cannot afford {}.", player.name, dist_card.name)
             if player.distribution_routes[slot_index] is not None:
-                self.game_state.game_log.append(f"Distribution slot {slot_index + 1} is already occupied.")
+                self.game_state.game_log.info("Distribution slot {} is already occupied.", slot_index + 1)
             return False
 
     def action_tweak_add_upgrade(self, player: Player, upgrade_card: UpgradeCard, target_card_owner_type: str, owner_slot_index: int) -> bool:
@@ -384,7 +383,7 @@ class GameLogic:
         target_card_owner_type: 'facility' or 'route'
         """
         if player.cred_coin < upgrade_card.cost:
-            self.game_state.game_log.append(f"{player.name} cannot afford {upgrade_card.name}.")
+            self.game_state.game_log.info("{} cannot afford {}.", player.name, upgrade_card.name)
             return False
 
         target_owner = None
@@ -392,7 +391,7 @@ class GameLogic:
             if 0 <= owner_slot_index < len(player.facilities) and player.facilities[owner_slot_index]:
                 target_owner = player.facilities[owner_slot_index]
             else:
-                self.game_state.game_log.append(f"Invalid facility slot {owner_slot_index + 1} for upgrade.")
+                self.game_state.game_log.info("Invalid facility slot {} for upgrade.", owner_slot_index + 1)
                 return False
         elif target_card_owner_type == 'route':
             # Distribution cards don't explicitly store upgrades in the current model.
@@ -400,152 +399,379 @@ class GameLogic:
             # For now, let's assume an R&D type upgrade if not facility.
             # This part needs clarification based on "Upgrades snap beneath" for facilities vs route upgrades.
             # Assuming R&D for non-facility for now.
+            if self.game_state.journal is not None:
+                self.game_state.journal.player_changed(player)
             player.r_and_d.append(upgrade_card)
             player.cred_coin -= upgrade_card.cost
-            self.game_state.game_log.append(f"{player.name} acquired R&D tech: {upgrade_card.name} for {upgrade_card.cost} CC.")
+            self.game_state.game_log.info("{} acquired R&D tech: {} for {} CC.", player.name, upgrade_card.name, upgrade_card.cost)
             return True
 
         if target_owner: # This will be a FacilityCard (target_owner_facility from previous logic)
-            if upgrade_card.type in ["FACILITY_UPGRADE", "FACILITY_TAG"]: # Check type from card data
+            if upgrade_card.type in FACILITY_UPGRADE_TYPES: # Check type from card data
+                 if self.game_state.journal is not None:
+                     self.game_state.journal.player_changed(player)
                  target_owner.upgrades.append(upgrade_card)
                  player.cred_coin -= upgrade_card.cost
-                 self.game_state.game_log.append(
-                     f"{player.name} added upgrade '{upgrade_card.name}' to {target_owner.name} for {upgrade_card.cost} CC."
+                 self.game_state.game_log.info(
+                     "{} added upgrade '{}' to {} for {} CC.",
+                     player.name, upgrade_card.name, target_owner.name, upgrade_card.cost
                  )
                  if upgrade_card in self.game_state.upgrade_deck: self.game_state.upgrade_deck.remove(upgrade_card)
                  return True
             else:
-                self.game_state.game_log.append(f"Upgrade '{upgrade_card.name}' ({upgrade_card.type}) is not a facility-specific upgrade type for target {target_owner.name}.")
+                self.game_state.game_log.info("Upgrade '{}' ({}) is not a facility-specific upgrade type for target {}.", upgrade_card.name, upgrade_card.type, target_owner.name)
                 return False # Mismatch
 
         # If it's not a facility upgrade being applied to a facility, and not R&D handled above, it's a failure or unhandled type.
-        self.game_state.game_log.append(f"Failed to apply upgrade '{upgrade_card.name}'. Target type or card type mismatch, or target not found.")
+        self.game_state.game_log.info("Failed to apply upgrade '{}'. Target type or card type mismatch, or target not found.", upgrade_card.name)
         return False
 
     def action_speculate(self, player: Player, token_type: str, track_color: TrackColor) -> bool: # token_type 'long' or 'short'
-        self.game_state.game_log.append(f"{player.name} attempts to Speculate ({token_type} on {track_color.name}).")
+        self.game_state.game_log.info("{} attempts to Speculate ({} on {}).", player.name, token_type, track_color.name)
         # Cost is 2 CC. Max 3 futures.
-        cost = 2
-        if len(player.futures_tokens) >= 3:
-            self.game_state.game_log.append(f"{player.name} already has max (3) futures tokens.")
+        cost = SPECULATE_COST
+        if len(player.futures_tokens) >= MAX_FUTURES_TOKENS:
+            self.game_state.game_log.info("{} already has max (3) futures tokens.", player.name)
             return False
         if player.cred_coin < cost:
-            self.game_state.game_log.append(f"{player.name} cannot afford futures token (cost {cost} CC).")
+            self.game_state.game_log.info("{} cannot afford futures token (cost {} CC).", player.name, cost)
             return False
 
         is_long = token_type.lower() == 'long'
         token = FutureToken(track_color, is_long, purchase_price=cost)
+        if self.game_state.journal is not None:
+            self.game_state.journal.player_changed(player)
         player.futures_tokens.append(token)
         player.cred_coin -= cost
-        self.game_state.game_log.append(f"{player.name} bought a {token_type} token for {track_color.name} for {cost} CC.")
+        self.game_state.game_log.info("{} bought a {} token for {} for {} CC.", player.name, token_type, track_color.name, cost)
         return True
 
 
     def action_spin_marketing(self, player: Player, target_segment_name: str, desired_effect: str):
-        self.game_state.game_log.append(f"{player.name} tries to Spin Marketing on {target_segment_name}. Not fully implemented.")
+        self.game_state.game_log.info("{} tries to Spin Marketing on {}. Not fully implemented.", player.name, target_segment_name)
         # This would involve costs and modifying demand segment weights/demand.
         return False
 
     def action_buy_event_option(self, player: Player, event_name: str, cost: int) -> bool:
         """Player buys an Event Option."""
         if player.cred_coin < cost:
-            self.game_state.game_log.append(f"{player.name} cannot afford Event Option for '{event_name}' (cost {cost} CC).")
+            self.game_state.game_log.info("{} cannot afford Event Option for '{}' (cost {} CC).", player.name, event_name, cost)
             return False
 
         # Potentially limit number of event options a player can hold, similar to futures_tokens?
         # Document doesn't specify a limit for Event Options, unlike the 3 futures_tokens limit.
 
         option = EventOption(event_name=event_name, purchase_price=cost)
+        if self.game_state.journal is not None:
+            self.game_state.journal.player_changed(player)
         player.event_options.append(option)
         player.cred_coin -= cost
-        self.game_state.game_log.append(
-            f"{player.name} bought an Event Option for '{event_name}' for {cost} CC."
+        self.game_state.game_log.info(
+            "{} bought an Event Option for '{}' for {} CC.",
+            player.name, event_name, cost
         )
         return True
 
+    # --- Data-driven actions (used by bots and headless simulations) ---
+
+    def _market_card(self, deck: list, market_index: int) -> Optional[Card]:
+        """Returns the card at `market_index` among the top MARKET_SIZE cards of `deck`."""
+        if 0 <= market_index < min(MARKET_SIZE, len(deck)):
+            return deck[market_index]
+        return None
+
+    def _draft_picker(self) -> Optional[Player]:
+        """The player whose Whim draft pick is pending, i.e. who has been sent options."""
+        gs = self.game_state
+        if not gs.whim_draft_active or not gs.whim_draft_options_sent_to_player:
+            return None
+        return gs.players[gs.whim_draft_order[gs.whim_draft_current_picker_idx_in_order]]
+
+    def _legal_actions_stamp(self, player: Player) -> tuple:
+        """Everything `legal_actions` depends on; the cached result is reused while this is unchanged."""
+        gs = self.game_state
+        return (
+            player.cred_coin,
+            tuple(card is None for card in player.facilities),
+            tuple(card is None for card in player.distribution_routes),
+            len(player.futures_tokens),
+            gs.rule_flags,
+            gs.game_wide_counters.get("GlacialTap_built", 0),
+            tuple(gs.facility_deck[:MARKET_SIZE]),
+            tuple(gs.distribution_deck[:MARKET_SIZE]),
+            tuple(gs.upgrade_deck[:MARKET_SIZE]),
+            gs.whim_draft_active and (gs.whim_draft_current_picker_idx_in_order, tuple(gs.whim_draft_options_sent_to_player)),
+        )
 
-    def crowd_phase(self, get_player_sales_choices_cb):
+    def legal_actions(self, player: Player) -> Tuple[Action, ...]:
+        """
+        Every action `player` can take now. While a Whim draft pick is pending these are the
+        DRAFT_PICK actions for the options on offer (none for the other players); otherwise
+        every Ops action `apply_action` accepts. Upgrades bought as R&D tech are listed once,
+        targeting route slot 0. The result is cached per player and only recomputed when
+        something it depends on changes (see `_legal_actions_stamp`).
         """
-        Reveal Crowd cards, players sell water, resolve fallout.
-        `get_player_sales_choices_cb(player, available_water, active_demand_segments)` for CLI interaction.
+        stamp = self._legal_actions_stamp(player)
+        cached = self._legal_actions_cache.get(player.name)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        actions = tuple(self._enumerate_legal_actions(player))
+        self._legal_actions_cache[player.name] = (stamp, actions)
+        return actions
+
+    def _enumerate_legal_actions(self, player: Player) -> List[Action]:
+        gs = self.game_state
+        if gs.whim_draft_active:
+            if self._draft_picker() is not player:
+                return []
+            return [Action(DRAFT_PICK, (i,)) for i in range(len(gs.whim_draft_options_sent_to_player))]
+
+        actions: List[Action] = [Action(PASS)]
+        coin = player.cred_coin
+        rule_flags = gs.rule_flags
+        empty_facility_slots = [i for i, f in enumerate(player.facilities) if f is None]
+        built_facility_slots = [i for i, f in enumerate(player.facilities) if f is not None]
+        empty_route_slots = [i for i, r in enumerate(player.distribution_routes) if r is None]
+
+        for slot in built_facility_slots:
+            actions.append(Action(PRODUCE_WATER, (slot,)))
+
+        if empty_facility_slots:
+            glacial_taps_left = gs.game_wide_counters.get("GlacialTap_built", 0) < 2
+            for market_index, card in enumerate(gs.facility_deck[:MARKET_SIZE]):
+                if card.cost > coin:
+                    continue
+                if card.name == "Glacial Tap" and not glacial_taps_left:
+                    continue
+                if rule_flags & RuleFlag.AQUIFER_COLLAPSE and "Well" in card.name:
+                    continue
+                for slot in empty_facility_slots:
+                    actions.append(Action(BUILD_FACILITY, (market_index, slot)))
+
+        if empty_route_slots:
+            for market_index, card in enumerate(gs.distribution_deck[:MARKET_SIZE]):
+                if card.cost > coin:
+                    continue
+                if card.name == "Plastic Bottles" and rule_flags & RuleFlag.MICROPLASTIC_REVELATION:
+                    continue
+                for slot in empty_route_slots:
+                    actions.append(Action(BUILD_DISTRIBUTION, (market_index, slot)))
+
+        for market_index, card in enumerate(gs.upgrade_deck[:MARKET_SIZE]):
+            if card.cost > coin:
+                continue
+            if card.type in FACILITY_UPGRADE_TYPES:
+                for slot in built_facility_slots:
+                    actions.append(Action(ADD_UPGRADE, (market_index, 'facility', slot)))
+            actions.append(Action(ADD_UPGRADE, (market_index, 'route', 0))) # Any upgrade can be R&D tech
+
+        if coin >= SPECULATE_COST and len(player.futures_tokens) < MAX_FUTURES_TOKENS:
+            for track in TrackColor:
+                actions.append(Action(SPECULATE, ('long', track.name)))
+                actions.append(Action(SPECULATE, ('short', track.name)))
+
+        if coin >= EVENT_OPTION_COST:
+            for event_data in GLOBAL_EVENTS_DATA:
+                actions.append(Action(BUY_EVENT_OPTION, (event_data["name"],)))
+        return actions
+
+    def apply_action(self, player: Player, action: Action) -> bool:
+        """
+        Performs an Ops action or a Whim draft pick described as plain data (see
+        `water_barons.actions`). Cards are bought from the top of the relevant deck
+        and removed from it on success, mirroring what the CLI does after calling the
+        `action_*` methods. After a draft pick, ask `request_next_whim_draft_pick`
+        for the next one.
         """
-        self.game_state.game_log.append("\n-- Crowd Phase --")
-        self.game_state.round_sales_to_eco_elites.clear() # Reset for the current round
+        gs = self.game_state
+        try:
+            kind, args = action
+            if kind == PASS:
+                gs.game_log.info("{} passes.", player.name)
+                return True
+
+            if kind == DRAFT_PICK:
+                (option_index,) = args
+                if self._draft_picker() is not player or not 0 <= option_index < len(gs.whim_draft_options_sent_to_player):
+                    gs.game_log.info("{} chose an invalid draft pick.", player.name)
+                    return False
+                return self.process_whim_draft_pick(player, option_index)
+
+            if kind == BUILD_FACILITY:
+                market_index, slot_index = args
+                card = self._market_card(gs.facility_deck, market_index)
+                if card is None or not 0 <= slot_index < len(player.facilities):
+                    gs.game_log.info("{} chose an invalid facility or slot.", player.name)
+                    return False
+                if self.action_build_facility(player, card, slot_index):
+                    gs.facility_deck.remove(card)
+                    return True
+                return False
+
+            if kind == PRODUCE_WATER:
+                (slot_index,) = args
+                if not 0 <= slot_index < len(player.facilities):
+                    gs.game_log.info("{} chose an invalid facility slot.", player.name)
+                    return False
+                return self.action_produce_water(player, slot_index)
+
+            if kind == BUILD_DISTRIBUTION:
+                market_index, slot_index = args
+                card = self._market_card(gs.distribution_deck, market_index)
+                if card is None or not 0 <= slot_index < len(player.distribution_routes):
+                    gs.game_log.info("{} chose an invalid route or slot.", player.name)
+                    return False
+                if self.action_build_distribution(player, card, slot_index):
+                    gs.distribution_deck.remove(card)
+                    return True
+                return False
 
+            if kind == ADD_UPGRADE:
+                market_index, target_type, slot_index = args
+                card = self._market_card(gs.upgrade_deck, market_index)
+                if card is None:
+                    gs.game_log.info("{} chose an invalid upgrade.", player.name)
+                    return False
+                if self.action_tweak_add_upgrade(player, card, target_type, slot_index):
+                    if card in gs.upgrade_deck:
+                        gs.upgrade_deck.remove(card)
+                    return True
+                return False
+
+            if kind == SPECULATE:
+                token_type, track_name = args
+                return self.action_speculate(player, token_type, TrackColor[track_name])
+
+            if kind == BUY_EVENT_OPTION:
+                (event_name,) = args
+                return self.action_buy_event_option(player, event_name, EVENT_OPTION_COST)
+        except (TypeError, ValueError, KeyError) as e:
+            gs.game_log.info("{} sent malformed action {!r}: {}", player.name, action, e)
+            return False
+
+        gs.game_log.info("{} sent unknown action '{}'.", player.name, kind)
+        return False
+
+    def sale_rejection_reason(self, player: Player, demand_opp: dict, batch: WaterBatch, route: Optional[DistributionCard]) -> Optional[str]:
+        """Returns why a sale of `batch` to `demand_opp` via `route` is not allowed, or None if it is."""
+        if route is None or not route.is_active:
+            return "no active route"
+        segment_name = demand_opp['name']
+        if segment_name == "Connoisseurs" and self.game_state.impact_tracks[TrackColor.GREEN].level >= 7:
+            return "Connoisseurs reject water while TOX >= 7"
+        if segment_name == "Eco-Elites":
+            profile = batch['base_impact_profile']
+            if profile.get(TrackColor.PINK, 0) > 4 or profile.get(TrackColor.GREY, 0) > 5:
+                return "water does not meet Eco-Elite standards"
+        if segment_name == "Convenientists" and route.name not in ("Plastic Bottles", "Drone Drops"):
+            return "Convenientists require Plastic Bottles or Drone Drops"
+        return None
+
+    def resolve_sales(self, player: Player, sales: List[Sale], demand_opportunities: List[dict]) -> List[tuple]:
+        """
+        Validates sale orders and prices them, returning the tuples expected from the
+        Crowd phase sales callback. Invalid or oversized orders are dropped. The
+        demand opportunities themselves are left for `sell_water` to decrement.
+        """
+        demand_left = {opp['name']: opp['demand'] for opp in demand_opportunities}
+        opps_by_name = {opp['name']: opp for opp in demand_opportunities}
+        batch_left = [batch['quantity'] for batch in player.water_batches]
+        resolved = []
+
+        for sale in sales:
+            opp = opps_by_name.get(sale.segment_name)
+            if opp is None or not 0 <= sale.batch_index < len(batch_left):
+                continue
+            if not 0 <= sale.route_slot < len(player.distribution_routes):
+                continue
+            route = player.distribution_routes[sale.route_slot]
+            batch = player.water_batches[sale.batch_index]
+            quantity = min(sale.quantity, batch_left[sale.batch_index], demand_left[sale.segment_name])
+            if quantity <= 0 or self.sale_rejection_reason(player, opp, batch, route):
+                continue
+
+            price_per_cube = opp['price']
+            if sale.segment_name == "Connoisseurs" and batch['facility_name'] == "Glacial Tap":
+                price_per_cube += 1
+
+            batch_left[sale.batch_index] -= quantity
+            demand_left[sale.segment_name] -= quantity
+            resolved.append((sale.segment_name, quantity, quantity * price_per_cube, route, sale.batch_index, batch.copy()))
+
+            if route.special_effect == "draw_extra_whim_next_round" and not player.draw_extra_whim_flag:
+                player.draw_extra_whim_flag = True
+                self.game_state.game_log.info("{} will draw an extra Whim card next round due to {}.", player.name, route.name)
+        return resolved
+
+
+    def reveal_crowd_cards(self) -> List[WhimCard]:
+        """Flips this round's Crowd cards, resolving their Pre-round effects. They stay in `crowd_cards_in_play`."""
         num_cards_to_flip = len(self.game_state.players) + 1
         active_crowd_cards: List[WhimCard] = []
 
         if not self.game_state.crowd_deck:
-            self.game_state.game_log.append("Crowd Deck is empty. No cards to flip.")
+            self.game_state.game_log.info("Crowd Deck is empty. No cards to flip.")
             # Potentially add emergency Whims or handle this state.
             # For now, skip if empty.
         else:
             for _ in range(min(num_cards_to_flip, len(self.game_state.crowd_deck))):
                 card = self.game_state.crowd_deck.pop(0)
                 active_crowd_cards.append(card)
-                self.game_state.game_log.append(f"Revealed Crowd Card: {card.name}")
+                self.game_state.game_log.info("Revealed Crowd Card: {}", card.name)
                 # 1. Resolve Pre-round Effect
                 self.resolve_whim_pre_effect(card)
+        self.game_state.crowd_cards_in_play = active_crowd_cards
+        return active_crowd_cards
+
+    def sell_water(self, player: Player, sales_made_info: List[tuple], current_demands: List[dict]):
+        """Books a player's resolved sales (see `resolve_sales`): revenue, route impact, demand and batches."""
+        total_revenue_this_turn = 0
+        sold_from_batches_indices = {}
+        if self.game_state.journal is not None:
+            self.game_state.journal.player_changed(player)
+
+        for sale_info in sales_made_info:
+            segment_name, quantity_sold, revenue, dist_route_card, batch_idx_sold_from, _ = sale_info
+            total_revenue_this_turn += revenue
+            player.cred_coin += revenue
+
+            if dist_route_card and dist_route_card.impact_modifier:
+                self._apply_distribution_impact(player, dist_route_card, quantity_sold)
+
+            for demand_opp in current_demands:
+                if demand_opp['name'] == segment_name:
+                    demand_opp['demand'] -= quantity_sold
+                    break
+
+            sold_from_batches_indices[batch_idx_sold_from] = sold_from_batches_indices.get(batch_idx_sold_from, 0) + quantity_sold
+
+            if segment_name == "Eco-Elites":
+                self.game_state.round_sales_to_eco_elites.add(player.name)
+
+            self.game_state.game_log.info(
+                "  {} sold {} water (from batch {}) to {} for {} CC using {}.",
+                player.name, quantity_sold, batch_idx_sold_from+1, segment_name, revenue,
+                dist_route_card.name if dist_route_card else 'default route'
+            )
 
-        # 2. Players sell water (in turn order)
-        mass_recall_active = any(event.name == "Mass Recall" for event in self.game_state.global_event_tiles_active)
-        if mass_recall_active:
-            self.game_state.game_log.append("Mass Recall event active! No sales this round from tainted supply.")
-            # Water was already discarded by _apply_global_event_effects when Mass Recall triggered.
-        else:
-            current_demands = self._get_current_demand_opportunities(active_crowd_cards)
-            for i in range(len(self.game_state.players)):
-                player = self.game_state.get_current_player()
-                total_player_water = player.get_total_water_produced()
-                self.game_state.game_log.append(f"\n{player.name} selling water (has {total_player_water} cubes across {len(player.water_batches)} batches)...")
-
-                if total_player_water > 0:
-                    sales_made_info = get_player_sales_choices_cb(player, player.water_batches, current_demands, self.game_state.impact_tracks)
-
-                    total_revenue_this_turn = 0
-                    sold_from_batches_indices = {}
-
-                    for sale_info in sales_made_info:
-                        segment_name, quantity_sold, revenue, dist_route_card, batch_idx_sold_from, _ = sale_info
-                        total_revenue_this_turn += revenue
-                        player.cred_coin += revenue
-
-                        if dist_route_card and dist_route_card.impact_modifier:
-                            self._apply_distribution_impact(player, dist_route_card, quantity_sold)
-
-                        for demand_opp in current_demands:
-                            if demand_opp['name'] == segment_name:
-                                demand_opp['demand'] -= quantity_sold
-                                break
-
-                        sold_from_batches_indices[batch_idx_sold_from] = sold_from_batches_indices.get(batch_idx_sold_from, 0) + quantity_sold
-
-                        if segment_name == "Eco-Elites":
-                            self.game_state.round_sales_to_eco_elites.add(player.name)
-
-                        self.game_state.game_log.append(
-                            f"  {player.name} sold {quantity_sold} water (from batch {batch_idx_sold_from+1}) to {segment_name} for {revenue} CC using {dist_route_card.name if dist_route_card else 'default route'}."
-                        )
-
-                    new_water_batches = []
-                    for idx, batch in enumerate(player.water_batches):
-                        sold_amount = sold_from_batches_indices.get(idx, 0)
-                        batch['quantity'] -= sold_amount
-                        if batch['quantity'] > 0:
-                            new_water_batches.append(batch)
-                    player.water_batches = new_water_batches
+        new_water_batches = []
+        for idx, batch in enumerate(player.water_batches):
+            sold_amount = sold_from_batches_indices.get(idx, 0)
+            batch['quantity'] -= sold_amount
+            if batch['quantity'] > 0:
+                new_water_batches.append(batch)
+        player.water_batches = new_water_batches
 
-                    self.game_state.game_log.append(f"  {player.name} earned {total_revenue_this_turn} CC. Remaining water: {player.get_total_water_produced()}")
-                else:
-                    self.game_state.game_log.append(f"  {player.name} has no water to sell.")
-                self.game_state.next_player()
-            self.game_state.current_player_index = 0
+        self.game_state.game_log.info("  {} earned {} CC. Remaining water: {}", player.name, total_revenue_this_turn, player.get_total_water_produced())
 
+    def end_crowd_phase(self):
+        """Resolves the Post-round Fallout of the Crowd cards in play, consolidates impacts and evaporates water."""
         # 3. Resolve Post-round Fallout for each card & discard
-        for card in active_crowd_cards:
-            self.game_state.game_log.append(f"Resolving Post-round Fallout for {card.name}: {card.post_round_fallout}")
+        for card in self.game_state.crowd_cards_in_play:
+            self.game_state.game_log.info("Resolving Post-round Fallout for {}: {}", card.name, card.post_round_fallout)
             self.resolve_whim_post_fallout(card)
             self.game_state.whim_discard_pile.append(card)
+        self.game_state.crowd_cards_in_play = []
 
         # Cleanup: Player impact storage to global tracks (Consolidate)
         self.consolidate_player_impacts()
@@ -554,96 +780,84 @@ class GameLogic:
         for player in self.game_state.players:
             if player.get_total_water_produced() > 0:
                 # For simplicity, clear all batches. A more nuanced rule might allow some carry-over.
-                self.game_state.game_log.append(f"{player.name}'s {player.get_total_water_produced()} unsold water cubes (from all batches) evaporate.")
+                self.game_state.game_log.info("{}'s {} unsold water cubes (from all batches) evaporate.", player.name, player.get_total_water_produced())
                 player.water_batches = []
+                if self.game_state.journal is not None:
+                    self.game_state.journal.player_changed(player)
 
 
     def resolve_whim_pre_effect(self, whim_card: WhimCard):
-        """Parses and applies a Whim card's pre-round effect."""
+        """Applies a Whim card's compiled pre-round effect."""
         # Example: "DemandSegment:Connoisseurs:current_demand:+2"
-        # Example: "GlobalImpact:PINK:+1" (hypothetical pre-round impact)
-        self.game_state.game_log.append(f"  Pre-Effect ({whim_card.name}): {whim_card.pre_round_effect}")
-        try:
-            parts = whim_card.pre_round_effect.split(':')
-            effect_type = parts[0]
-
-            if effect_type == "DemandSegment":
-                segment_name, attribute, value_str = parts[1], parts[2], parts[3]
-                value = int(value_str)
-                segment = self.game_state.demand_segments.get(segment_name)
-                if segment:
-                    if hasattr(segment, attribute):
-                        current_val = getattr(segment, attribute)
-                        setattr(segment, attribute, current_val + value)
-                        self.game_state.game_log.append(f"    {segment_name} {attribute} changed by {value} to {getattr(segment, attribute)}.")
-                    else:
-                        self.game_state.game_log.append(f"    Error: Unknown attribute '{attribute}' for DemandSegment.")
-                else:
-                    self.game_state.game_log.append(f"    Error: Unknown DemandSegment '{segment_name}'.")
-            # Add more effect types as needed
-            else:
-                self.game_state.game_log.append(f"    Unknown pre-round effect type: {effect_type}")
-        except Exception as e:
-            self.game_state.game_log.append(f"    Error processing pre-effect '{whim_card.pre_round_effect}': {e}")
+        # Example: "AllSegments:current_demand:+1"
+        self.game_state.game_log.debug("  Pre-Effect ({}): {}", whim_card.name, whim_card.pre_round_effect)
+        effect = whim_pre_effect(whim_card)
 
+        if isinstance(effect, DemandShift):
+            segment = self.game_state.demand_segments.get(effect.segment)
+            if segment:
+                self._shift_segment(segment, effect.attribute, effect.value)
+            else:
+                self.game_state.game_log.info("    Error: Unknown DemandSegment '{}'.", effect.segment)
+        elif isinstance(effect, AllSegmentsShift):
+            for segment in self.game_state.demand_segments.values():
+                self._shift_segment(segment, effect.attribute, effect.value)
+        elif isinstance(effect, InvalidEffect):
+            self.game_state.game_log.info("    Error processing pre-effect '{}': {}", effect.text, effect.error)
+
+    def _shift_segment(self, segment, attribute: str, value: int):
+        setattr(segment, attribute, getattr(segment, attribute) + value)
+        if self.game_state.journal is not None:
+            self.game_state.journal.segments = True
+        self.game_state.game_log.info("    {} {} changed by {} to {}.", segment.name, attribute, value, getattr(segment, attribute))
 
     def resolve_whim_post_fallout(self, whim_card: WhimCard):
-        """Parses and applies a Whim card's post-round fallout."""
+        """Applies a Whim card's compiled post-round fallout."""
         # Example: "GlobalImpact:PINK:+2"
-        # Example: "PlayerEffect:EcoEliteBuyers:GainReputation:1"
-        self.game_state.game_log.append(f"  Post-Fallout ({whim_card.name}): {whim_card.post_round_fallout}")
-        try:
-            parts = whim_card.post_round_fallout.split(':')
-            effect_type = parts[0]
-
-            if effect_type == "GlobalImpact":
-                track_str, value_str = parts[1], parts[2]
-                value = int(value_str)
-                track_color = TrackColor[track_str.upper()] # Assumes TrackColor enum names match
-                self.game_state.add_global_impact(track_color, value)
-                self.game_state.game_log.append(f"    Global track {track_color.name} changed by {value}.")
-
-            elif effect_type == "PlayerEffect":
-                # Example: "PlayerEffect:EcoEliteBuyers:GainReputation:1"
-                target_players_key, effect_attribute, effect_value_str = parts[1], parts[2], parts[3]
-                effect_value = int(effect_value_str)
-
-                affected_players: List[Player] = []
-                if target_players_key == "EcoEliteBuyers":
-                    for p_name in self.game_state.round_sales_to_eco_elites:
-                        player_obj = next((p for p in self.game_state.players if p.name == p_name), None)
-                        if player_obj:
-                            affected_players.append(player_obj)
-                # Could add "AllPlayers", "CurrentPlayer" etc. as target_players_key
-
-                for player_to_affect in affected_players:
-                    if hasattr(player_to_affect, effect_attribute):
-                        current_player_val = getattr(player_to_affect, effect_attribute)
-                        setattr(player_to_affect, effect_attribute, current_player_val + effect_value)
-                        self.game_state.game_log.append(
-                            f"    Player {player_to_affect.name} {effect_attribute} changed by {effect_value} to {getattr(player_to_affect, effect_attribute)}."
-                        )
-                    else:
-                        self.game_state.game_log.append(f"    Error: Player has no attribute '{effect_attribute}'.")
-            else:
-                self.game_state.game_log.append(f"    Unknown post-fallout effect type: {effect_type}")
-        except Exception as e:
-            self.game_state.game_log.append(f"    Error processing post-fallout '{whim_card.post_round_fallout}': {e}")
+        # Example: "PlayerEffect:EcoEliteBuyers:reputation_stars:+1"
+        self.game_state.game_log.debug("  Post-Fallout ({}): {}", whim_card.name, whim_card.post_round_fallout)
+        effect = whim_fallout(whim_card)
+
+        if isinstance(effect, GlobalImpact):
+            self.game_state.add_global_impact(effect.track, effect.value)
+            self.game_state.game_log.info("    Global track {} changed by {}.", effect.track.name, effect.value)
+
+        elif isinstance(effect, PlayerEffect):
+            affected_players: List[Player] = []
+            if effect.target == "EcoEliteBuyers":
+                for p_name in self.game_state.round_sales_to_eco_elites:
+                    player_obj = next((p for p in self.game_state.players if p.name == p_name), None)
+                    if player_obj:
+                        affected_players.append(player_obj)
+            # Could add "AllPlayers", "CurrentPlayer" etc. as targets
+
+            for player_to_affect in affected_players:
+                setattr(player_to_affect, effect.attribute, getattr(player_to_affect, effect.attribute) + effect.value)
+                if self.game_state.journal is not None:
+                    self.game_state.journal.player_changed(player_to_affect)
+                self.game_state.game_log.info(
+                    "    Player {} {} changed by {} to {}.",
+                    player_to_affect.name, effect.attribute, effect.value, getattr(player_to_affect, effect.attribute)
+                )
+        elif isinstance(effect, InvalidEffect):
+            self.game_state.game_log.info("    Error processing post-fallout '{}': {}", effect.text, effect.error)
 
     def consolidate_player_impacts(self):
         """Move impact cubes from player storage to shared tracks."""
-        self.game_state.game_log.append("Consolidating player impacts to global tracks...")
+        self.game_state.game_log.debug("Consolidating player impacts to global tracks...")
         # Store track levels before consolidation to identify who triggered what
         previous_track_levels = {tc: track.level for tc, track in self.game_state.impact_tracks.items()}
 
         for player in self.game_state.players:
+            if self.game_state.journal is not None:
+                self.game_state.journal.player_changed(player)
             player_contributions: dict[TrackColor, int] = {} # Corrected Dict to dict
             for track_color, amount in player.impact_storage.items():
                 if amount > 0:
                     self.game_state.add_global_impact(track_color, amount) # This method logs track changes and event triggers
                     player_contributions[track_color] = amount
                     player.total_impact_contributed[track_color] = player.total_impact_contributed.get(track_color, 0) + amount # Track for tie-breaking
-                    self.game_state.game_log.append(f"  {player.name} added {amount} to {track_color.name} track.")
+                    self.game_state.game_log.info("  {} added {} to {} track.", player.name, amount, track_color.name)
                     player.impact_storage[track_color] = 0 # Reset player storage
 
             # Check if this player's contribution triggered any new global events immediately
@@ -651,10 +865,8 @@ class GameLogic:
                 if contributed_amount == 0: continue
                 track = self.game_state.impact_tracks[tc]
                 # Check Global Event Card triggers specifically caused by this player
-                for event_card in list(self.game_state.global_event_tiles_available):
-                    if event_card.trigger_track == tc and \
-                       previous_track_levels[tc] < event_card.trigger_threshold <= track.level and \
-                       event_card not in self.game_state.global_event_tiles_active:
+                for event_card in self.game_state.global_event_index.crossed(tc, previous_track_levels[tc], track.level):
+                    if event_card not in self.game_state.global_event_tiles_active:
                         # This player's contribution pushed the track over this event's threshold
                         # The trigger_global_event is now called within add_global_impact,
                         # but we need to assign blame.
@@ -671,7 +883,7 @@ class GameLogic:
                         # A simple way: if an event just got added to active_global_events and matches the track.
                         if any(e.name == event_card.name and e.trigger_track == tc for e in self.game_state.global_event_tiles_active if e not in self.game_state.previously_active_events_this_round):
                              player.triggered_global_events +=1
-                             self.game_state.game_log.append(f"  {player.name} is noted as triggering {event_card.name}.")
+                             self.game_state.game_log.info("  {} is noted as triggering {}.", player.name, event_card.name)
                 previous_track_levels[tc] = track.level # Update for next player in loop
 
     def _get_current_demand_opportunities(self, active_whim_cards: List[WhimCard]) -> List[dict]: # Corrected Dict to dict
@@ -708,41 +920,36 @@ class GameLogic:
                 generated_impact = (quantity_sold // per_cubes) * impact_amount
                 if generated_impact > 0:
                     player.impact_storage[track_color] = player.impact_storage.get(track_color, 0) + generated_impact
-                    self.game_state.game_log.append(
-                        f"  Distribution ({dist_card.name}) added {generated_impact} to {track_color.name} for selling {quantity_sold} cubes."
+                    self.game_state.game_log.info(
+                        "  Distribution ({}) added {} to {} for selling {} cubes.",
+                        dist_card.name, generated_impact, track_color.name, quantity_sold
                     )
             # Add other types of modifiers if any (e.g., flat impact per use)
 
         # Check for Bioplastic Seal type R&D upgrades for this route
         for upgrade in player.r_and_d:
             if upgrade.type == "ROUTE_UPGRADE" and hasattr(upgrade, 'target_route_slot') and upgrade.target_route_slot == player.distribution_routes.index(dist_card):
-                if "on_sell_remove_impact" in upgrade.effect_description:
-                    # E.g., "Apply_to_route: on_sell_remove_impact(TrackColor.PINK, 1)"
-                    try:
-                        parts = upgrade.effect_description.split('(')[1].split(')')[0].split(',')
-                        track_str = parts[0].split('.')[1].strip()
-                        amount_to_remove = int(parts[1].strip())
-                        track_color_to_remove = TrackColor[track_str]
-
-                        # Remove from player's impact storage IF it was added by this route, or just reduce general player impact storage.
-                        # This is tricky: if Plastic Bottles added +2 PINK, and Bioplastic Seal removes 1 PINK, net is +1 PINK.
-                        # The impact from route was already added. This should be a reduction.
-                        if player.impact_storage.get(track_color_to_remove, 0) >= amount_to_remove:
-                            player.impact_storage[track_color_to_remove] -= amount_to_remove
-                            self.game_state.game_log.append(
-                                f"  Route Upgrade '{upgrade.name}' for {dist_card.name} removed {amount_to_remove} from {track_color_to_remove.name} in player's storage."
-                            )
-                        else: # Not enough specific impact to remove, or it wasn't there.
-                             self.game_state.game_log.append(
-                                f"  Route Upgrade '{upgrade.name}' for {dist_card.name} could not remove {amount_to_remove} {track_color_to_remove.name} (not enough in storage)."
-                            )
-                    except Exception as e:
-                        self.game_state.game_log.append(f"  Error parsing route upgrade effect '{upgrade.effect_description}': {e}")
+                effect = upgrade_effect(upgrade)
+                if isinstance(effect, OnSellRemoveImpact):
+                    # The route's impact was already added to storage, so the upgrade reduces it.
+                    if player.impact_storage.get(effect.track, 0) >= effect.amount:
+                        player.impact_storage[effect.track] -= effect.amount
+                        self.game_state.game_log.info(
+                            "  Route Upgrade '{}' for {} removed {} from {} in player's storage.",
+                            upgrade.name, dist_card.name, effect.amount, effect.track.name
+                        )
+                    else: # Not enough specific impact to remove, or it wasn't there.
+                         self.game_state.game_log.info(
+                             "  Route Upgrade '{}' for {} could not remove {} {} (not enough in storage).",
+                             upgrade.name, dist_card.name, effect.amount, effect.track.name
+                         )
+                elif isinstance(effect, InvalidEffect) and "on_sell_remove_impact" in effect.text:
+                    self.game_state.game_log.info("  Error parsing route upgrade effect '{}': {}", effect.text, effect.error)
 
 
     def _apply_global_event_effects(self, event_card: GlobalEventCard):
         """Applies the mechanical effects of a triggered global event."""
-        self.game_state.game_log.append(f"APPLYING GLOBAL EVENT: {event_card.name} - {event_card.effect_description}")
+        self.game_state.game_log.info("APPLYING GLOBAL EVENT: {} - {}", event_card.name, event_card.effect_description)
         # Effects are applied to GameState or relevant entities
 
         if event_card.name == "Aquifer Collapse":
@@ -755,7 +962,7 @@ class GameLogic:
             # Effect: "Double demand across all segments. All facilities Flow –1 (overheat)."
             for seg in self.game_state.demand_segments.values():
                 seg.current_demand *= 2
-                self.game_state.game_log.append(f"  Demand for {seg.name} doubled to {seg.current_demand} due to Heatwave.")
+                self.game_state.game_log.info("  Demand for {} doubled to {} due to Heatwave.", seg.name, seg.current_demand)
             # Flow –1 is checked in action_produce_water.
 
         elif event_card.name == "Microplastic Revelation":
@@ -768,16 +975,16 @@ class GameLogic:
                         # Add impact directly to global track per player owning the route
                         self.game_state.add_global_impact(TrackColor.PINK, 3)
                         total_plastic_routes_affected+=1
-                        self.game_state.game_log.append(f"  {player.name}'s {route.name} deactivated. +3 PINK impact added directly to global track from Microplastic Revelation.")
+                        self.game_state.game_log.info("  {}'s {} deactivated. +3 PINK impact added directly to global track from Microplastic Revelation.", player.name, route.name)
             if total_plastic_routes_affected == 0:
-                 self.game_state.game_log.append(f"  Microplastic Revelation triggered, but no active Plastic Bottle routes were found to affect.")
+                 self.game_state.game_log.info("  Microplastic Revelation triggered, but no active Plastic Bottle routes were found to affect.")
 
 
         elif event_card.name == "Mass Recall":
             # Effect: "All unsold Water cubes are immediately discarded. No sales this round from tainted supply."
             for player in self.game_state.players:
                 if player.get_total_water_produced() > 0: # Check new water batch system
-                    self.game_state.game_log.append(f"  {player.name}'s {player.get_total_water_produced()} water cubes (all batches) discarded due to Mass Recall.")
+                    self.game_state.game_log.info("  {}'s {} water cubes (all batches) discarded due to Mass Recall.", player.name, player.get_total_water_produced())
                     player.water_batches = [] # Clear all batches
             # The "no sales this round" part is handled by Crowd Phase checking for this active event.
 
@@ -786,28 +993,28 @@ class GameLogic:
 
     def threshold_check_phase(self):
         """Check for track thresholds, trigger events, check game end. Global Events are now triggered by add_global_impact."""
-        self.game_state.game_log.append("\n-- Threshold Check Phase --")
+        self.game_state.game_log.info("\n-- Threshold Check Phase --")
+        if self.game_state.journal is not None: # Tracks, events and their effects, futures payouts
+            self.game_state.journal.everything = True
 
         # 0. Handle Algae Carbon Sink type cleanups (Facility Tags)
         for player in self.game_state.players:
             for facility in player.facilities:
                 if facility:
                     for upgrade in facility.upgrades: # Tags are stored as upgrades
-                        if upgrade.type == "FACILITY_TAG" and "at_cleanup_reduce_global_impact" in upgrade.effect_description:
-                            # E.g., "Passive_facility_effect: at_cleanup_reduce_global_impact(TrackColor.GREY, 1)"
-                            try:
-                                parts = upgrade.effect_description.split('(')[1].split(')')[0].split(',')
-                                track_str = parts[0].split('.')[1].strip()
-                                amount_to_reduce = int(parts[1].strip())
-                                track_color_to_reduce = TrackColor[track_str]
-
-                                if self.game_state.impact_tracks[track_color_to_reduce].level > 0:
-                                     self.game_state.impact_tracks[track_color_to_reduce].reduce_impact(amount_to_reduce)
-                                     self.game_state.game_log.append(
-                                         f"  {player.name}'s '{facility.name}' with '{upgrade.name}' reduced global {track_color_to_reduce.name} track by {amount_to_reduce}."
-                                     )
-                            except Exception as e:
-                                self.game_state.game_log.append(f"  Error parsing Algae Carbon Sink effect '{upgrade.effect_description}': {e}")
+                        if upgrade.type != "FACILITY_TAG":
+                            continue
+                        effect = upgrade_effect(upgrade)
+                        if isinstance(effect, AtCleanupReduceGlobalImpact):
+                            track = self.game_state.impact_tracks[effect.track]
+                            if track.level > 0:
+                                 track.reduce_impact(effect.amount)
+                                 self.game_state.game_log.info(
+                                     "  {}'s '{}' with '{}' reduced global {} track by {}.",
+                                     player.name, facility.name, upgrade.name, effect.track.name, effect.amount
+                                 )
+                        elif isinstance(effect, InvalidEffect) and "at_cleanup_reduce_global_impact" in effect.text:
+                            self.game_state.game_log.info("  Error parsing Algae Carbon Sink effect '{}': {}", effect.text, effect.error)
 
 
         self.resolve_aqua_futures()
@@ -815,10 +1022,8 @@ class GameLogic:
         newly_triggered_events_this_phase: List[GlobalEventCard] = []
         # Check Global Event Card triggers (these might have been missed if impact added outside consolidation)
         for track_color, track in self.game_state.impact_tracks.items():
-            for event_card in list(self.game_state.global_event_tiles_available):
-                 if event_card.trigger_track == track_color and \
-                    track.level >= event_card.trigger_threshold and \
-                    event_card not in self.game_state.global_event_tiles_active:
+            for event_card in self.game_state.global_event_index.reached(track_color, track.level):
+                 if event_card not in self.game_state.global_event_tiles_active:
                     # This event triggers now. Call GameState's method to log and add to active.
                     self.game_state.trigger_global_event(event_card) # This will log "GLOBAL EVENT TRIGGERED..."
                     # self.game_state.global_event_tiles_available.remove(event_card) # if one-time & to be removed from available
@@ -833,19 +1038,22 @@ class GameLogic:
                     if option.event_name == event_card.name and not option.has_matured:
                         option.has_matured = True
                         player.cred_coin += option.payout
-                        self.game_state.game_log.append(
-                            f"  {player.name}'s Event Option for '{event_card.name}' matured! Payout: {option.payout} CC."
+                        self.game_state.game_log.info(
+                            "  {}'s Event Option for '{}' matured! Payout: {} CC.",
+                            player.name, event_card.name, option.payout
                         )
                 # Remove matured options (or mark them as paid)
                 player.event_options = [opt for opt in player.event_options if not opt.has_matured]
 
 
         # Check for deactivation of Aquifer Collapse
-        aquifer_collapse_event = next((e for e in self.game_state.global_event_tiles_active if e.name == "Aquifer Collapse"), None)
+        aquifer_collapse_event = None
+        if self.game_state.rule_flags & RuleFlag.AQUIFER_COLLAPSE:
+            aquifer_collapse_event = next((e for e in self.game_state.global_event_tiles_active if e.name == "Aquifer Collapse"), None)
         if aquifer_collapse_event and self.game_state.impact_tracks[TrackColor.BLUE].level <= 6:
-            self.game_state.global_event_tiles_active.remove(aquifer_collapse_event)
+            self.game_state.deactivate_global_event(aquifer_collapse_event)
             # self.game_state.global_event_tiles_available.append(aquifer_collapse_event) # Or it's gone forever
-            self.game_state.game_log.append("Aquifer Collapse event ended as Depletion track is now <= 6.")
+            self.game_state.game_log.info("Aquifer Collapse event ended as Depletion track is now <= 6.")
 
 
         # Check non-event track threshold effects
@@ -853,42 +1061,212 @@ class GameLogic:
             for threshold_level, effect_desc_key in track.thresholds.items():
                 if track.level >= threshold_level:
                     if effect_desc_key not in self.game_state.active_threshold_effects:
-                        self.game_state.game_log.append(f"Threshold Effect Activated on {track.name} at level {track.level}: {self.game_state.threshold_effect_descriptions.get(effect_desc_key, effect_desc_key)}")
-                        self.game_state.active_threshold_effects.add(effect_desc_key)
+                        self.game_state.game_log.info("Threshold Effect Activated on {} at level {}: {}", track.name, track.level, self.game_state.threshold_effect_descriptions.get(effect_desc_key, effect_desc_key))
+                        self.game_state.set_threshold_effect(effect_desc_key, True)
                         # TODO: self.apply_threshold_effect_mechanics(effect_desc_key) - e.g. if it's an immediate cost change
                 elif effect_desc_key in self.game_state.active_threshold_effects:
-                     self.game_state.game_log.append(f"Threshold Effect Deactivated on {track.name}: {self.game_state.threshold_effect_descriptions.get(effect_desc_key, effect_desc_key)}")
-                     self.game_state.active_threshold_effects.remove(effect_desc_key)
+                     self.game_state.game_log.info("Threshold Effect Deactivated on {}: {}", track.name, self.game_state.threshold_effect_descriptions.get(effect_desc_key, effect_desc_key))
+                     self.game_state.set_threshold_effect(effect_desc_key, False)
                      # TODO: self.remove_threshold_effect_mechanics(effect_desc_key)
 
         self.game_state.check_for_uninhabitable()
         if self.game_state.uninhaitable:
-            self.game_state.game_log.append("Planet is Uninhabitable! Game Over.")
+            self.game_state.game_log.info("Planet is Uninhabitable! Game Over.")
             # Game proceeds to final scoring.
 
+    # --- Round state machine ---
+    # A round is a sequence of decisions. `start_round` plays up to the first one,
+    # `pending_decision` tells who must decide what, and `submit` answers it and plays on
+    # to the next. Everything needed to resume is kept on the GameState, so a paused game
+    # is plain data: nothing blocks while a player thinks, and it can be forked or pickled.
+
+    def start_round(self):
+        """Starts round `round_number` and plays up to its first decision."""
+        gs = self.game_state
+        if self.pending_decision() is not None:
+            raise RuntimeError(f"Cannot start a round while the {gs.phase.value} phase awaits a decision.")
+        gs.previously_active_events_this_round = set(gs.global_event_tiles_active) # Track for blame assignment
+        gs.track_levels_at_round_start = {tc: track.level for tc, track in gs.impact_tracks.items()}
+        gs.phase = Phase.WHIM_DRAFT
+        if self.initiate_whim_draft() is None:
+            self._begin_ops()
+
+    def start_next_round(self):
+        """Advances `round_number` and starts that round."""
+        if self.pending_decision() is not None:
+            raise RuntimeError("Cannot start the next round before this one is over.")
+        self.game_state.round_number += 1
+        self.start_round()
+
+    def pending_decision(self) -> Optional[PendingDecision]:
+        """The decision the current round waits for, or None between rounds."""
+        gs = self.game_state
+        if gs.phase == Phase.WHIM_DRAFT:
+            order_idx = gs.whim_draft_current_picker_idx_in_order
+            player_idx = gs.whim_draft_order[order_idx]
+            pick_num = gs.whim_draft_order[:order_idx + 1].count(player_idx)
+            return PendingDecision(gs.phase, gs.players[player_idx], pick_num, gs.whim_draft_options_sent_to_player)
+        if gs.phase == Phase.OPS:
+            return PendingDecision(gs.phase, gs.get_current_player(), gs.ops_action_num, [])
+        if gs.phase == Phase.CROWD_SALES:
+            return PendingDecision(gs.phase, gs.get_current_player(), 0, gs.crowd_demands)
+        return None
+
+    def submit(self, player: Player, choice) -> bool:
+        """
+        Answers the pending decision of `player` and plays on to the next decision. `choice` is the
+        index of a Whim option (or a DRAFT_PICK Action) for a draft pick, an `Action` for an Ops
+        action, or a list of `Sale`s. Returns False without changing anything if it is not
+        `player`'s decision; otherwise whether the choice was valid. An invalid or malformed choice
+        still uses up the decision, as it does in `run_round`: a pass, or no sales.
+        """
+        decision = self.pending_decision()
+        if decision is None or decision.player is not player:
+            self.game_state.game_log.info("It is not {}'s decision.", player.name)
+            return False
+        if decision.phase == Phase.WHIM_DRAFT:
+            if isinstance(choice, Action) and choice.kind == DRAFT_PICK:
+                choice = choice.args[0]
+            valid = isinstance(choice, int) and 0 <= choice < len(decision.options)
+            self._complete_draft_pick(player, choice if valid else -1)
+        elif decision.phase == Phase.OPS:
+            valid = self.apply_action(player, choice)
+            self._complete_ops_action()
+        else:
+            if isinstance(choice, (list, tuple)) and all(isinstance(sale, Sale) for sale in choice):
+                sales = list(choice)
+            else:
+                self.game_state.game_log.info("{} sent malformed sales {!r}.", player.name, choice)
+                sales = None
+            sales_made = self.resolve_sales(player, sales or [], decision.options)
+            valid = sales is not None and len(sales_made) == len(sales)
+            self._complete_sales(player, sales_made)
+        return valid
+
+    def _complete_draft_pick(self, player: Player, choice: int):
+        self.process_whim_draft_pick(player, choice)
+        if self.request_next_whim_draft_pick() is None:
+            self._begin_ops()
+
+    def _begin_ops(self):
+        gs = self.game_state
+        gs.phase = Phase.OPS
+        gs.game_log.info("\n-- Ops Phase --")
+        gs.current_player_index = 0
+        gs.ops_action_num = 1
+        self._announce_ops_action()
+
+    def _announce_ops_action(self):
+        gs = self.game_state
+        player = gs.get_current_player()
+        if gs.ops_action_num == 1:
+            gs.game_log.info("\n{}'s turn (Ops Phase).", player.name)
+        gs.game_log.debug("{}, Action {}:", player.name, gs.ops_action_num)
+
+    def _complete_ops_action(self):
+        gs = self.game_state
+        if gs.ops_action_num < 2: # 2 actions per player
+            gs.ops_action_num += 1
+        elif gs.current_player_index + 1 < len(gs.players):
+            gs.ops_action_num = 1
+            gs.current_player_index += 1
+        else:
+            gs.ops_action_num = 1
+            gs.current_player_index = 0 # Reset for Crowd Phase turn order
+            self._begin_crowd()
+            return
+        self._announce_ops_action()
+
+    def _begin_crowd(self):
+        gs = self.game_state
+        gs.game_log.info("\n-- Crowd Phase --")
+        gs.round_sales_to_eco_elites.clear() # Reset for the current round
+        revealed = self.reveal_crowd_cards()
+        if gs.rule_flags & RuleFlag.MASS_RECALL:
+            gs.game_log.info("Mass Recall event active! No sales this round from tainted supply.")
+            self._end_round()
+            return
+        gs.crowd_demands = self._get_current_demand_opportunities(revealed)
+        gs.phase = Phase.CROWD_SALES
+        self._next_seller(0)
+
+    def _next_seller(self, player_index: int):
+        """Moves the sales on to the first player from `player_index` with water, ending the phase if none has."""
+        gs = self.game_state
+        for index in range(player_index, len(gs.players)):
+            gs.current_player_index = index
+            player = gs.players[index]
+            total_player_water = player.get_total_water_produced()
+            gs.game_log.info("\n{} selling water (has {} cubes across {} batches)...", player.name, total_player_water, len(player.water_batches))
+            if total_player_water > 0:
+                return
+            gs.game_log.info("  {} has no water to sell.", player.name)
+        gs.current_player_index = 0
+        gs.crowd_demands = []
+        self._end_round()
+
+    def _complete_sales(self, player: Player, sales_made_info: List[tuple]):
+        gs = self.game_state
+        self.sell_water(player, sales_made_info, gs.crowd_demands)
+        self._next_seller(gs.current_player_index + 1)
+
+    def _end_round(self):
+        gs = self.game_state
+        self.end_crowd_phase()
+        self.threshold_check_phase()
+        # Reset round-specific states (e.g., demand segment modifiers from whims)
+        self.reset_round_modifiers()
+        gs.phase = Phase.GAME_OVER if gs.uninhaitable else Phase.ROUND_END
+
     def run_round(self, cli_callbacks: dict):
         """
-        Executes all phases of a single game round.
+        Executes all phases of a single game round, answering each decision with a callback.
         `cli_callbacks` is a dictionary containing callbacks for CLI interactions:
             'get_player_draft_choice_cb': fn(player, options, pick_number)
             'get_player_action_choice_cb': fn(player, action_num) -> calls game_logic.action_...
             'get_player_sales_choices_cb': fn(player, water, demands, tracks) -> returns sales_made
         """
-        self.game_state.previously_active_events_this_round = set(self.game_state.global_event_tiles_active) # Track for blame assignment
-        self.game_state.track_levels_at_round_start = {tc: track.level for tc, track in self.game_state.impact_tracks.items()}
-
+        self.start_round()
+        while True:
+            decision = self.pending_decision()
+            if decision is None:
+                break
+            player = decision.player
+            if decision.phase == Phase.WHIM_DRAFT:
+                try:
+                    choice = cli_callbacks['get_player_draft_choice_cb'](player, decision.options, decision.number)
+                except Exception:
+                    choice = -1
+                self._complete_draft_pick(player, -1 if choice is None else choice)
+            elif decision.phase == Phase.OPS:
+                # The callback performs the chosen action itself
+                cli_callbacks['get_player_action_choice_cb'](player, decision.number)
+                self._complete_ops_action()
+            else:
+                sales_made = cli_callbacks['get_player_sales_choices_cb'](
+                    player, player.water_batches, decision.options, self.game_state.impact_tracks
+                )
+                self._complete_sales(player, sales_made)
 
-        self.whim_draft_phase(cli_callbacks['get_player_draft_choice_cb'])
-        self.ops_phase(cli_callbacks['get_player_action_choice_cb'])
-        self.crowd_phase(cli_callbacks['get_player_sales_choices_cb'])
-        self.threshold_check_phase()
-        # Reset round-specific states (e.g., demand segment modifiers from whims)
-        self.reset_round_modifiers()
 
+    def run_game(self, callbacks: dict, max_rounds: Optional[int] = None) -> List[Tuple[str, Dict[str, int]]]:
+        """
+        Plays rounds with `run_round` until the planet is Uninhabitable or `max_rounds`
+        rounds have been played, then returns the result of `final_scoring`.
+        """
+        gs = self.game_state
+        while not gs.uninhaitable:
+            self.run_round(callbacks)
+            if gs.uninhaitable or (max_rounds is not None and gs.round_number >= max_rounds):
+                break
+            gs.round_number += 1
+        return self.final_scoring()
 
     def reset_round_modifiers(self):
         """Resets temporary modifiers at the end of a round (e.g., demand segment values to base)."""
-        self.game_state.game_log.append("Resetting round modifiers...")
+        self.game_state.game_log.debug("Resetting round modifiers...")
+        if self.game_state.journal is not None:
+            self.game_state.journal.segments = True
         # Ensure base definitions are stored if not already
         if not hasattr(self.game_state, 'demand_segments_base_definitions') or not self.game_state.demand_segments_base_definitions :
              self.game_state.demand_segments_base_definitions = {
@@ -901,13 +1279,13 @@ class GameLogic:
             if segment:
                 segment.current_demand = base_data['base_demand']
                 segment.current_price = base_data['base_price']
-        self.game_state.game_log.append("Demand segments reset to base values.")
+        self.game_state.game_log.info("Demand segments reset to base values.")
         # Any other temporary effects should be reset here.
         # For example, if Whims add temporary player abilities or card states.
 
     def resolve_aqua_futures(self):
         """Evaluates and cashes out matured futures tokens at Threshold Check."""
-        self.game_state.game_log.append("Evaluating Aqua-Futures Market...")
+        self.game_state.game_log.debug("Evaluating Aqua-Futures Market...")
 
         # Calculate track changes this round
         track_changes_this_round: Dict[TrackColor, int] = {}
@@ -937,13 +1315,15 @@ class GameLogic:
 
                 if matured:
                     player.cred_coin += token.payout
-                    self.game_state.game_log.append(
-                        f"{player.name}'s {('Long' if token.is_long else 'Short')} {token.track.name} future matured! Payout: {token.payout} CC."
+                    self.game_state.game_log.info(
+                        "{}'s {} {} future matured! Payout: {} CC.",
+                        player.name, 'Long' if token.is_long else 'Short', token.track.name, token.payout
                     )
                     matured_futures.append(token)
                 elif spoiled:
-                    self.game_state.game_log.append(
-                        f"{player.name}'s {('Long' if token.is_long else 'Short')} {token.track.name} future spoiled."
+                    self.game_state.game_log.info(
+                        "{}'s {} {} future spoiled.",
+                        player.name, 'Long' if token.is_long else 'Short', token.track.name
                     )
                     spoiled_futures.append(token)
 
@@ -951,11 +1331,11 @@ class GameLogic:
             player.futures_tokens = [t for t in player.futures_tokens if t not in matured_futures and t not in spoiled_futures]
 
 
-    def final_scoring(self):
-        """Calculates and logs final scores for all players."""
-        self.game_state.game_log.append("\n--- Final Scoring ---")
+    def final_scoring(self) -> List[Tuple[str, Dict[str, int]]]:
+        """Calculates and logs final scores. Returns (player_name, score_info) pairs, best first."""
+        self.game_state.game_log.info("\n--- Final Scoring ---")
         scores: Dict[str, Dict[str, any]] = {} # Store score and tie_breaker_value
-        self.game_state.game_log.append("\n--- Final Scoring Details ---")
+        self.game_state.game_log.info("\n--- Final Scoring Details ---")
 
         for player in self.game_state.players:
             base_score = player.cred_coin
@@ -975,20 +1355,24 @@ class GameLogic:
                 "vp": final_score,
                 "tie_breaker_impact": total_impact_spilled_sum
             }
-            self.game_state.game_log.append(
-                f"{player.name}: \n"
-                f"  CredCoin: {player.cred_coin} VP\n"
-                f"  Reputation Stars: {player.reputation_stars} VP\n"
-                f"  Diversity Bonus ({len(player.routes_built_this_game)} distinct routes): +{diversity_bonus} VP\n"
-                f"  Global Event Penalties ({player.triggered_global_events} events * -2): -{penalties} VP\n"
-                f"  ----------------------------------\n"
-                f"  Total VP: {final_score}\n"
-                f"  Total Impact Spilled (for tie-breaking): {total_impact_spilled_sum}"
+            self.game_state.game_log.info(
+                "{}: \n"
+                "  CredCoin: {} VP\n"
+                "  Reputation Stars: {} VP\n"
+                "  Diversity Bonus ({} distinct routes): +{} VP\n"
+                "  Global Event Penalties ({} events * -2): -{} VP\n"
+                "  ----------------------------------\n"
+                "  Total VP: {}\n"
+                "  Total Impact Spilled (for tie-breaking): {}",
+                player.name, player.cred_coin, player.reputation_stars,
+                len(player.routes_built_this_game), diversity_bonus,
+                player.triggered_global_events, penalties,
+                final_score, total_impact_spilled_sum
             )
 
         if not scores:
-            self.game_state.game_log.append("\nNo scores to determine a winner.")
-            return
+            self.game_state.game_log.info("\nNo scores to determine a winner.")
+            return []
 
         # Determine winner
         # Sort players first by VP (descending), then by total_impact_spilled (ascending)
@@ -999,23 +1383,25 @@ class GameLogic:
         )
 
         if not sorted_players:
-             self.game_state.game_log.append("\nNo players to determine a winner.")
-             return
+             self.game_state.game_log.info("\nNo players to determine a winner.")
+             return []
 
         winner_name = sorted_players[0][0]
         winner_score_info = sorted_players[0][1]
 
-        self.game_state.game_log.append(
-            f"\n🏆 Winner: {winner_name} with {winner_score_info['vp']} VP "
-            f"(Impact: {winner_score_info['tie_breaker_impact']}) 🏆"
+        self.game_state.game_log.info(
+            "\n🏆 Winner: {} with {} VP (Impact: {}) 🏆",
+            winner_name, winner_score_info['vp'], winner_score_info['tie_breaker_impact']
         )
 
         if len(sorted_players) > 1:
-            self.game_state.game_log.append("\n--- Rankings ---")
+            self.game_state.game_log.info("\n--- Rankings ---")
             for i, (name, score_info) in enumerate(sorted_players):
-                self.game_state.game_log.append(
-                    f"{i+1}. {name}: {score_info['vp']} VP (Impact: {score_info['tie_breaker_impact']})"
+                self.game_state.game_log.info(
+                    "{}. {}: {} VP (Impact: {})",
+                    i+1, name, score_info['vp'], score_info['tie_breaker_impact']
                 )
+        return sorted_players
 
 
 if __name__ == '__main__':
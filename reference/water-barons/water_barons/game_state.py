@@ -1,5 +1,8 @@
-from typing import List, Dict, Optional
-import pickle
+from bisect import bisect_right
+from enum import Enum, IntFlag
+from typing import List, Dict, Optional, Iterable, Set
+import copy
+import random
 from water_barons.game_entities import (
     TrackColor,
     Player,
@@ -12,6 +15,7 @@ from water_barons.game_entities import (
     UpgradeCard,
 )
 from water_barons import game_metadata
+from water_barons.game_log import GameLog, LogLevel
 
 class ImpactTrack:
     """Represents one of the four global impact tracks."""
@@ -39,12 +43,173 @@ class ImpactTrack:
     def reduce_impact(self, amount: int):
         self.level = max(0, self.level - amount)
 
+    def copy(self) -> "ImpactTrack":
+        """A copy with its own level; the threshold table is static and shared."""
+        clone = ImpactTrack.__new__(ImpactTrack)
+        clone.__dict__.update(self.__dict__)
+        return clone
+
     def __repr__(self):
         return f"ImpactTrack({self.name}, Level: {self.level}/{self.max_level})"
 
+class RuleFlag(IntFlag):
+    """Active Global Events and threshold effects that game rules check for."""
+    NONE = 0
+    AQUIFER_COLLAPSE = 1 << 0
+    HEATWAVE_FRENZY = 1 << 1
+    MICROPLASTIC_REVELATION = 1 << 2
+    MASS_RECALL = 1 << 3
+    CO2_LEVEL_6 = 1 << 4
+    DEP_LEVEL_5 = 1 << 5
+    TOX_LEVEL_7 = 1 << 6
+
+
+# Global Event names and threshold effect keys with rule flags. Others have no mechanical rules yet.
+EVENT_RULE_FLAGS: Dict[str, RuleFlag] = {
+    "Aquifer Collapse": RuleFlag.AQUIFER_COLLAPSE,
+    "Heatwave Frenzy": RuleFlag.HEATWAVE_FRENZY,
+    "Microplastic Revelation": RuleFlag.MICROPLASTIC_REVELATION,
+    "Mass Recall": RuleFlag.MASS_RECALL,
+}
+THRESHOLD_RULE_FLAGS: Dict[str, RuleFlag] = {
+    "CO2_Level_6_Effect": RuleFlag.CO2_LEVEL_6,
+    "DEP_Level_5_Effect": RuleFlag.DEP_LEVEL_5,
+    "TOX_Level_7_Effect": RuleFlag.TOX_LEVEL_7,
+}
+
+
+class Phase(Enum):
+    """Where the current round stands. The decision phases wait for `GameLogic.submit`."""
+    SETUP = "setup"              # No round started yet
+    WHIM_DRAFT = "whim_draft"    # Waiting for a Whim draft pick
+    OPS = "ops"                  # Waiting for an Ops action
+    CROWD_SALES = "crowd_sales"  # Waiting for a player's sales
+    ROUND_END = "round_end"      # Round finished; the next one can start
+    GAME_OVER = "game_over"      # Round finished with the planet Uninhabitable
+
+
+class ChangeJournal:
+    """
+    Which players (by name), impact tracks and demand segments `GameLogic` changed since an
+    observer last called `drain()`, e.g. to re-serialize only those. Changes are recorded only
+    while a journal is attached (`GameState.attach_journal`); without one every recording point
+    is a single None check. `everything` is set where a step touches too much to list.
+    """
+    __slots__ = ("players", "tracks", "segments", "everything")
+
+    def __init__(self):
+        self.players: Set[str] = set()
+        self.tracks: bool = False
+        self.segments: bool = False
+        self.everything: bool = True # Nothing has been observed yet
+
+    def player_changed(self, player: Player):
+        self.players.add(player.name)
+
+    def drain(self) -> "ChangeJournal":
+        """The changes recorded so far; the journal starts over empty."""
+        changes = ChangeJournal()
+        changes.players, self.players = self.players, set()
+        changes.tracks, changes.segments, changes.everything = self.tracks, self.segments, self.everything
+        self.tracks = self.segments = self.everything = False
+        return changes
+
+
+class EventTriggerIndex:
+    """
+    Global Event tiles grouped by trigger track and sorted by trigger threshold.
+    Finding the events a level change triggers is a bisect over the levels crossed.
+    Each lookup first compares a fingerprint of `tiles` (each tile and its trigger) with
+    the one the index was built from, so changing the list or a trigger in place is
+    picked up without any call from the caller.
+    """
+    def __init__(self, tiles: List[GlobalEventCard]):
+        self.tiles = tiles
+        self._fingerprint: Optional[tuple] = None
+        self._thresholds: Dict[TrackColor, List[int]] = {}
+        self._events: Dict[TrackColor, List[GlobalEventCard]] = {}
+
+    def _ensure_current(self):
+        fingerprint = tuple((id(e), e.trigger_track, e.trigger_threshold) for e in self.tiles)
+        if fingerprint == self._fingerprint:
+            return
+        by_track: Dict[TrackColor, List[GlobalEventCard]] = {}
+        for event_card in self.tiles:
+            by_track.setdefault(event_card.trigger_track, []).append(event_card)
+        self._events = {}
+        self._thresholds = {}
+        for track_color, events in by_track.items():
+            events.sort(key=lambda e: e.trigger_threshold) # Stable: ties keep deck order
+            self._events[track_color] = events
+            self._thresholds[track_color] = [e.trigger_threshold for e in events]
+        self._fingerprint = fingerprint
+
+    def fork(self, tiles: List[GlobalEventCard]) -> "EventTriggerIndex":
+        """An index over `tiles`, a copy of `self.tiles`, reusing the grouping already built (it holds no mutable state)."""
+        clone = EventTriggerIndex(tiles)
+        clone._fingerprint, clone._thresholds, clone._events = self._fingerprint, self._thresholds, self._events
+        return clone
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_fingerprint'] = None # Ids do not survive pickling; rebuild on the first lookup
+        return state
+
+    def crossed(self, track_color: TrackColor, old_level: int, new_level: int) -> List[GlobalEventCard]:
+        """Events on `track_color` whose threshold lies in (old_level, new_level]."""
+        if new_level <= old_level:
+            return []
+        self._ensure_current()
+        thresholds = self._thresholds.get(track_color)
+        if not thresholds:
+            return []
+        return self._events[track_color][bisect_right(thresholds, old_level):bisect_right(thresholds, new_level)]
+
+    def reached(self, track_color: TrackColor, level: int) -> List[GlobalEventCard]:
+        """Events on `track_color` whose threshold is at or below `level`."""
+        self._ensure_current()
+        thresholds = self._thresholds.get(track_color)
+        if not thresholds:
+            return []
+        return self._events[track_color][:bisect_right(thresholds, level)]
+
+
+def _fork_card(card: Optional[Card], built_cards: Dict[int, Card]) -> Optional[Card]:
+    if card is None:
+        return None
+    clone = built_cards.get(id(card))
+    if clone is None:
+        clone = built_cards[id(card)] = card.copy()
+    return clone
+
+
+def _fork_player(player: Player, built_cards: Dict[int, Card]) -> Player:
+    """Copies a player for `GameState.fork`: built cards, batches and event options are copied, dealt cards shared."""
+    clone = Player(player.name)
+    clone.cred_coin = player.cred_coin
+    clone.facilities = [_fork_card(card, built_cards) for card in player.facilities]
+    clone.distribution_routes = [_fork_card(card, built_cards) for card in player.distribution_routes]
+    clone.r_and_d = player.r_and_d.copy()
+    clone.impact_storage = player.impact_storage.copy()
+    clone.total_impact_contributed = player.total_impact_contributed.copy()
+    clone.futures_tokens = player.futures_tokens.copy()
+    clone.event_options = [copy.copy(option) for option in player.event_options]
+    clone.reputation_stars = player.reputation_stars
+    clone.hand_cards = player.hand_cards.copy()
+    clone.water_batches = [batch.copy() for batch in player.water_batches]
+    clone.triggered_global_events = player.triggered_global_events
+    clone.draw_extra_whim_flag = player.draw_extra_whim_flag
+    clone.routes_built_this_game = player.routes_built_this_game.copy()
+    return clone
+
+
 class GameState:
     """Holds the entire state of the game."""
-    def __init__(self, num_players: int, player_names: List[str]):
+    def __init__(self, num_players: int, player_names: List[str], seed: Optional[int] = None,
+                 log_level: LogLevel = LogLevel.DEBUG):
+        # Every shuffle of this game goes through `rng`, so (seed, player decisions) reproduce it exactly.
+        self.seed: int = seed if seed is not None else random.randrange(2**63)
+        self.rng: random.Random = random.Random(self.seed)
         self.players: List[Player] = [Player(name) for name in player_names]
         self.current_player_index: int = 0
         self.round_number: int = 1
@@ -64,7 +229,8 @@ class GameState:
         self.whim_deck_source: List[WhimCard] = [] # All available Whim cards
         self.crowd_deck: List[WhimCard] = []
         self.whim_discard_pile: List[WhimCard] = [] # Face-up history
-        self.global_event_tiles_available: List[GlobalEventCard] = []
+        self.crowd_cards_in_play: List[WhimCard] = [] # Crowd cards revealed this Crowd phase
+        self.global_event_tiles_available: List[GlobalEventCard] = [] # Property; assigning rebuilds the trigger index
         self.global_event_tiles_active: List[GlobalEventCard] = [] # Events that have triggered
 
         # Build demand segments from metadata
@@ -80,7 +246,7 @@ class GameState:
 
         self.aqua_futures_market_open: bool = True # Or some other mechanism
         self.uninhaitable: bool = False
-        self.game_log: List[str] = [] # For recording significant events
+        self.game_log: GameLog = GameLog(log_level) # For recording significant events; LogLevel.OFF disables it
         self.game_wide_counters: Dict[str, int] = {
             "GlacialTap_built": 0,
         }
@@ -89,8 +255,18 @@ class GameState:
         self.track_levels_at_round_start: Dict[TrackColor, int] = {}
         self.previously_active_events_this_round: set[GlobalEventCard] = set()
         self.active_threshold_effects: set[str] = set() # Stores keys of active non-event threshold effects
+        # Flags of active events and threshold effects, kept in step with the two collections above
+        self.rule_flags: RuleFlag = RuleFlag.NONE
         self.round_sales_to_eco_elites: set[str] = set() # Player names who sold to Eco-Elites this round
 
+        # Round state machine (see GameLogic.pending_decision and GameLogic.submit)
+        self.phase: Phase = Phase.SETUP
+        self.ops_action_num: int = 1 # Which of the current player's Ops actions is being asked for
+        self.crowd_demands: List[dict] = [] # Demand opportunities on offer during Crowd-phase sales
+
+        # Change journal for observers such as the web app's serializer; None unless attached
+        self.journal: Optional[ChangeJournal] = None
+
         # Whim Draft State
         self.whim_draft_active: bool = False
         self.whim_draft_player_picks_remaining: Dict[int, int] = {} # player_idx: picks_left
@@ -110,6 +286,16 @@ class GameState:
         )
 
 
+    @property
+    def global_event_tiles_available(self) -> List[GlobalEventCard]:
+        return self._global_event_tiles_available
+
+    @global_event_tiles_available.setter
+    def global_event_tiles_available(self, tiles: Iterable[GlobalEventCard]):
+        tiles = list(tiles)
+        self._global_event_tiles_available = tiles
+        self.global_event_index = EventTriggerIndex(tiles)
+
     def _initialize_track_thresholds(self):
         """Populate threshold dictionaries for each impact track from metadata."""
         for track_data in game_metadata.IMPACT_TRACKS_DATA:
@@ -126,28 +312,68 @@ class GameState:
     def next_player(self):
         self.current_player_index = (self.current_player_index + 1) % len(self.players)
 
+    def attach_journal(self) -> ChangeJournal:
+        """Starts recording changes (see ChangeJournal) and returns the journal; attaching twice returns the same one."""
+        if self.journal is None:
+            self.journal = ChangeJournal()
+        return self.journal
+
+    def detach_journal(self):
+        self.journal = None
+
     def add_global_impact(self, track_color: TrackColor, amount: int):
         """Adds impact from a player's storage or direct action to a global track."""
         track = self.impact_tracks[track_color]
+        if self.journal is not None:
+            self.journal.tracks = True
+        old_level = track.level
         if track.add_impact(amount):
             # Potentially trigger threshold effects here or in a dedicated check phase
-            self.game_log.append(f"Track {track.name} crossed a threshold, now at {track.level}.")
+            self.game_log.info("Track {} crossed a threshold, now at {}.", track.name, track.level)
 
-        # Check for Global Event triggers based on specific card definitions
-        for event_card in self.global_event_tiles_available:
-            if event_card.trigger_track == track_color and track.level >= event_card.trigger_threshold:
-                self.trigger_global_event(event_card)
-                # Potentially remove event card from available if it's a one-time trigger for that level
-                # Or move to active events. This logic will be refined.
+        # Trigger the Global Events whose thresholds this change crossed.
+        # Events already past their threshold are picked up by the Threshold Check phase.
+        for event_card in self.global_event_index.crossed(track_color, old_level, track.level):
+            self.trigger_global_event(event_card)
+            # Potentially remove event card from available if it's a one-time trigger for that level
+            # Or move to active events. This logic will be refined.
 
     def trigger_global_event(self, event_card: GlobalEventCard):
         if event_card not in self.global_event_tiles_active:
             self.global_event_tiles_active.append(event_card)
+            self.rule_flags |= EVENT_RULE_FLAGS.get(event_card.name, RuleFlag.NONE)
+            if self.journal is not None:
+                self.journal.everything = True
             # self.global_event_tiles_available.remove(event_card) # If they are unique and one-time
-            self.game_log.append(f"GLOBAL EVENT TRIGGERED: {event_card.name} - {event_card.effect_description}")
+            self.game_log.info("GLOBAL EVENT TRIGGERED: {} - {}", event_card.name, event_card.effect_description)
             # Apply immediate effects of the global event. This will need more detailed logic.
             # For now, just logging.
 
+    def deactivate_global_event(self, event_card: GlobalEventCard):
+        """Removes an event from the active events, e.g. when the condition that sustains it ends."""
+        self.global_event_tiles_active.remove(event_card)
+        if not any(e.name == event_card.name for e in self.global_event_tiles_active):
+            self.rule_flags &= ~EVENT_RULE_FLAGS.get(event_card.name, RuleFlag.NONE)
+
+    def set_threshold_effect(self, effect_key: str, active: bool):
+        """Marks a non-event threshold effect as active or inactive."""
+        flag = THRESHOLD_RULE_FLAGS.get(effect_key, RuleFlag.NONE)
+        if active:
+            self.active_threshold_effects.add(effect_key)
+            self.rule_flags |= flag
+        else:
+            self.active_threshold_effects.discard(effect_key)
+            self.rule_flags &= ~flag
+
+    def refresh_rule_flags(self):
+        """Recomputes `rule_flags` from the active events and threshold effects."""
+        flags = RuleFlag.NONE
+        for event_card in self.global_event_tiles_active:
+            flags |= EVENT_RULE_FLAGS.get(event_card.name, RuleFlag.NONE)
+        for effect_key in self.active_threshold_effects:
+            flags |= THRESHOLD_RULE_FLAGS.get(effect_key, RuleFlag.NONE)
+        self.rule_flags = flags
+
     def check_for_uninhabitable(self):
         """Checks if three impact tracks are at max level."""
         maxed_out_tracks = 0
@@ -157,23 +383,97 @@ class GameState:
 
         if maxed_out_tracks >= 3:
             self.uninhaitable = True
-            self.game_log.append("PLANET UNINHABITABLE! Proceeding to Final Scoring.")
+            self.game_log.info("PLANET UNINHABITABLE! Proceeding to Final Scoring.")
             # End game logic will be handled elsewhere
 
     def __repr__(self):
         return (f"GameState(Round: {self.round_number}, Player: {self.get_current_player().name}, "
                 f"Tracks: {[str(t) for t in self.impact_tracks.values()]})")
 
+    def fork(self, log_level: Optional[LogLevel] = None) -> 'GameState':
+        """
+        An independent copy of this state for lookahead (search, "what if" analysis), much cheaper than
+        pickling or `copy.deepcopy` because card definitions are shared instead of copied.
+
+        Deck cards, upgrades, Whims, Global Event tiles and futures tokens are never mutated once dealt,
+        so the copy shares them. Everything that play changes is copied: players and the cards they
+        built, impact track levels, deck and discard lists, demand segments, active events and effects,
+        round and draft bookkeeping, the RNG and the game log (at `log_level`, default unchanged).
+        """
+        clone = GameState.__new__(GameState)
+        clone.seed = self.seed
+        clone.rng = random.Random()
+        clone.rng.setstate(self.rng.getstate())
+        built_cards: Dict[int, Card] = {} # id(original) -> copy, so built cards shared between players stay shared
+        clone.players = [_fork_player(player, built_cards) for player in self.players]
+        clone.current_player_index = self.current_player_index
+        clone.round_number = self.round_number
+        clone.impact_tracks = {color: track.copy() for color, track in self.impact_tracks.items()}
+
+        clone.facility_deck = self.facility_deck.copy()
+        clone.distribution_deck = self.distribution_deck.copy()
+        clone.upgrade_deck = self.upgrade_deck.copy()
+        clone.whim_deck_source = self.whim_deck_source.copy()
+        clone.crowd_deck = self.crowd_deck.copy()
+        clone.whim_discard_pile = self.whim_discard_pile.copy()
+        clone.crowd_cards_in_play = self.crowd_cards_in_play.copy()
+        tiles = self._global_event_tiles_available.copy()
+        clone._global_event_tiles_available = tiles
+        clone.global_event_index = self.global_event_index.fork(tiles)
+        clone.global_event_tiles_active = self.global_event_tiles_active.copy()
+
+        clone.demand_segments = {
+            name: DemandSegment(seg.name, seg.current_demand, seg.current_price, seg.values_description)
+            for name, seg in self.demand_segments.items()
+        }
+        clone.aqua_futures_market_open = self.aqua_futures_market_open
+        clone.uninhaitable = self.uninhaitable
+        clone.game_log = self.game_log.copy(log_level)
+        clone.game_wide_counters = self.game_wide_counters.copy()
+
+        clone.track_levels_at_round_start = self.track_levels_at_round_start.copy()
+        clone.previously_active_events_this_round = self.previously_active_events_this_round.copy()
+        clone.active_threshold_effects = self.active_threshold_effects.copy()
+        clone.rule_flags = self.rule_flags
+        clone.round_sales_to_eco_elites = self.round_sales_to_eco_elites.copy()
+
+        clone.phase = self.phase
+        clone.ops_action_num = self.ops_action_num
+        clone.crowd_demands = [ # Rebound to the copied segments
+            dict(opp, original_segment_rules=clone.demand_segments.get(opp['name'], opp['original_segment_rules']))
+            for opp in self.crowd_demands
+        ]
+
+        clone.whim_draft_active = self.whim_draft_active
+        clone.whim_draft_player_picks_remaining = self.whim_draft_player_picks_remaining.copy()
+        clone.whim_draft_order = self.whim_draft_order.copy()
+        clone.whim_draft_current_picker_idx_in_order = self.whim_draft_current_picker_idx_in_order
+        clone.whim_draft_options_sent_to_player = self.whim_draft_options_sent_to_player.copy()
+
+        clone.journal = None # Observers watch the original, not lookahead copies
+
+        # Static tables, never written during play
+        clone.demand_segments_base_definitions = self.demand_segments_base_definitions
+        clone.threshold_effect_descriptions = self.threshold_effect_descriptions
+        return clone
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['journal'] = None # Observers do not travel with saved or pickled games
+        return state
+
     def save_to_file(self, filepath: str) -> None:
-        """Serialize the game state to a file using pickle."""
+        """Saves the game state to a file in the compact binary format (see water_barons/savefile.py)."""
+        from water_barons.savefile import encode_state # Imports this module
         with open(filepath, 'wb') as f:
-            pickle.dump(self, f)
+            f.write(encode_state(self))
 
     @staticmethod
     def load_from_file(filepath: str) -> 'GameState':
-        """Load a game state previously saved with `save_to_file`."""
+        """Load a game state previously saved with `save_to_file`. Raises SaveFormatError for anything else."""
+        from water_barons.savefile import decode_state
         with open(filepath, 'rb') as f:
-            return pickle.load(f)
+            return decode_state(f.read())
 
 if __name__ == '__main__':
     gs = GameState(num_players=2, player_names=["Alice", "Bob"])
@@ -0,0 +1,317 @@
+"""Monte Carlo Tree Search player.
+
+`MCTSPolicy` answers the same three decisions as the other policies (Whim draft
+picks, Ops actions and Crowd-phase sales) by searching. Every iteration forks
+the game, shuffles the cards the player cannot see, applies one candidate
+decision through the real `GameLogic` methods, plays out the rest of the round
+plus a few more rounds and scores the result. Decisions met on the way (by any
+player) are chosen with UCT while they are inside the tree and by a fast
+rollout policy once outside it, e.g.:
+
+    python -m water_barons.simulate --games 20 --workers 4 --policies mcts greedy
+
+The budget per decision is a number of iterations, a time limit or both. With
+`workers` > 1 the same budget is searched independently in several processes
+and the root statistics are merged (root parallelization).
+"""
+import math
+import random
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from water_barons.actions import MARKET_SIZE, Sale
+from water_barons.game_entities import Player
+from water_barons.game_log import LogLevel
+from water_barons.game_logic import GameLogic, PendingDecision
+from water_barons.game_state import Phase
+from water_barons.policies import POLICIES, Policy, candidate_actions, greedy_sales
+
+VP_SCALE = 10.0  # VP lead that counts as a clear win: a lead of VP_SCALE scores about 0.88
+
+
+def candidate_sales(game, player: Player, demand_opportunities: List[dict]) -> List[Tuple[Sale, ...]]:
+    """Sale plans worth comparing: greedy over all routes, greedy over each single route, and selling nothing."""
+    plans = [tuple(greedy_sales(game, player, demand_opportunities))]
+    active_slots = [slot for slot, r in enumerate(player.distribution_routes) if r and r.is_active]
+    if len(active_slots) > 1:
+        for slot in active_slots:
+            plans.append(tuple(greedy_sales(game, player, demand_opportunities, (slot,))))
+    plans.append(())
+    return list(dict.fromkeys(plans))
+
+
+def determinize(game: GameLogic, rng: random.Random) -> None:
+    """
+    Shuffles what no player can see in a forked game: the decks below their markets, the
+    Whim source below the options on offer and the Crowd deck. Reseeds the game's RNG so
+    later shuffles differ between iterations too.
+    """
+    gs = game.game_state
+    for deck, visible in ((gs.facility_deck, MARKET_SIZE), (gs.distribution_deck, MARKET_SIZE),
+                          (gs.upgrade_deck, MARKET_SIZE),
+                          (gs.whim_deck_source, len(gs.whim_draft_options_sent_to_player))):
+        hidden = deck[visible:]
+        rng.shuffle(hidden)
+        deck[visible:] = hidden
+    rng.shuffle(gs.crowd_deck)
+    gs.rng.seed(rng.getrandbits(64))
+
+
+def rewards(game: GameLogic) -> List[float]:
+    """Scores a played-out game for each seat in [0, 1] by its VP lead over the best other player."""
+    vp = {name: info['vp'] for name, info in game.final_scoring()}
+    scores = [vp[p.name] for p in game.game_state.players]
+    result = []
+    for seat, score in enumerate(scores):
+        others = scores[:seat] + scores[seat + 1:]
+        lead = score - max(others) if others else score
+        result.append(0.5 + 0.5 * math.tanh(lead / VP_SCALE))
+    return result
+
+
+class Node:
+    """A decision in the search tree, reached by `choice` of the player at `mover`."""
+
+    __slots__ = ("choice", "mover", "children", "visits", "reward")
+
+    def __init__(self):
+        self.children: Dict[Hashable, "Node"] = {}
+        self.reset(None, -1)
+
+    def reset(self, choice: Hashable, mover: int):
+        self.choice = choice
+        self.mover = mover
+        self.children.clear()
+        self.visits = 0
+        self.reward = 0.0  # Sum of `mover`'s rewards over the visits
+
+    def uct(self, parent_visits: int, exploration: float) -> float:
+        return self.reward / self.visits + exploration * math.sqrt(math.log(parent_visits) / self.visits)
+
+
+class NodePool:
+    """Preallocated tree nodes, handed out in order and all taken back at once when a search ends."""
+
+    def __init__(self, size: int = 1024):
+        self._nodes = [Node() for _ in range(size)]
+        self._used = 0
+
+    def acquire(self, choice: Hashable = None, mover: int = -1) -> Node:
+        if self._used == len(self._nodes):
+            self._nodes.extend(Node() for _ in range(len(self._nodes)))
+        node = self._nodes[self._used]
+        self._used += 1
+        node.reset(choice, mover)
+        return node
+
+    def release_all(self):
+        self._used = 0
+
+    def __len__(self) -> int:
+        return self._used
+
+    @property
+    def capacity(self) -> int:
+        return len(self._nodes)
+
+
+class _Walk:
+    """The decisions of one iteration: UCT while inside the tree, the rollout policy after expanding a node."""
+
+    def __init__(self, root: Node, pool: NodePool, rng: random.Random, exploration: float):
+        self.node = root
+        self.path = [root]
+        self.in_tree = True
+        self.pool = pool
+        self.rng = rng
+        self.exploration = exploration
+
+    def choose(self, mover: int, choices, rollout_choice=None):
+        """Picks among `choices` (a sequence, or a callable making one) for the player at `mover`."""
+        if not self.in_tree:
+            return rollout_choice()
+        if callable(choices):
+            choices = choices()
+        node = self.node
+        untried = [c for c in choices if c not in node.children]
+        if untried:
+            choice = self.rng.choice(untried)
+            child = node.children[choice] = self.pool.acquire(choice, mover)
+            self.in_tree = False
+        else:
+            # Legal choices vary between determinizations; only this iteration's are candidates
+            parent_visits = max(node.visits, 1)
+            child = max((node.children[c] for c in choices),
+                        key=lambda n: n.uct(parent_visits, self.exploration))
+        self.node = child
+        self.path.append(child)
+        return child.choice
+
+
+def _walk_chooser(walk: _Walk, rollout: Policy):
+    """Answers every decision of a simulated game from `walk`, falling back on `rollout` outside the tree."""
+
+    def choose(game: GameLogic, decision: PendingDecision):
+        player = decision.player
+        mover = game.game_state.players.index(player)
+        if decision.phase == Phase.WHIM_DRAFT:
+            return walk.choose(mover, range(len(decision.options)),
+                               lambda: rollout.choose_draft_pick(game, player, decision.options, decision.number))
+        if decision.phase == Phase.OPS:
+            return walk.choose(mover, lambda: candidate_actions(game, player),
+                               lambda: rollout.choose_action(game, player, decision.number))
+        return walk.choose(mover, lambda: candidate_sales(game, player, decision.options),
+                           lambda: rollout.choose_sales(game, player, decision.options))
+
+    return choose
+
+
+def play_out(game: GameLogic, choice, choose, horizon: int) -> None:
+    """
+    Submits `choice` for the game's pending decision, then answers every later decision with
+    `choose(game, decision)` to the end of the round and for up to `horizon` more rounds.
+    """
+    decision = game.pending_decision()
+    game.submit(decision.player, choice)
+    rounds_left = horizon
+    while True:
+        decision = game.pending_decision()
+        if decision is not None:
+            game.submit(decision.player, choose(game, decision))
+        elif game.game_state.phase == Phase.GAME_OVER or rounds_left == 0:
+            return
+        else:
+            rounds_left -= 1
+            game.start_next_round()
+
+
+def run_search(game: GameLogic, choices: Sequence[Hashable], *,
+               iterations: Optional[int], time_limit: Optional[float], exploration: float,
+               horizon: int, rollout: str, seed: int, pool: NodePool) -> Dict[Hashable, Tuple[int, float]]:
+    """
+    Searches the game's pending decision for at most `iterations` iterations and `time_limit`
+    seconds (at least one iteration) and returns {choice: (visits, total reward)} for `choices`.
+    """
+    mover = game.game_state.players.index(game.pending_decision().player)
+    rng = random.Random(seed)
+    rollout_policy = POLICIES[rollout](random.Random(rng.getrandbits(64)))
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    pool.release_all()
+    root = pool.acquire()
+    done = 0
+    while True:
+        sim = game.fork(LogLevel.OFF)
+        determinize(sim, rng)
+        walk = _Walk(root, pool, rng, exploration)
+        choice = walk.choose(mover, choices)
+        play_out(sim, choice, _walk_chooser(walk, rollout_policy), horizon)
+        result = rewards(sim)
+        root.visits += 1
+        for node in walk.path[1:]:
+            node.visits += 1
+            node.reward += result[node.mover]
+        done += 1
+        if iterations is not None and done >= iterations:
+            break
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    return {choice: (node.visits, node.reward) for choice, node in root.children.items()}
+
+
+_WORKER_POOL: Optional[NodePool] = None
+
+
+def _search_worker(args) -> Dict[Hashable, Tuple[int, float]]:
+    global _WORKER_POOL
+    if _WORKER_POOL is None:
+        _WORKER_POOL = NodePool()
+    game, choices, options = args
+    return run_search(game, choices, pool=_WORKER_POOL, **options)
+
+
+class MCTSPolicy(Policy):
+    """
+    Searches each decision with Monte Carlo Tree Search on forked games (see the module docstring).
+    `iterations` and `time_limit` (seconds) bound each decision; with `workers` > 1 both apply to each
+    worker process, and the process pool is started on the first search and kept for the next ones.
+    `close()` shuts it down; so does leaving a `with MCTSPolicy(...)` block or, failing both, the
+    policy being garbage-collected. `horizon` is the number of rounds played after the current one,
+    and `rollout` names the policy (from `POLICIES`) that plays outside the tree.
+    """
+
+    name = "mcts"
+
+    def __init__(self, rng: Optional[random.Random] = None, iterations: Optional[int] = 200,
+                 time_limit: Optional[float] = None, workers: int = 1, exploration: float = 0.7,
+                 horizon: int = 1, rollout: str = "greedy"):
+        super().__init__(rng)
+        if iterations is None and time_limit is None:
+            raise ValueError("MCTSPolicy needs an iteration budget, a time limit or both.")
+        if rollout not in POLICIES:
+            raise ValueError(f"Unknown rollout policy '{rollout}'.")
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.workers = workers
+        self.exploration = exploration
+        self.horizon = horizon
+        self.rollout = rollout
+        self.pool = NodePool()
+        self.last_stats: Dict[Hashable, Tuple[int, float]] = {}  # Root statistics of the latest search
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._shutdown: Optional[weakref.finalize] = None
+
+    def choose_draft_pick(self, game, player, options, pick_num):
+        return self._search(game, player, list(range(len(options))))
+
+    def choose_action(self, game, player, action_num):
+        return self._search(game, player, candidate_actions(game, player))
+
+    def choose_sales(self, game, player, demand_opportunities):
+        return list(self._search(game, player, candidate_sales(game, player, demand_opportunities)))
+
+    def _search(self, game: GameLogic, player: Player, choices: List[Hashable]):
+        decision = game.pending_decision()
+        if decision is None or decision.player is not player:
+            raise ValueError(f"{player.name} has no pending decision to search; see GameLogic.pending_decision.")
+        if len(choices) == 1:
+            self.last_stats = {}
+            return choices[0]
+        options = {
+            'iterations': self.iterations, 'time_limit': self.time_limit, 'exploration': self.exploration,
+            'horizon': self.horizon, 'rollout': self.rollout,
+        }
+        seed = self.rng.getrandbits(64)
+        if self.workers <= 1:
+            stats = run_search(game, choices, seed=seed, pool=self.pool, **options)
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._shutdown = weakref.finalize(self, self._executor.shutdown)
+            snapshot = game.fork(LogLevel.OFF) # Smaller to send: no log
+            jobs = [(snapshot, choices, dict(options, seed=seed + i)) for i in range(self.workers)]
+            stats = {}
+            for worker_stats in self._executor.map(_search_worker, jobs):
+                for choice, (visits, reward) in worker_stats.items():
+                    total_visits, total_reward = stats.get(choice, (0, 0.0))
+                    stats[choice] = (total_visits + visits, total_reward + reward)
+        self.last_stats = stats
+        # Most visited choice; the mean reward breaks ties
+        return max(choices, key=lambda c: (stats.get(c, (0, 0.0))[0],
+                                           stats[c][1] / stats[c][0] if c in stats else 0.0))
+
+    def close(self):
+        """Shuts down the worker processes, if any were started."""
+        if self._executor is not None:
+            self._shutdown() # Runs `shutdown` once and detaches the finalizer
+            self._executor = self._shutdown = None
+
+    def __enter__(self) -> "MCTSPolicy":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+POLICIES[MCTSPolicy.name] = MCTSPolicy
@@ -0,0 +1,146 @@
+"""Non-interactive players for headless games.
+
+A policy answers the three decisions `GameLogic.run_round` asks of a player:
+which Whim to draft, which Ops action to take and what to sell in the Crowd
+phase. `make_callbacks` adapts a set of policies to the callback dictionary
+that `run_round` expects, so bots plug in exactly where the CLI does, and
+`Policy.decide` answers a decision of the round state machine for `submit`.
+"""
+import random
+from typing import Dict, Iterable, List, Optional
+
+from water_barons.actions import (
+    Action, Sale, PASS_ACTION, BUILD_FACILITY, PRODUCE_WATER, BUILD_DISTRIBUTION,
+)
+from water_barons.game_entities import Player, WhimCard
+from water_barons.game_state import Phase
+
+
+def candidate_actions(game, player: Player) -> List[Action]:
+    """Lists the Ops actions `player` can take; see `GameLogic.legal_actions`. Passing is always included."""
+    return list(game.legal_actions(player))
+
+
+def greedy_sales(game, player: Player, demand_opportunities: List[dict],
+                 route_slots: Optional[Iterable[int]] = None) -> List[Sale]:
+    """
+    Sells every batch to the best-paying segment that accepts it, using any valid route
+    (or only the routes in `route_slots`).
+    """
+    demand_left = {opp['name']: opp['demand'] for opp in demand_opportunities}
+    routes = [(slot, r) for slot, r in enumerate(player.distribution_routes) if r and r.is_active]
+    if route_slots is not None:
+        routes = [(slot, r) for slot, r in routes if slot in route_slots]
+    by_price = sorted(demand_opportunities, key=lambda opp: opp['price'], reverse=True)
+    sales: List[Sale] = []
+
+    for batch_index, batch in enumerate(player.water_batches):
+        remaining = batch['quantity']
+        for opp in by_price:
+            if remaining <= 0:
+                break
+            if demand_left[opp['name']] <= 0:
+                continue
+            for slot, route in routes:
+                if game.sale_rejection_reason(player, opp, batch, route) is None:
+                    quantity = min(remaining, demand_left[opp['name']])
+                    sales.append(Sale(opp['name'], batch_index, slot, quantity))
+                    demand_left[opp['name']] -= quantity
+                    remaining -= quantity
+                    break
+    return sales
+
+
+class Policy:
+    """Base class for non-interactive players. The defaults draft the first option, pass and sell greedily."""
+
+    name = "base"
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def choose_draft_pick(self, game, player: Player, options: List[WhimCard], pick_num: int) -> int:
+        return 0
+
+    def choose_action(self, game, player: Player, action_num: int) -> Action:
+        return PASS_ACTION
+
+    def choose_sales(self, game, player: Player, demand_opportunities: List[dict]) -> List[Sale]:
+        return greedy_sales(game, player, demand_opportunities)
+
+    def decide(self, game, decision):
+        """The answer to a `PendingDecision` of `game`, as `GameLogic.submit` takes it."""
+        if decision.phase == Phase.WHIM_DRAFT:
+            return self.choose_draft_pick(game, decision.player, decision.options, decision.number)
+        if decision.phase == Phase.OPS:
+            return self.choose_action(game, decision.player, decision.number)
+        return self.choose_sales(game, decision.player, decision.options)
+
+
+class RandomPolicy(Policy):
+    """Picks uniformly among draft options and candidate actions."""
+
+    name = "random"
+
+    def choose_draft_pick(self, game, player, options, pick_num):
+        return self.rng.randrange(len(options))
+
+    def choose_action(self, game, player, action_num):
+        return self.rng.choice(candidate_actions(game, player))
+
+
+class GreedyPolicy(Policy):
+    """
+    Builds its cheapest route and a high-output first facility, then keeps running
+    its best facility every action. Draft picks are random.
+    """
+
+    name = "greedy"
+
+    def choose_draft_pick(self, game, player, options, pick_num):
+        return self.rng.randrange(len(options))
+
+    def choose_action(self, game, player, action_num):
+        gs = game.game_state
+        candidates = candidate_actions(game, player)
+        if not any(player.distribution_routes):
+            routes = [a for a in candidates if a.kind == BUILD_DISTRIBUTION]
+            if routes:
+                return min(routes, key=lambda a: gs.distribution_deck[a.args[0]].cost)
+
+        builds = [a for a in candidates if a.kind == BUILD_FACILITY]
+        if builds and not any(player.facilities):
+            return max(builds, key=lambda a: gs.facility_deck[a.args[0]].base_output)
+
+        flows = [a for a in candidates if a.kind == PRODUCE_WATER]
+        if flows:
+            return max(flows, key=lambda a: player.facilities[a.args[0]].base_output)
+        if builds:
+            return max(builds, key=lambda a: gs.facility_deck[a.args[0]].base_output)
+        return PASS_ACTION
+
+
+POLICIES = {
+    RandomPolicy.name: RandomPolicy,
+    GreedyPolicy.name: GreedyPolicy,
+}
+
+
+def make_callbacks(game, policies: Dict[str, Policy]) -> dict:
+    """Builds the `run_round` callback dictionary from a {player_name: policy} mapping."""
+
+    def draft_cb(player, options, pick_num):
+        return policies[player.name].choose_draft_pick(game, player, options, pick_num)
+
+    def action_cb(player, action_num):
+        game.apply_action(player, policies[player.name].choose_action(game, player, action_num))
+
+    def sales_cb(player, water_batches, demand_opportunities, impact_tracks):
+        sales = policies[player.name].choose_sales(game, player, demand_opportunities)
+        return game.resolve_sales(player, sales, demand_opportunities)
+
+    return {
+        'get_player_draft_choice_cb': draft_cb,
+        'get_player_action_choice_cb': action_cb,
+        'get_player_sales_choices_cb': sales_cb,
+    }
@@ -0,0 +1,158 @@
+"""Deterministic replay of games from their seed and player decisions.
+
+Every shuffle in a game goes through the game's own `random.Random(seed)`, so
+the seed plus the ordered list of decisions players made (Whim draft picks, Ops
+actions and Crowd-phase sales) is enough to rebuild the exact game. A
+`GameRecord` holds just that and encodes to a few hundred bytes, instead of a
+pickled snapshot of the whole state.
+"""
+import json
+import zlib
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+from water_barons.actions import Action, Sale
+from water_barons.game_logic import GameLogic
+from water_barons.policies import Policy, make_callbacks
+
+DRAFT = "d"
+OPS = "o"
+SALES = "s"
+
+RECORD_FORMAT_VERSION = 1
+
+
+class ReplayError(Exception):
+    """Raised when a record does not match the game it is replayed into."""
+
+
+class GameRecord(NamedTuple):
+    seed: int
+    player_names: Tuple[str, ...]
+    rounds: int                 # Rounds played, i.e. the `max_rounds` to replay with
+    decisions: Tuple[tuple, ...]  # (DRAFT, index) | (OPS, Action) | (SALES, (Sale, ...))
+
+    def encode(self) -> bytes:
+        """Compact, compressed encoding of the record."""
+        decisions = [encode_choice(value) for _, value in self.decisions]
+        payload = [RECORD_FORMAT_VERSION, self.seed, list(self.player_names), self.rounds, decisions]
+        return zlib.compress(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), 9)
+
+    @classmethod
+    def decode(cls, data: bytes) -> "GameRecord":
+        version, seed, player_names, rounds, raw_decisions = json.loads(zlib.decompress(data).decode("utf-8"))
+        if version != RECORD_FORMAT_VERSION:
+            raise ReplayError(f"Unsupported record format version {version}.")
+        decisions = tuple(decode_choice(item) for item in raw_decisions)
+        return cls(seed, tuple(player_names), rounds, decisions)
+
+
+def encode_choice(choice) -> object:
+    """
+    JSON-ready form of a decision's answer: a draft pick index, an Ops `Action` or a sequence of `Sale`s.
+    Raises ValueError for anything else.
+    """
+    if isinstance(choice, int):
+        return choice
+    if isinstance(choice, Action):
+        return [choice.kind, list(choice.args)]
+    if isinstance(choice, (list, tuple)) and all(isinstance(sale, Sale) for sale in choice):
+        return {"s": [list(sale) for sale in choice]}
+    raise ValueError(f"Cannot encode {choice!r} as a decision.")
+
+
+def decode_choice(item) -> tuple:
+    """The (DRAFT | OPS | SALES, answer) pair encoded by `encode_choice`."""
+    if isinstance(item, int):
+        return DRAFT, item
+    if isinstance(item, list):
+        return OPS, Action(item[0], tuple(item[1]))
+    return SALES, tuple(Sale(*sale) for sale in item["s"])
+
+
+class RecordingPolicy(Policy):
+    """Delegates to another policy and appends each of its decisions to a shared log."""
+
+    def __init__(self, inner: Policy, decisions: List[tuple]):
+        super().__init__(inner.rng)
+        self.inner = inner
+        self.decisions = decisions
+
+    def choose_draft_pick(self, game, player, options, pick_num):
+        choice = self.inner.choose_draft_pick(game, player, options, pick_num)
+        self.decisions.append((DRAFT, choice))
+        return choice
+
+    def choose_action(self, game, player, action_num):
+        action = self.inner.choose_action(game, player, action_num)
+        self.decisions.append((OPS, action))
+        return action
+
+    def choose_sales(self, game, player, demand_opportunities):
+        sales = tuple(self.inner.choose_sales(game, player, demand_opportunities))
+        self.decisions.append((SALES, sales))
+        return list(sales)
+
+
+class ReplayPolicy(Policy):
+    """Answers every decision from a recorded sequence shared by all seats."""
+
+    def __init__(self, decisions: Sequence[tuple]):
+        super().__init__()
+        self._decisions = iter(decisions)
+
+    def _next(self, expected_tag: str):
+        try:
+            tag, value = next(self._decisions)
+        except StopIteration:
+            raise ReplayError("Record ran out of decisions before the game ended.") from None
+        if tag != expected_tag:
+            raise ReplayError(f"Record expected a '{tag}' decision but the game asked for '{expected_tag}'.")
+        return value
+
+    def exhausted(self) -> bool:
+        return next(self._decisions, None) is None
+
+    def choose_draft_pick(self, game, player, options, pick_num):
+        return self._next(DRAFT)
+
+    def choose_action(self, game, player, action_num):
+        return self._next(OPS)
+
+    def choose_sales(self, game, player, demand_opportunities):
+        return list(self._next(SALES))
+
+
+def play_recorded(seed: int, policies: Dict[str, Policy], max_rounds: int) -> Tuple[GameLogic, GameRecord]:
+    """Plays a full game with `policies` ({player_name: policy}) and returns it with its record."""
+    player_names = list(policies)
+    game = GameLogic(num_players=len(player_names), player_names=player_names, seed=seed)
+    decisions: List[tuple] = []
+    recorders = {name: RecordingPolicy(policy, decisions) for name, policy in policies.items()}
+    game.run_game(make_callbacks(game, recorders), max_rounds=max_rounds)
+    return game, GameRecord(seed, tuple(player_names), game.game_state.round_number, tuple(decisions))
+
+
+def replay(record: GameRecord) -> GameLogic:
+    """Rebuilds the game described by `record` by replaying its decisions from the seed."""
+    player_names = list(record.player_names)
+    game = GameLogic(num_players=len(player_names), player_names=player_names, seed=record.seed)
+    replayer = ReplayPolicy(record.decisions)
+    callbacks = make_callbacks(game, {name: replayer for name in player_names})
+    draft_cb = callbacks['get_player_draft_choice_cb']
+    replay_errors: List[ReplayError] = []
+
+    def strict_draft_cb(player, options, pick_num):
+        # run_round treats draft callback exceptions as a pass; a broken record must not be hidden.
+        try:
+            return draft_cb(player, options, pick_num)
+        except ReplayError as e:
+            replay_errors.append(e)
+            return -1
+
+    callbacks['get_player_draft_choice_cb'] = strict_draft_cb
+    game.run_game(callbacks, max_rounds=record.rounds)
+    if replay_errors:
+        raise replay_errors[0]
+    if not replayer.exhausted():
+        raise ReplayError("Record has decisions left over after the game ended.")
+    return game
@@ -0,0 +1,344 @@
+"""Compact, versioned binary save format for game states.
+
+`GameState.save_to_file` used to pickle the live object graph: every card
+definition the game holds, enum-keyed dicts and the whole game log, tied to
+the exact class layout and unsafe to load from anyone else. This format
+stores what a game is made of instead:
+
+* cards by card ID (see `cards.CARD_IDS`), so decks, discard piles, hands and
+  draft options are arrays of 16-bit IDs in deck order;
+* impact tracks, impact storage, demand segments and the RNG state as
+  fixed-width integer arrays;
+* the few irregular parts (names, the crowd's demand opportunities, the log's
+  message templates and arguments) as JSON.
+
+Loading rebuilds the state around the card definitions of the content file,
+so a save outlives changes to the classes, and reading one runs no code from
+the file. Layout, all little-endian:
+
+    b"WBSV"  u16 schema version  u16 flags (1: the body is zlib-compressed)
+    body: the sections of the schema in order, each a u32 byte length and
+          then an array's items or UTF-8 JSON
+
+Log arguments that JSON cannot hold (an ImpactProfile, say) are saved as the
+text they format to, so the log reads the same after loading. (A tuple inside
+an argument would come back as a list; the game logs none.)
+"""
+import json
+import struct
+import sys
+import zlib
+from array import array
+from functools import lru_cache
+from typing import Dict, List
+
+from water_barons.cards import CARD_IDS, card_definitions
+from water_barons.game_entities import (
+    Card, CardType, DistributionCard, EventOption, FacilityCard, FutureToken, Player, TrackColor, WaterBatch,
+)
+from water_barons.game_log import LogLevel, LogRecord
+from water_barons.game_state import GameState, Phase, RuleFlag
+
+MAGIC = b"WBSV"
+SAVE_FORMAT_VERSION = 1
+COMPRESSED = 1
+_HEADER = struct.Struct("<4sHH")
+_LENGTH = struct.Struct("<I")
+NO_CARD = 0xFFFF # Card ID slot of an empty facility or route slot
+
+# GameState card lists saved as ID arrays, in section order
+_CARD_LISTS = (
+    "facility_deck", "distribution_deck", "upgrade_deck", "whim_deck_source", "crowd_deck",
+    "whim_discard_pile", "crowd_cards_in_play", "global_event_tiles_available",
+    "global_event_tiles_active", "whim_draft_options_sent_to_player",
+)
+_PLAYER_INTS = 12 # cred_coin, reputation_stars, triggered_global_events, draw_extra_whim_flag, storage x4, contributed x4
+_TOKEN_INTS = 6   # track, is_long, purchase_price, matures_at_increase, matures_at_decrease, payout (-1: None)
+_BATCH_INTS = 3   # facility card ID, quantity, production_round
+
+
+class SaveFormatError(Exception):
+    """Raised when a state cannot be saved in, or data cannot be read as, this format."""
+
+
+@lru_cache(maxsize=1)
+def _catalog() -> Dict[int, Card]:
+    """One shared instance per card ID. Dealt cards are never mutated, so loaded games share them like forks do."""
+    return {card.card_id: card for card in card_definitions()}
+
+
+def _card(card_id: int) -> Card:
+    try:
+        return _catalog()[card_id]
+    except KeyError:
+        raise SaveFormatError(f"Unknown card ID {card_id}; the save is from another content file.") from None
+
+
+def _card_id(card: Card) -> int:
+    if card.card_id is None:
+        raise SaveFormatError(f"{card!r} has no card ID; only cards from the content file can be saved.")
+    return card.card_id
+
+
+def _ids(cards) -> List[int]:
+    return [_card_id(card) for card in cards]
+
+
+_LOG_LEVELS = {int(level): level for level in LogLevel}
+
+
+class _Writer:
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def _blob(self, data: bytes) -> None:
+        self.parts.append(_LENGTH.pack(len(data)))
+        self.parts.append(data)
+
+    def array(self, typecode: str, values) -> None:
+        items = array(typecode, values)
+        if sys.byteorder == "big":
+            items.byteswap()
+        self._blob(items.tobytes())
+
+    def json(self, obj, default=None) -> None:
+        self._blob(json.dumps(obj, separators=(",", ":"), default=default).encode())
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def _blob(self) -> memoryview:
+        if self.pos + _LENGTH.size > len(self.data):
+            raise SaveFormatError("Save data ends early.")
+        (length,) = _LENGTH.unpack_from(self.data, self.pos)
+        start = self.pos + _LENGTH.size
+        self.pos = start + length
+        if self.pos > len(self.data):
+            raise SaveFormatError("Save data ends early.")
+        return self.data[start:self.pos]
+
+    def array(self, typecode: str) -> array:
+        items = array(typecode)
+        try:
+            items.frombytes(self._blob())
+        except ValueError:
+            raise SaveFormatError("Save data has a malformed array.") from None
+        if sys.byteorder == "big":
+            items.byteswap()
+        return items
+
+    def json(self):
+        try:
+            return json.loads(bytes(self._blob()))
+        except ValueError:
+            raise SaveFormatError("Save data has malformed JSON.") from None
+
+
+def is_save_data(data: bytes) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+
+def encode_state(gs: GameState, compress: bool = True) -> bytes:
+    """`gs` in the save format, zlib-compressed unless `compress` is False."""
+    w = _Writer()
+    version, internal, gauss_next = gs.rng.getstate()
+    segments = list(gs.demand_segments.values())
+    w.json({
+        "seed": gs.seed,
+        "rng": [version, gauss_next],
+        "players": [{"name": p.name, "routes_built": sorted(p.routes_built_this_game),
+                     "event_options": [[o.event_name, o.purchase_price, o.payout, o.has_matured] for o in p.event_options]}
+                    for p in gs.players],
+        "current_player": gs.current_player_index,
+        "round": gs.round_number,
+        "phase": gs.phase.name,
+        "ops_action_num": gs.ops_action_num,
+        "rule_flags": int(gs.rule_flags),
+        "market_open": gs.aqua_futures_market_open,
+        "uninhabitable": gs.uninhaitable,
+        "counters": gs.game_wide_counters,
+        "threshold_effects": sorted(gs.active_threshold_effects),
+        "eco_elite_sales": sorted(gs.round_sales_to_eco_elites),
+        "segments": [seg.name for seg in segments],
+        "crowd_demands": [{key: value for key, value in opp.items() if key != "original_segment_rules"}
+                          for opp in gs.crowd_demands],
+        "draft": [gs.whim_draft_active, gs.whim_draft_current_picker_idx_in_order],
+        "log_level": int(gs.game_log.level),
+    })
+    w.array("I", internal)
+    tracks = [gs.impact_tracks[color] for color in TrackColor]
+    w.array("b", [t.level for t in tracks] + [t.max_level for t in tracks]
+            + [gs.track_levels_at_round_start.get(color, -1) for color in TrackColor])
+    w.array("h", [n for seg in segments for n in (seg.current_demand, seg.current_price)])
+    for name in _CARD_LISTS:
+        w.array("H", _ids(getattr(gs, name)))
+    w.array("H", sorted(_ids(gs.previously_active_events_this_round)))
+    w.array("B", gs.whim_draft_order)
+    w.array("B", [n for item in gs.whim_draft_player_picks_remaining.items() for n in item])
+
+    for p in gs.players:
+        w.array("i", [p.cred_coin, p.reputation_stars, p.triggered_global_events, int(p.draw_extra_whim_flag)]
+                + p.impact_storage.amounts + p.total_impact_contributed.amounts)
+        w.array("H", [NO_CARD if f is None else _card_id(f) for f in p.facilities])
+        # Upgrades under each facility slot: a count, then the IDs
+        w.array("H", [n for f in p.facilities for n in ([0] if f is None else [len(f.upgrades)] + _ids(f.upgrades))])
+        w.array("H", [NO_CARD if r is None else _card_id(r) for r in p.distribution_routes])
+        w.array("B", [r is not None and r.is_active for r in p.distribution_routes])
+        w.array("H", _ids(p.r_and_d))
+        w.array("H", _ids(p.hand_cards))
+        w.array("b", [n for t in p.futures_tokens for n in (
+            t.track.index, t.is_long, t.purchase_price,
+            -1 if t.matures_at_increase is None else t.matures_at_increase,
+            -1 if t.matures_at_decrease is None else t.matures_at_decrease, t.payout)])
+        w.array("i", [n for b in p.water_batches for n in (
+            _facility_id(b["facility_name"]), b["quantity"], b["production_round"])])
+
+    templates: Dict[str, int] = {}
+    records = gs.game_log.records
+    w.array("B", [record.level for record in records])
+    w.array("H", [templates.setdefault(record.kind, len(templates)) for record in records])
+    w.json([list(templates), [record.args for record in records]], default=format) # Other arguments as their text
+
+    body = w.getvalue()
+    flags = 0
+    if compress:
+        body, flags = zlib.compress(body, 6), COMPRESSED
+    return _HEADER.pack(MAGIC, SAVE_FORMAT_VERSION, flags) + body
+
+
+def _facility_id(name: str) -> int:
+    card_id = CARD_IDS.get((CardType.FACILITY, name))
+    if card_id is None:
+        raise SaveFormatError(f"Water batch from unknown facility '{name}'.")
+    return card_id
+
+
+def decode_state(data: bytes) -> GameState:
+    """The game state saved in `data` by `encode_state`. Raises SaveFormatError if it is not such a save."""
+    if len(data) < _HEADER.size or not is_save_data(data):
+        raise SaveFormatError("Not a Water Barons save.")
+    _, version, flags = _HEADER.unpack_from(data)
+    if version != SAVE_FORMAT_VERSION:
+        raise SaveFormatError(f"Unsupported save format version {version}.")
+    body = data[_HEADER.size:]
+    if flags & COMPRESSED:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error:
+            raise SaveFormatError("Save data is corrupt.") from None
+    r = _Reader(body)
+    try:
+        return _read_state(r)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise SaveFormatError(f"Save data is inconsistent: {e!r}") from None
+
+
+def _read_state(r: _Reader) -> GameState:
+    meta = r.json()
+    names = [p["name"] for p in meta["players"]]
+    gs = GameState(len(names), names, seed=meta["seed"], log_level=LogLevel(meta["log_level"]))
+    gs.rng.setstate((meta["rng"][0], tuple(r.array("I")), meta["rng"][1]))
+    gs.current_player_index = meta["current_player"]
+    gs.round_number = meta["round"]
+    gs.phase = Phase[meta["phase"]]
+    gs.ops_action_num = meta["ops_action_num"]
+    gs.rule_flags = RuleFlag(meta["rule_flags"])
+    gs.aqua_futures_market_open = meta["market_open"]
+    gs.uninhaitable = meta["uninhabitable"]
+    gs.game_wide_counters = meta["counters"]
+    gs.active_threshold_effects = set(meta["threshold_effects"])
+    gs.round_sales_to_eco_elites = set(meta["eco_elite_sales"])
+    gs.whim_draft_active, gs.whim_draft_current_picker_idx_in_order = meta["draft"]
+
+    tracks = r.array("b")
+    colors = list(TrackColor)
+    for i, color in enumerate(colors):
+        gs.impact_tracks[color].level = tracks[i]
+        gs.impact_tracks[color].max_level = tracks[len(colors) + i]
+    gs.track_levels_at_round_start = {color: level for color, level in zip(colors, tracks[2 * len(colors):])
+                                      if level >= 0}
+    segments = r.array("h")
+    if meta["segments"] != list(gs.demand_segments):
+        raise SaveFormatError("The save's demand segments differ from the game metadata.")
+    for i, seg in enumerate(gs.demand_segments.values()):
+        seg.current_demand, seg.current_price = segments[2 * i], segments[2 * i + 1]
+    gs.crowd_demands = [dict(opp, original_segment_rules=gs.demand_segments.get(opp["name"]))
+                        for opp in meta["crowd_demands"]]
+
+    for name in _CARD_LISTS:
+        setattr(gs, name, [_card(card_id) for card_id in r.array("H")])
+    gs.previously_active_events_this_round = {_card(card_id) for card_id in r.array("H")}
+    gs.whim_draft_order = list(r.array("B"))
+    picks = r.array("B")
+    gs.whim_draft_player_picks_remaining = dict(zip(picks[::2], picks[1::2]))
+
+    for player, saved in zip(gs.players, meta["players"]):
+        _read_player(r, player, saved)
+
+    levels, kinds, (templates, args) = r.array("B"), r.array("H"), r.json()
+    gs.game_log._records = list(map(LogRecord._make, zip(map(_LOG_LEVELS.__getitem__, levels),
+                                                         map(templates.__getitem__, kinds), map(tuple, args))))
+    return gs
+
+
+def _read_player(r: _Reader, p: Player, saved: dict) -> None:
+    ints = r.array("i")
+    if len(ints) != _PLAYER_INTS:
+        raise SaveFormatError(f"Player '{p.name}' has {len(ints)} fields, not {_PLAYER_INTS}.")
+    p.cred_coin, p.reputation_stars, p.triggered_global_events = ints[0], ints[1], ints[2]
+    p.draw_extra_whim_flag = bool(ints[3])
+    p.impact_storage.amounts = list(ints[4:8])
+    p.total_impact_contributed.amounts = list(ints[8:12])
+
+    facilities, upgrades = r.array("H"), r.array("H")
+    p.facilities = []
+    at = 0
+    for card_id in facilities:
+        count = upgrades[at]
+        if card_id == NO_CARD:
+            p.facilities.append(None)
+        else:
+            built: FacilityCard = _card(card_id).copy() # Each player's own instance, as when built
+            built.upgrades = [_card(upgrade_id) for upgrade_id in upgrades[at + 1:at + 1 + count]]
+            p.facilities.append(built)
+        at += 1 + count
+    routes, active = r.array("H"), r.array("B")
+    p.distribution_routes = []
+    for card_id, is_active in zip(routes, active):
+        if card_id == NO_CARD:
+            p.distribution_routes.append(None)
+        else:
+            route: DistributionCard = _card(card_id).copy()
+            route.is_active = bool(is_active)
+            p.distribution_routes.append(route)
+    p.r_and_d = [_card(card_id) for card_id in r.array("H")]
+    p.hand_cards = [_card(card_id) for card_id in r.array("H")]
+
+    tokens = r.array("b")
+    p.futures_tokens = []
+    for i in range(0, len(tokens), _TOKEN_INTS):
+        track, is_long, price, increase, decrease, payout = tokens[i:i + _TOKEN_INTS]
+        token = FutureToken(list(TrackColor)[track], bool(is_long), purchase_price=price)
+        token.matures_at_increase = None if increase < 0 else increase
+        token.matures_at_decrease = None if decrease < 0 else decrease
+        token.payout = payout
+        p.futures_tokens.append(token)
+    batches = r.array("i")
+    p.water_batches = []
+    for i in range(0, len(batches), _BATCH_INTS):
+        facility: FacilityCard = _card(batches[i])
+        p.water_batches.append(WaterBatch(facility.name, facility.tags, facility.impact_profile,
+                                          batches[i + 1], batches[i + 2]))
+
+    p.routes_built_this_game = set(saved["routes_built"])
+    p.event_options = []
+    for event_name, price, payout, matured in saved["event_options"]:
+        option = EventOption(event_name, purchase_price=price, payout=payout)
+        option.has_matured = matured
+        p.event_options.append(option)
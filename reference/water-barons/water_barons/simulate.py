@@ -0,0 +1,114 @@
+"""Headless batch simulation of complete Water Barons games.
+
+Runs many games with non-interactive policies spread across a process pool and
+reports aggregate results, e.g.:
+
+    python -m water_barons.simulate --games 1000 --workers 8 --policies greedy random
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from water_barons.game_logic import GameLogic
+from water_barons.game_log import LogLevel
+from water_barons.policies import POLICIES, make_callbacks
+import water_barons.mcts  # Registers the "mcts" policy
+
+DEFAULT_MAX_ROUNDS = 30
+
+
+def play_game(seed: int, policy_names: Sequence[str], max_rounds: int = DEFAULT_MAX_ROUNDS) -> dict:
+    """Plays one full game without any user interaction and returns a summary of the result."""
+    player_names = [f"P{i + 1}" for i in range(len(policy_names))]
+    game = GameLogic(num_players=len(player_names), player_names=player_names, seed=seed,
+                     log_level=LogLevel.OFF)
+    policies = {
+        name: POLICIES[policy_name](random.Random(seed * 1009 + seat))
+        for seat, (name, policy_name) in enumerate(zip(player_names, policy_names))
+    }
+
+    ranking = game.run_game(make_callbacks(game, policies), max_rounds=max_rounds)
+    gs = game.game_state
+    return {
+        'seed': seed,
+        'rounds': gs.round_number,
+        'uninhabitable': gs.uninhaitable,
+        'winner_seat': player_names.index(ranking[0][0]) if ranking else None,
+        'vp': [dict(ranking)[name]['vp'] for name in player_names],
+        'events_triggered': len(gs.global_event_tiles_active),
+    }
+
+
+def _play_game_star(args) -> dict:
+    return play_game(*args)
+
+
+def run_batch(num_games: int, policy_names: Sequence[str], workers: int = 1,
+              max_rounds: int = DEFAULT_MAX_ROUNDS, base_seed: int = 0) -> List[dict]:
+    """Plays `num_games` games, in a process pool when `workers` > 1. Game i uses seed base_seed + i."""
+    jobs = [(base_seed + i, tuple(policy_names), max_rounds) for i in range(num_games)]
+    if workers <= 1:
+        return [_play_game_star(job) for job in jobs]
+    chunksize = max(1, num_games // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_play_game_star, jobs, chunksize=chunksize))
+
+
+def summarize(results: List[dict], policy_names: Sequence[str], elapsed: float) -> Dict[str, object]:
+    """Aggregates per-game results into win rates, mean VP per seat and throughput."""
+    num_games = len(results)
+    seats = []
+    for seat, policy_name in enumerate(policy_names):
+        wins = sum(1 for r in results if r['winner_seat'] == seat)
+        mean_vp = sum(r['vp'][seat] for r in results) / num_games if num_games else 0.0
+        seats.append({'seat': seat + 1, 'policy': policy_name, 'wins': wins,
+                      'win_rate': wins / num_games if num_games else 0.0, 'mean_vp': mean_vp})
+    return {
+        'games': num_games,
+        'seats': seats,
+        'mean_rounds': sum(r['rounds'] for r in results) / num_games if num_games else 0.0,
+        'uninhabitable_rate': sum(r['uninhabitable'] for r in results) / num_games if num_games else 0.0,
+        'mean_events_triggered': sum(r['events_triggered'] for r in results) / num_games if num_games else 0.0,
+        'elapsed_seconds': elapsed,
+        'games_per_second': num_games / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def format_summary(summary: Dict[str, object]) -> str:
+    lines = [
+        f"Games played: {summary['games']} in {summary['elapsed_seconds']:.2f}s "
+        f"({summary['games_per_second']:.1f} games/s)",
+        f"Mean rounds: {summary['mean_rounds']:.2f}, "
+        f"uninhabitable endings: {summary['uninhabitable_rate']:.1%}, "
+        f"mean global events: {summary['mean_events_triggered']:.2f}",
+    ]
+    for seat in summary['seats']:
+        lines.append(
+            f"  Seat {seat['seat']} ({seat['policy']}): {seat['wins']} wins "
+            f"({seat['win_rate']:.1%}), mean VP {seat['mean_vp']:.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run headless Water Barons games in parallel.")
+    parser.add_argument("--games", type=int, default=100, help="Number of games to play")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--policies", nargs="+", default=["greedy", "random"], choices=sorted(POLICIES),
+                        help="One policy per seat; the number of policies sets the player count")
+    parser.add_argument("--max-rounds", type=int, default=DEFAULT_MAX_ROUNDS, help="Round cap per game")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_batch(args.games, args.policies, workers=args.workers,
+                        max_rounds=args.max_rounds, base_seed=args.seed)
+    elapsed = time.perf_counter() - start
+    print(format_summary(summarize(results, args.policies, elapsed)))
+
+
+if __name__ == "__main__":
+    main()
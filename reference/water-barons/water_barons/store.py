@@ -0,0 +1,275 @@
+"""Durable storage for games in progress: a SQLite journal of moves plus snapshots.
+
+Saving a game with `GameState.save_to_file` writes the whole state every time.
+A `GameStore` instead appends each move made in a game to that game's journal,
+a single small row, and only every `snapshot_every` moves writes a snapshot of
+the whole state in the compact save format (see `water_barons.savefile`). Loading a game takes its latest snapshot and
+replays the moves journaled after it, which gives back the exact game since
+every shuffle goes through the game's own RNG (see `water_barons.replay`).
+
+For review and spectating, a keyframe of the state is also kept at the start of
+every `keyframe_every`-th round. `seek` jumps to any point of a game from the
+nearest keyframe, applying only the few entries after it, so looking at round
+480 of a long game does not replay rounds 1 to 479.
+
+The database runs in WAL mode, so appends are cheap and readers do not block
+the writer. A journal entry is one of
+
+    {"op": "start"}                                  start the next round
+    {"op": "submit", "player": name, "choice": c}    `GameLogic.submit`, with
+                                                     c from `replay.encode_choice`
+"""
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from water_barons.game_logic import GameLogic
+from water_barons.game_state import GameState, Phase
+from water_barons.replay import decode_choice, encode_choice
+from water_barons.savefile import SaveFormatError, decode_state, encode_state
+
+STORE_FORMAT_VERSION = 2 # 1: zlib-compressed pickles, which the current classes cannot load
+SNAPSHOT_EVERY = 50
+KEYFRAME_EVERY = 1 # Rounds
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    seed INTEGER,
+    player_names TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    last_seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS journal (
+    game_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (game_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    game_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    format INTEGER NOT NULL,
+    state BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS keyframes (
+    game_id TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    format INTEGER NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (game_id, round)
+) WITHOUT ROWID;
+"""
+
+
+class StoreError(Exception):
+    """Raised when a stored game cannot be loaded."""
+
+
+def start_entry() -> dict:
+    return {"op": "start"}
+
+
+def submit_entry(player_name: str, choice) -> dict:
+    """
+    The entry for `GameLogic.submit(player, choice)`. A choice `encode_choice` cannot encode is
+    journaled as -1, which `submit` treats the same way: as a passed pick, an invalid action or no sales.
+    """
+    try:
+        encoded = encode_choice(choice)
+    except ValueError:
+        encoded = -1
+    return {"op": "submit", "player": player_name, "choice": encoded}
+
+
+def apply_entry(game: GameLogic, entry: dict) -> bool:
+    """Plays a journal entry on `game`; returns what `submit` returned (True for a round start)."""
+    if entry["op"] == "start":
+        if game.game_state.phase == Phase.SETUP:
+            game.start_round()
+        else:
+            game.start_next_round()
+        return True
+    if entry["op"] == "submit":
+        player = next((p for p in game.game_state.players if p.name == entry["player"]), None)
+        if player is None:
+            raise StoreError(f"Journal names unknown player '{entry['player']}'.")
+        _, choice = decode_choice(entry["choice"])
+        return game.submit(player, list(choice) if isinstance(choice, tuple) else choice)
+    raise StoreError(f"Unknown journal entry '{entry['op']}'.")
+
+
+def encode_snapshot(gs: GameState) -> bytes:
+    return encode_state(gs)
+
+
+def decode_snapshot(data: bytes, version: int = STORE_FORMAT_VERSION) -> GameState:
+    if version == STORE_FORMAT_VERSION:
+        try:
+            return decode_state(data)
+        except SaveFormatError as e:
+            raise StoreError(f"Stored snapshot cannot be read: {e}") from e
+    raise StoreError(f"Unsupported snapshot format version {version}.")
+
+
+class GameStore:
+    """
+    Games kept in the SQLite database at `path`, keyed by game id. The connection is opened on
+    first use. `record` journals one move; `load` rebuilds a game from its latest snapshot and
+    the journal after it, and `seek` a past point of it from the nearest keyframe.
+    """
+
+    def __init__(self, path: str, snapshot_every: int = SNAPSHOT_EVERY, keyframe_every: int = KEYFRAME_EVERY):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.keyframe_every = keyframe_every
+        self._db: Optional[sqlite3.Connection] = None
+        self._snapshot_seq: Dict[str, int] = {}  # Game id -> seq of its latest snapshot, for games seen here
+        self._last_seq: Dict[str, int] = {}  # Game id -> seq of its latest journal entry
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL") # Durable at each WAL checkpoint; a crash loses no committed history
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def create(self, game_id: str, game: GameLogic) -> None:
+        """Stores a new game as it stands (usually just set up), replacing any game with the same id."""
+        gs = game.game_state
+        now = time.time()
+        with self.db:
+            self.db.execute("BEGIN")
+            self._delete(game_id)
+            self.db.execute("INSERT INTO games (game_id, seed, player_names, created, updated, last_seq) VALUES (?, ?, ?, ?, ?, 0)",
+                            (game_id, gs.seed, json.dumps([p.name for p in gs.players]), now, now))
+            self._write_snapshot(game_id, game, 0)
+        self._last_seq[game_id] = 0
+
+    def record(self, game_id: str, game: GameLogic, entry: dict) -> int:
+        """
+        Appends `entry`, already played on `game`, to the game's journal and returns its sequence
+        number. Every `snapshot_every` entries the game's snapshot is replaced as well, and a round
+        start writes a keyframe every `keyframe_every` rounds.
+        """
+        seq = self._last_seq.get(game_id)
+        if seq is None:
+            seq = self._last_seq[game_id] = self._read_last_seq(game_id)
+        seq += 1
+        snapshot = seq - self._snapshot_seq.get(game_id, 0) >= self.snapshot_every
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.execute("INSERT INTO journal (game_id, seq, entry) VALUES (?, ?, ?)",
+                            (game_id, seq, json.dumps(entry, separators=(',', ':'))))
+            self.db.execute("UPDATE games SET last_seq = ?, updated = ? WHERE game_id = ?", (seq, time.time(), game_id))
+            if snapshot:
+                self._write_snapshot(game_id, game, seq)
+            round_number = game.game_state.round_number
+            if entry["op"] == "start" and (round_number - 1) % self.keyframe_every == 0:
+                self.db.execute("INSERT OR REPLACE INTO keyframes (game_id, round, seq, format, state) VALUES (?, ?, ?, ?, ?)",
+                                (game_id, round_number, seq, STORE_FORMAT_VERSION, encode_snapshot(game.game_state)))
+        self._last_seq[game_id] = seq
+        return seq
+
+    def snapshot(self, game_id: str, game: GameLogic) -> None:
+        """Replaces the game's snapshot with `game` as it stands, e.g. before the game is unloaded."""
+        seq = self._last_seq.get(game_id)
+        if seq is None:
+            seq = self._last_seq[game_id] = self._read_last_seq(game_id)
+        with self.db:
+            self.db.execute("BEGIN")
+            self._write_snapshot(game_id, game, seq)
+
+    def _write_snapshot(self, game_id: str, game: GameLogic, seq: int) -> None:
+        self.db.execute("INSERT OR REPLACE INTO snapshots (game_id, seq, format, state) VALUES (?, ?, ?, ?)",
+                        (game_id, seq, STORE_FORMAT_VERSION, encode_snapshot(game.game_state)))
+        self._snapshot_seq[game_id] = seq
+
+    def _read_last_seq(self, game_id: str) -> int:
+        row = self.db.execute("SELECT last_seq FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        if row is None:
+            raise StoreError(f"No stored game '{game_id}'.")
+        return row[0]
+
+    def __contains__(self, game_id: str) -> bool:
+        return self.db.execute("SELECT 1 FROM games WHERE game_id = ?", (game_id,)).fetchone() is not None
+
+    def game_ids(self) -> List[str]:
+        return [row[0] for row in self.db.execute("SELECT game_id FROM games ORDER BY game_id")]
+
+    def load(self, game_id: str) -> Optional[GameLogic]:
+        """The stored game `game_id` as of its latest journal entry, or None if there is no such game."""
+        row = self.db.execute("SELECT seq, format, state FROM snapshots WHERE game_id = ?", (game_id,)).fetchone()
+        if row is None:
+            return None
+        seq, version, state = row
+        game = GameLogic.from_state(decode_snapshot(state, version))
+        last = seq
+        for last, entry in self.db.execute("SELECT seq, entry FROM journal WHERE game_id = ? AND seq > ? ORDER BY seq",
+                                           (game_id, seq)):
+            apply_entry(game, json.loads(entry))
+        self._snapshot_seq[game_id] = seq
+        self._last_seq[game_id] = last
+        return game
+
+    def keyframe_rounds(self, game_id: str) -> List[int]:
+        """The rounds of a game that have a keyframe, in order."""
+        return [row[0] for row in self.db.execute(
+            "SELECT round FROM keyframes WHERE game_id = ? ORDER BY round", (game_id,))]
+
+    def seek(self, game_id: str, round_number: int, step: int = 0) -> GameLogic:
+        """
+        The game as it stood `step` journal entries into round `round_number` (0: just after the
+        round started), or at the end of that round if it has fewer entries. Starts from the
+        nearest keyframe at or before the round rather than from the beginning of the game.
+        Raises StoreError if the round has not started.
+        """
+        row = self.db.execute("SELECT round, seq, format, state FROM keyframes WHERE game_id = ? AND round <= ? "
+                              "ORDER BY round DESC LIMIT 1", (game_id, round_number)).fetchone()
+        if row is None:
+            raise StoreError(f"Game '{game_id}' has no keyframe at or before round {round_number}.")
+        keyframe_round, seq, version, state = row
+        game = GameLogic.from_state(decode_snapshot(state, version))
+        in_round = keyframe_round == round_number
+        for (entry,) in self.db.execute("SELECT entry FROM journal WHERE game_id = ? AND seq > ? ORDER BY seq",
+                                        (game_id, seq)):
+            entry = json.loads(entry)
+            if in_round and (step == 0 or entry["op"] == "start"):
+                break
+            apply_entry(game, entry)
+            if in_round:
+                step -= 1
+            elif entry["op"] == "start" and game.game_state.round_number == round_number:
+                in_round = True
+        if not in_round:
+            raise StoreError(f"Round {round_number} of game '{game_id}' has not started.")
+        return game
+
+    def journal(self, game_id: str, after: int = 0) -> List[dict]:
+        """The journal entries of a game with sequence numbers above `after`, oldest first."""
+        return [json.loads(entry) for (entry,) in self.db.execute(
+            "SELECT entry FROM journal WHERE game_id = ? AND seq > ? ORDER BY seq", (game_id, after))]
+
+    def delete(self, game_id: str) -> None:
+        with self.db:
+            self.db.execute("BEGIN")
+            self._delete(game_id)
+
+    def _delete(self, game_id: str) -> None:
+        for table in ("journal", "snapshots", "keyframes", "games"):
+            self.db.execute(f"DELETE FROM {table} WHERE game_id = ?", (game_id,))
+        self._snapshot_seq.pop(game_id, None)
+        self._last_seq.pop(game_id, None)
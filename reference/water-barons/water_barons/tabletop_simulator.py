@@ -18,7 +18,11 @@ from .cards import (
     get_all_whim_cards,
     get_all_global_event_tiles,
 )
-from .game_entities import TrackColor, CardType
+from .game_entities import TrackColor, CardType, ImpactProfile
+
+# Compiled effect objects are derived from the effect strings, which are exported as-is;
+# card IDs are runtime references, not card data.
+_SKIPPED_FIELDS = {"effect", "pre_effect", "post_effect", "card_id"}
 
 
 def export_to_tts(output_path: str | Path) -> None:
@@ -27,18 +31,25 @@ def export_to_tts(output_path: str | Path) -> None:
     def _convert(obj):
         if isinstance(obj, (TrackColor, CardType)):
             return obj.name
+        if isinstance(obj, ImpactProfile):
+            return {k.name: v for k, v in obj.items()}
         if isinstance(obj, dict):
             return {k.name if isinstance(k, TrackColor) else k: _convert(v) for k, v in obj.items()}
         if isinstance(obj, list):
             return [_convert(v) for v in obj]
         return obj
 
+    def _fields(card) -> Dict:
+        # Cards are slotted; collect the slots of every class from Card down, in declaration order.
+        names = [name for cls in reversed(type(card).__mro__) for name in getattr(cls, "__slots__", ())]
+        return {k: getattr(card, k) for k in names if k not in _SKIPPED_FIELDS}
+
     data: Dict[str, List[Dict]] = {
-        "facilities": [_convert(c.__dict__) for c in get_all_facility_cards()],
-        "distribution": [_convert(c.__dict__) for c in get_all_distribution_cards()],
-        "upgrades": [_convert(c.__dict__) for c in get_all_upgrade_cards()],
-        "whims": [_convert(c.__dict__) for c in get_all_whim_cards()],
-        "global_events": [_convert(c.__dict__) for c in get_all_global_event_tiles()],
+        "facilities": [_convert(_fields(c)) for c in get_all_facility_cards()],
+        "distribution": [_convert(_fields(c)) for c in get_all_distribution_cards()],
+        "upgrades": [_convert(_fields(c)) for c in get_all_upgrade_cards()],
+        "whims": [_convert(_fields(c)) for c in get_all_whim_cards()],
+        "global_events": [_convert(_fields(c)) for c in get_all_global_event_tiles()],
     }
     Path(output_path).write_text(json.dumps(data, indent=2))
 
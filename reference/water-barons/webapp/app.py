@@ -1,25 +1,86 @@
 from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room
+import atexit
+import functools
 import sys
 import os
-from typing import Optional, Dict # Added for type hints
+import tempfile
+from typing import Optional # Added for type hints
 
 # Adjust path to import game logic from the parent directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from water_barons.game_logic import GameLogic
-from water_barons.game_state import GameState
-from water_barons.game_entities import Player, CardType # Added CardType
-from water_barons.game_entities import WhimCard, FacilityCard, DistributionCard, UpgradeCard, GlobalEventCard # For isinstance checks or specific attrs
+from water_barons.actions import Action, ACTION_KINDS, BUILD_FACILITY, MARKET_SIZE
+from water_barons.game_state import Phase
+from water_barons.policies import greedy_sales
+from water_barons.store import GameStore
+from webapp.metrics import SIZE_BUCKETS, MetricsRegistry
+from webapp.rooms import DEFAULT_ROOM, Room, RoomError, RoomManager
+from webapp.serialization import card_catalog_json
+from webapp.sync import PacketJSON, SharedPayload
+from webapp.throttle import BroadcastCoalescer, RateLimiter
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret_water_barons_key!' # Replace with a real secret key in production
-socketio = SocketIO(app, async_mode='eventlet')
-
-# Global game instance - for simplicity in this prototype.
-# In a multi-game or multi-user scenario, this would need to be managed per session/game room.
-game_instance: Optional[GameLogic] = None
-# Mapping from player name to SocketIO session ID
-player_sessions: Dict[str, str] = {}
+# Caps for one server process; override with environment variables of the same name
+app.config['MAX_ROOMS'] = int(os.environ.get('MAX_ROOMS', 500))
+app.config['PLAYERS_PER_ROOM'] = int(os.environ.get('PLAYERS_PER_ROOM', 2))
+app.config['MAX_OBSERVERS_PER_ROOM'] = int(os.environ.get('MAX_OBSERVERS_PER_ROOM', 8))
+# Seconds a disconnected player's seat waits for them to reconnect with its token
+app.config['RECONNECT_GRACE_SECONDS'] = float(os.environ.get('RECONNECT_GRACE_SECONDS', 120))
+# State changes in a room within this many milliseconds go out as one update (0 sends each at once)
+app.config['BROADCAST_WINDOW_MS'] = float(os.environ.get('BROADCAST_WINDOW_MS', 50))
+# Inbound events each socket may send per second on average, and in a burst
+app.config['EVENTS_PER_SECOND'] = float(os.environ.get('EVENTS_PER_SECOND', 10))
+app.config['EVENT_BURST'] = int(os.environ.get('EVENT_BURST', 20))
+# SQLite file journaling every room's game, reloaded from after a restart (empty: a temporary file,
+# used only to hold the games of idle rooms)
+app.config['GAME_STORE'] = os.environ.get('GAME_STORE', '')
+# A room's game is evicted to the store after this many idle seconds, or when more than
+# MAX_RESIDENT_ROOMS games are loaded, and loaded back on the room's next event
+app.config['ROOM_IDLE_SECONDS'] = float(os.environ.get('ROOM_IDLE_SECONDS', 600))
+app.config['MAX_RESIDENT_ROOMS'] = int(os.environ.get('MAX_RESIDENT_ROOMS', 100))
+socketio = SocketIO(app, async_mode='eventlet', json=PacketJSON) # Reuses the encoding of shared state payloads
+
+def open_game_store() -> GameStore:
+    """The configured GAME_STORE, or a store in a temporary file removed when the process exits."""
+    if app.config['GAME_STORE']:
+        return GameStore(app.config['GAME_STORE'])
+    directory = tempfile.TemporaryDirectory(prefix='water-barons-')
+    store = GameStore(os.path.join(directory.name, 'games.sqlite3'))
+    atexit.register(directory.cleanup)
+    atexit.register(store.close) # Runs first
+    return store
+
+# Every game hosted by this process, keyed by room id (see webapp/rooms.py)
+rooms = RoomManager(
+    max_rooms=app.config['MAX_ROOMS'],
+    players_per_room=app.config['PLAYERS_PER_ROOM'],
+    max_observers_per_room=app.config['MAX_OBSERVERS_PER_ROOM'],
+    reconnect_grace=app.config['RECONNECT_GRACE_SECONDS'],
+    store=open_game_store(),
+    journal=bool(app.config['GAME_STORE']), # A temporary store only holds the games of idle rooms
+    idle_ttl=app.config['ROOM_IDLE_SECONDS'],
+    max_resident=app.config['MAX_RESIDENT_ROOMS'],
+    on_reload=lambda seconds: room_reload_seconds.observe(seconds),
+)
+event_limiter = RateLimiter(app.config['EVENTS_PER_SECOND'], app.config['EVENT_BURST'])
+
+# Served at /metrics in the Prometheus text format (see webapp/metrics.py)
+metrics = MetricsRegistry()
+handler_seconds = metrics.histogram('handler_seconds', "Time spent in each Socket.IO handler.", ('handler',))
+serialize_seconds = metrics.histogram('serialize_seconds', "Time spent serializing and publishing a room's state.")
+broadcast_seconds = metrics.histogram('broadcast_seconds', "Time spent on a room broadcast, serializing included.")
+messages_sent = metrics.counter('messages_sent_total', "State messages sent, per recipient.", ('event',))
+bytes_sent = metrics.counter('bytes_sent_total', "Bytes of state messages sent, per recipient.", ('event',))
+payload_bytes = metrics.histogram('payload_bytes', "Size of each state message payload.", ('event',), SIZE_BUCKETS)
+metrics.gauge('rooms', "Rooms hosted by this process.", lambda: len(rooms))
+metrics.gauge('rooms_resident', "Rooms with their game loaded.", lambda: rooms.resident_count)
+metrics.gauge('rooms_evicted', "Rooms with their game evicted to the game store.", lambda: rooms.evicted_count)
+metrics.read_counter('room_evictions_total', "Room games evicted to the game store.", lambda: rooms.evictions)
+room_reload_seconds = metrics.histogram('room_reload_seconds', "Time spent loading an evicted room's game back.")
+metrics.read_counter('events_dropped_total', "Inbound events dropped by the rate limit.", lambda: event_limiter.dropped)
+metrics.read_counter('broadcasts_requested_total', "Room broadcasts asked for.", lambda: broadcasts.requested)
+metrics.read_counter('broadcasts_sent_total', "Room broadcasts sent after coalescing.", lambda: broadcasts.flushed)
 
 
 @app.route('/')
@@ -27,278 +88,261 @@ def index():
     """Serves the main game page."""
     return render_template('index.html')
 
-def get_player_id_from_sid(sid):
-    """Return the player name associated with the given session ID."""
-    for player_name, session_id in player_sessions.items():
-        if session_id == sid:
-            return player_name
-    return None  # Unknown session
-
-def serialize_card(card): # Add type hint for card later e.g. card: Card
-    if not card:
-        return None
+@app.route('/catalog')
+def card_catalog():
+    """The card definitions that game state payloads refer to by ID. Clients revalidate with the ETag."""
+    body, etag = card_catalog_json()
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache' # Always revalidate; an unchanged catalog costs a 304
+    return response.make_conditional(request)
+
+@app.route('/metrics')
+def metrics_page():
+    """Handler latencies, message counts and sizes and room counts, for Prometheus to scrape."""
+    return app.response_class(metrics.render(), mimetype=None, content_type=MetricsRegistry.CONTENT_TYPE)
+
+def get_room_and_player(sid):
+    """Return the room of the given session ID and the player seated there (None for observers)."""
+    room = rooms.room_of(sid)
+    if room is None:
+        return None, None
+    return room, room.player_for_sid(sid)
+
+def send_state(room: Room, sids=None):
+    """
+    Brings the room's sockets (or just `sids`) up to its latest state version: a snapshot or a delta
+    each, encoded once for all of them, and their private part where it changed.
+    """
+    for targets, event, payload in room.sync.messages(sids):
+        # Shared payloads are encoded once anyway; the small private ones are measured separately
+        size = len(payload.encoded()) if isinstance(payload, SharedPayload) else len(PacketJSON.dumps(payload))
+        payload_bytes.observe(size, event=event)
+        messages_sent.inc(len(targets), event=event)
+        bytes_sent.inc(size * len(targets), event=event)
+        socketio.emit(event, payload, to=targets)
+
+
+def flush_game_state(room: Room):
+    """Publishes the room's game state as a new version and sends every socket in the room what it lacks."""
+    if not rooms.use(room):
+        return # Everyone left before the broadcast went out
+    with broadcast_seconds.time():
+        with serialize_seconds.time():
+            room.publish_state()
+        send_state(room)
+
+broadcasts = BroadcastCoalescer(app.config['BROADCAST_WINDOW_MS'] / 1000.0, flush_game_state,
+                                socketio.start_background_task, socketio.sleep)
+
+def broadcast_game_state(room: Room):
+    """Tells the room about its new game state, together with any other changes in the next few milliseconds."""
+    broadcasts.request(room)
+
+
+def rate_limited(handler):
+    """Drops events from sockets that send more than EVENTS_PER_SECOND (see webapp/throttle.py)."""
+    @functools.wraps(handler)
+    def limited_handler(*args):
+        if not event_limiter.allow(request.sid):
+            return None
+        return handler(*args)
+    return limited_handler
+
+
+def timed(handler):
+    """Records the time spent in `handler` in the handler_seconds histogram, labelled with its name."""
+    @functools.wraps(handler)
+    def timed_handler(*args):
+        with handler_seconds.time(handler=handler.__name__):
+            return handler(*args)
+    return timed_handler
+
+
+def play_automatic_decisions(room: Room):
+    """Plays the decisions the web UI does not ask for yet: Crowd-phase sales are made greedily."""
+    game = room.game
+    decision = game.pending_decision()
+    while decision is not None and decision.phase == Phase.CROWD_SALES:
+        room.submit(decision.player, greedy_sales(game, decision.player, decision.options))
+        decision = game.pending_decision()
+
+
+def after_decision(room: Room):
+    """Plays on to the next decision a person makes and tells the room about it (and the picker its Whim options)."""
+    play_automatic_decisions(room)
+    broadcast_game_state(room)
 
-    card_data = {'name': card.name, 'description': card.description, 'cost': card.cost, 'card_type': card.card_type.name}
-
-    if card.card_type == CardType.WHIM: # Check if CardType is imported
-        # Ensure WhimCard specific attributes are accessed safely
-        card_data['trigger_condition'] = getattr(card, 'trigger_condition', '')
-        card_data['pre_round_effect'] = getattr(card, 'pre_round_effect', '')
-        card_data['post_round_fallout'] = getattr(card, 'post_round_fallout', '')
-    elif card.card_type == CardType.FACILITY:
-        card_data['base_output'] = getattr(card, 'base_output', 0)
-        card_data['impact_profile'] = {k.name: v for k,v in getattr(card, 'impact_profile', {}).items()}
-        card_data['tags'] = getattr(card, 'tags', [])
-    # Add more elif for other card types if specific serialization needed for them
-
-    return card_data
-
-def serialize_player(player: Player) -> dict:
-    return {
-        'name': player.name,
-        'cred_coin': player.cred_coin,
-        'reputation_stars': player.reputation_stars,
-        'total_water_produced': player.get_total_water_produced(),
-        'water_batches': [{
-            'facility_name': wb['facility_name'],
-            'quantity': wb['quantity'],
-            'base_impact_profile': {k.name: v for k,v in wb['base_impact_profile'].items()},
-            'facility_tags': wb['facility_tags']
-        } for wb in player.water_batches],
-        'facilities': [serialize_card(f) for f in player.facilities],
-        'distribution_routes': [serialize_card(r) for r in player.distribution_routes],
-        'r_and_d': [serialize_card(tech) for tech in player.r_and_d],
-        'futures_tokens': [str(ft) for ft in player.futures_tokens], # str() is a placeholder
-        'event_options': [str(eo) for eo in player.event_options], # str() is a placeholder
-        'impact_storage': {k.name: v for k,v in player.impact_storage.items()},
-    }
-
-
-def serialize_game_state(gs: GameState) -> dict:
-    if not gs:
-        return {}
-    return {
-        'round_number': gs.round_number,
-        'current_player_name': gs.get_current_player().name if gs.players and gs.current_player_index < len(gs.players) else "N/A",
-        'current_player_index': gs.current_player_index,
-        'players': [serialize_player(p) for p in gs.players],
-        'impact_tracks': {
-            track_color.name: {
-                'name': track.name,
-                'level': track.level,
-                'max_level': track.max_level
-            } for track_color, track in gs.impact_tracks.items()
-        },
-        'demand_segments': {
-            name: {
-                'name': seg.name,
-                'current_demand': seg.current_demand,
-                'current_price': seg.current_price,
-                'values_description': seg.values_description
-            } for name, seg in gs.demand_segments.items()
-        },
-        'crowd_deck_size': len(gs.crowd_deck),
-        'whim_discard_pile_top': serialize_card(gs.whim_discard_pile[-1]) if gs.whim_discard_pile else None,
-        'active_global_events': [serialize_card(e) for e in gs.global_event_tiles_active],
-        'log': gs.game_log[-20:], # Last 20 log entries
-        'uninhaitable': gs.uninhaitable
-    }
-
-def broadcast_game_state():
-    global game_instance
-    if game_instance:
-        state = serialize_game_state(game_instance.game_state)
-        socketio.emit('game_state_update', state)
-        # print("Broadcasting game state") # For debugging
 
 @socketio.on('connect')
-def handle_connect():
-    """Handles new client connections."""
-    global game_instance, player_sessions
-    print(f'Client connected: {request.sid}')
-
-    num_expected_players = 2 # Hardcoded for now
-
-    if game_instance is None:
-        player_names = [f"Player {i+1}" for i in range(num_expected_players)]
-        game_instance = GameLogic(num_players=len(player_names), player_names=player_names)
-        game_instance.start_game()
-        player_sessions = {} # Reset player sessions for a new game
-        print("New game instance created.")
-
-    # Assign player slot if available
-    # This is a very basic way to assign players. Needs improvement for robustness.
-    assigned_player_id = None
-    if len(player_sessions) < num_expected_players:
-        # Find the first unassigned player name
-        for p_idx, p_name in enumerate(game_instance.game_state.players):
-            if p_name not in player_sessions:
-                player_sessions[p_name] = request.sid  # store player -> sid
-                assigned_player_id = p_name
-                emit('assign_player_id', {'playerId': p_name, 'playerIndex': p_idx })
-                print(f"Assigned {p_name} (P{p_idx+1}) to session {request.sid}")
-                break
-
-    if not assigned_player_id and len(player_sessions) >= num_expected_players:
-         emit('message', {'data': 'Game is full. Connected as observer.'})
-
+@timed
+def handle_connect(auth=None):
+    """
+    Handles new client connections: joins the room named by the `room` query parameter. A client
+    coming back sends {'token': reconnect token, 'version': last state version it saw} as its
+    auth data to take its seat back and get only the state changes since that version.
+    """
+    sid = request.sid
+    room_id = request.args.get('room', DEFAULT_ROOM)
+    auth = auth if isinstance(auth, dict) else {}
+    token = auth.get('token') if isinstance(auth.get('token'), str) else None
+    version = auth.get('version') if isinstance(auth.get('version'), int) else None
+    print(f'Client connected: {sid} (room {room_id})')
+
+    try:
+        room, player = rooms.join(room_id, sid, token=token, version=version)
+    except RoomError as e:
+        emit('error_message', {'message': str(e)})
+        return False # Refuses the connection
+    join_room(room.room_id)
+
+    if player is not None:
+        player_index = room.game.game_state.players.index(player)
+        emit('assign_player_id', {'playerId': player.name, 'playerIndex': player_index, 'roomId': room.room_id,
+                                  'reconnectToken': room.tokens[player.name]})
+        print(f"Assigned {player.name} (P{player_index + 1}) in room {room.room_id} to session {sid}")
+    else:
+        emit('message', {'data': 'Game is full. Connected as observer.'})
 
-    # Always send the current game state
-    broadcast_game_state()
+    # Send the current game state at once, with the Whim options if this seat's pick is pending
+    with serialize_seconds.time():
+        room.publish_state()
+    send_state(room, [sid])
 
 
 @socketio.on('disconnect')
-def handle_disconnect():
-    global player_sessions
+@timed
+def handle_disconnect(reason=None):
     print(f'Client disconnected: {request.sid}')
-    # Remove player from session mapping if they were assigned
-    for name, sid in list(player_sessions.items()):
-        if sid == request.sid:
-            player_sessions.pop(name)
-            print(f"Player {name} from session {request.sid} removed.")
-            break
-    # TODO: Handle game state if a player disconnects mid-game (e.g., pause, AI takeover, etc.)
+    event_limiter.forget(request.sid)
+    room = rooms.leave(request.sid)
+    if room is not None:
+        print(f"Session {request.sid} left room {room.room_id}.")
+    # The seat is held for RECONNECT_GRACE_SECONDS; the game waits on its decisions meanwhile
+
+@socketio.on('state_ack')
+@rate_limited
+@timed
+def on_state_ack(data):
+    """The client applied the given state version; later deltas are based on it."""
+    room = rooms.room_of(request.sid)
+    if room and isinstance(data, dict) and isinstance(data.get('version'), int):
+        room.sync.ack(request.sid, data['version'])
+
+
+@socketio.on('state_resync')
+@rate_limited
+@timed
+def on_state_resync():
+    """The client lost track of its state; send it a full snapshot."""
+    room = rooms.room_of(request.sid)
+    if room:
+        room.sync.resync(request.sid)
+        send_state(room, [request.sid])
 
 # --- Whim Draft Handlers ---
 @socketio.on('start_whim_draft')
+@rate_limited
+@timed
 def on_start_whim_draft():
-    global game_instance
     sid = request.sid
-    player_name = get_player_id_from_sid(sid)
+    room, player = get_room_and_player(sid)
 
-    if not game_instance or not player_name:
-        emit('error_message', {'message': 'Game or player not initialized.'}, room=sid)
+    if not room or not player:
+        emit('error_message', {'message': 'Game or player not initialized.'}, to=sid)
         return
 
-    # Potentially check if it's an appropriate time to start draft (e.g., between rounds)
-    # For now, allow manual trigger for testing.
-    print(f"'{player_name}' initiated Whim Draft.")
-    game_instance.initiate_whim_draft() # This will setup GameState for drafting
+    game = room.game
+    if game.pending_decision() is not None or game.game_state.phase == Phase.GAME_OVER:
+        emit('error_message', {'message': 'A round can only start between rounds.'}, to=sid)
+        return
 
-    # The first pick request is part of initiate_whim_draft now via internal call
-    next_pick_info = game_instance.request_next_whim_draft_pick()
-    if next_pick_info:
-        player_to_pick, options, pick_num = next_pick_info
-        target_sid = player_sessions.get(player_to_pick.name)
-        if target_sid:
-            serialized_options = [serialize_card(c) for c in options]
-            emit('whim_draft_options', {'player_name': player_to_pick.name, 'options': serialized_options, 'pick_num': pick_num}, room=target_sid)
-            print(f"Sent draft options to {player_to_pick.name} (SID: {target_sid})")
-    else: # Draft finished immediately (e.g. no players/picks) or error
-        broadcast_game_state()
+    # Starting the round opens its Whim Draft
+    print(f"'{player.name}' started a round in room {room.room_id}.")
+    room.start_round()
+    after_decision(room)
 
 
 @socketio.on('submit_whim_draft_choice')
+@rate_limited
+@timed
 def on_submit_whim_draft_choice(data):
-    global game_instance
     sid = request.sid
-    player_name = get_player_id_from_sid(sid)
+    room, player = get_room_and_player(sid)
+    decision = room.game.pending_decision() if room else None
 
-    if not game_instance or not player_name or not game_instance.game_state.whim_draft_active:
-        emit('error_message', {'message': 'Cannot submit draft choice: Draft not active or player invalid.'}, room=sid)
+    if not player or decision is None or decision.phase != Phase.WHIM_DRAFT:
+        emit('error_message', {'message': 'Cannot submit draft choice: Draft not active or player invalid.'}, to=sid)
         return
 
-    # Verify it's this player's turn to pick based on game_state draft order
-    current_expected_picker_idx = game_instance.game_state.whim_draft_order[game_instance.game_state.whim_draft_current_picker_idx_in_order]
-    current_expected_player = game_instance.game_state.players[current_expected_picker_idx]
-
-    if current_expected_player.name != player_name:
-        emit('error_message', {'message': f"Not your turn to draft. Waiting for {current_expected_player.name}."}, room=sid)
+    if decision.player is not player:
+        emit('error_message', {'message': f"Not your turn to draft. Waiting for {decision.player.name}."}, to=sid)
         return
 
     chosen_card_index = data.get('chosen_card_index')
-
-    if game_instance.process_whim_draft_pick(current_expected_player, chosen_card_index):
-        print(f"{player_name} submitted draft choice: index {chosen_card_index}")
-        broadcast_game_state() # Update everyone on the general state change (e.g. crowd deck size)
-
-        # Request next pick
-        next_pick_info = game_instance.request_next_whim_draft_pick()
-        if next_pick_info:
-            player_to_pick, options, pick_num = next_pick_info
-            target_sid = player_sessions.get(player_to_pick.name)
-            if target_sid:
-                serialized_options = [serialize_card(c) for c in options]
-                emit('whim_draft_options', {'player_name': player_to_pick.name, 'options': serialized_options, 'pick_num': pick_num}, room=target_sid)
-                print(f"Sent next draft options to {player_to_pick.name}")
-        else: # Draft finished
-            print("Whim draft complete after player submission.")
-            # broadcast_game_state() was already called, or could be called again if specific end-draft state needed
+    if room.submit(player, chosen_card_index):
+        print(f"{player.name} submitted draft choice: index {chosen_card_index}")
     else:
-        emit('error_message', {'message': 'Failed to process draft pick.'}, room=sid)
+        emit('error_message', {'message': 'Invalid draft pick; the pick was passed.'}, to=sid)
+    after_decision(room)
+
+
+def action_from_request(game, action_type, payload) -> Optional[Action]:
+    """Builds the Ops `Action` for a `player_action` request, or returns None if it is malformed."""
+    if action_type not in ACTION_KINDS:
+        return None
+    if action_type == BUILD_FACILITY and 'card_name' in payload:
+        # Older clients name the card; look it up in the facility market
+        market = [card.name for card in game.game_state.facility_deck[:MARKET_SIZE]]
+        if payload.get('card_name') not in market or payload.get('slot_index') is None:
+            return None
+        return Action(BUILD_FACILITY, (market.index(payload['card_name']), payload['slot_index']))
+    args = payload.get('args', [])
+    if not isinstance(args, list):
+        return None
+    return Action(action_type, tuple(args))
 
 
 @socketio.on('player_action')
+@rate_limited
+@timed
 def handle_player_action(data):
-    """Handles actions sent by players."""
-    global game_instance, player_sessions
+    """Handles Ops actions sent by players: {'action_type': kind, 'payload': {'args': [...]}}."""
     sid = request.sid
+    room, player = get_room_and_player(sid)
 
-    if not game_instance:
-        emit('error_message', {'message': 'Game not initialized.'}, room=sid)
+    if not room:
+        emit('error_message', {'message': 'Game not initialized.'}, to=sid)
         return
 
-    player_name_from_session = get_player_id_from_sid(sid)
-    if not player_name_from_session:
-        emit('error_message', {'message': 'You are not recognized as a player in this game.'}, room=sid)
+    if not player:
+        emit('error_message', {'message': 'You are not recognized as a player in this game.'}, to=sid)
         return
 
-    # Prevent actions if whim draft is active and it's not this player's turn to pick
-    # (or more generally, if game is in a state where this player shouldn't act)
-    if game_instance.game_state.whim_draft_active:
-         emit('error_message', {'message': 'Cannot perform action: Whim Draft is active.'}, room=sid)
-         return
-
+    decision = room.game.pending_decision()
+    if decision is None or decision.phase != Phase.OPS:
+        emit('error_message', {'message': 'Cannot perform action: it is not the Ops Phase.'}, to=sid)
+        return
 
-    current_player_in_game = game_instance.game_state.get_current_player()
-    if current_player_in_game.name != player_name_from_session:
-        emit('error_message', {'message': f"It's not your turn. Current player is {current_player_in_game.name}."}, room=sid)
+    if decision.player is not player:
+        emit('error_message', {'message': f"It's not your turn. Current player is {decision.player.name}."}, to=sid)
         return
 
     action_type = data.get('action_type')
     payload = data.get('payload', {})
-    print(f"Received action from {player_name_from_session} (SID: {sid}): {action_type} with payload {payload}")
-
-    success = False
-    if action_type == 'build_facility':
-        card_name = payload.get('card_name')
-        slot_index = payload.get('slot_index')
-
-        if card_name is not None and slot_index is not None:
-            # Find the card from the deck (simplistic: assumes it's available and takes first found)
-            # TODO: A real market or hand management would be needed.
-            card_to_build = None
-            for card in game_instance.game_state.facility_deck:
-                if card.name == card_name:
-                    card_to_build = card
-                    break
-
-            if card_to_build:
-                if game_instance.action_build_facility(current_player_in_game, card_to_build, slot_index):
-                    # Remove card from deck if successfully built
-                    game_instance.game_state.facility_deck.remove(card_to_build)
-                    success = True
-                else:
-                    # game_logic already logs failure reasons
-                    emit('action_feedback', {'success': False, 'message': f"Failed to build {card_name}. Check game log."}, room=sid)
-            else:
-                emit('action_feedback', {'success': False, 'message': f"Card '{card_name}' not found in deck."}, room=sid)
-        else:
-            emit('action_feedback', {'success': False, 'message': 'Missing card_name or slot_index for build_facility.'}, room=sid)
-
-    # Add other action handlers here (flow, route, etc.)
-    # elif action_type == 'flow': ...
-
-    if success:
-        # Potentially advance turn or game phase if applicable after this action
-        # For now, just broadcast the state.
-        # Example: if game_instance.game_state.actions_taken_this_turn == 2: game_instance.game_state.next_player_or_phase()
-        emit('action_feedback', {'success': True, 'message': f"Action '{action_type}' successful."}, room=sid)
-        broadcast_game_state() # Update all clients
+    print(f"Received action from {player.name} (SID: {sid}): {action_type} with payload {payload}")
+
+    action = action_from_request(room.game, action_type, payload)
+    if action is None:
+        emit('action_feedback', {'success': False, 'message': f"Action '{action_type}' is malformed."}, to=sid)
+        return
+
+    # An invalid action still uses up the player's action, as at the table
+    if room.submit(player, action):
+        emit('action_feedback', {'success': True, 'message': f"Action '{action_type}' successful."}, to=sid)
     else:
-        # If not successful but not handled by specific emit above
-        if not payload.get('card_name'): # Avoid redundant message if card not found
-             emit('action_feedback', {'success': False, 'message': f"Action '{action_type}' failed or was invalid."}, room=sid)
+        emit('action_feedback', {'success': False, 'message': f"Action '{action_type}' failed or was invalid. Check game log."}, to=sid)
+    after_decision(room)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,354 @@
+"""Load test for the web app: many simulated players against one server process.
+
+Starts `webapp/app.py` on localhost in a subprocess (or targets a running server
+with --url), then connects N clients in rooms of PLAYERS_PER_ROOM. Each client
+takes its seat and plays: the first seat of every room starts the rounds with
+`start_whim_draft`, each client answers its own Whim picks with
+`submit_whim_draft_choice` and its Ops turns with `player_action`. At the end
+it reports the latency of each kind of request (from sending it to the reply
+it causes), message rates, the server's memory use and, from its /metrics
+page, where the server spent its time, e.g.:
+
+    python -m webapp.loadtest --clients 200 --rounds 3
+
+Clients speak the Socket.IO protocol over `simple_websocket` (which the server
+stack already depends on) and run as threads, which `main` turns into green
+threads so thousands of them fit in one process.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+from water_barons.actions import BUILD_FACILITY, PASS, PRODUCE_WATER  # noqa: E402
+from webapp.sync import apply_delta  # noqa: E402
+
+# Ops actions the simulated players choose from: (action_type, args)
+OPS_CHOICES = [(PASS, []), (BUILD_FACILITY, [0, 0]), (PRODUCE_WATER, [0])]
+# Reply that ends the latency measurement of each request; 'state' is the next state update
+REPLY_TO = {'connect': 'state', 'start_whim_draft': 'state', 'submit_whim_draft_choice': 'state',
+            'player_action': 'action_feedback'}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """The nearest-rank `pct` percentile of `values` (0 for none)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def server_rss_kb(pid: int) -> Optional[int]:
+    """Resident memory of process `pid` in kB, from /proc; None where that is not available."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def scrape_server_times(url: str) -> Dict[str, dict]:
+    """Count and total seconds of each handler, serialization and broadcasts, from the server's /metrics."""
+    try:
+        with urllib.request.urlopen(f"{url}/metrics", timeout=10) as response:
+            text = response.read().decode()
+    except OSError:
+        return {}
+    times: Dict[str, dict] = {}
+    for line in text.splitlines():
+        name, _, value = line.rpartition(' ')
+        for metric in ('handler_seconds', 'serialize_seconds', 'broadcast_seconds'):
+            for stat in ('sum', 'count'):
+                prefix = f"water_barons_{metric}_{stat}"
+                if name.startswith(prefix):
+                    label = name[len(prefix):].partition('"')[2].rpartition('"')[0] or metric.rpartition('_')[0]
+                    times.setdefault(label, {})['seconds' if stat == 'sum' else 'count'] = float(value)
+    return times
+
+
+class LoadClient:
+    """One simulated player: a Socket.IO connection to room `room_id` that plays until round `rounds` ends."""
+
+    def __init__(self, url: str, room_id: str, rounds: int, think: float, rng: random.Random):
+        self.url = url.replace('http://', 'ws://', 1)
+        self.room_id = room_id
+        self.rounds = rounds
+        self.think = think
+        self.rng = rng
+        self.latencies: Dict[str, List[float]] = {}  # Request event -> seconds until its reply
+        self.sent = self.received = self.bytes_received = self.errors = 0
+        self.player: Optional[str] = None
+        self.seat: Optional[int] = None
+        self.state: Optional[dict] = None
+        self.private: dict = {}
+        self.done = False
+        self.failure: Optional[str] = None
+        self._waiting: Optional[tuple] = None  # (request event, time sent) until its reply
+        self._ws = None
+
+    def run(self, deadline: float) -> None:
+        import simple_websocket
+        try:
+            self._ws = simple_websocket.Client.connect(
+                f"{self.url}/socket.io/?EIO=4&transport=websocket&room={self.room_id}")
+            self._ws.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._waiting = ('connect', time.perf_counter())
+            self._send_raw('40')
+            while not self.done and time.monotonic() < deadline:
+                packet = self._ws.receive(timeout=max(0.0, deadline - time.monotonic()))
+                if packet is None:
+                    break
+                self._on_packet(packet)
+            if not self.done:
+                self.failure = "timed out"
+        except Exception as e: # Count the failure and keep the rest of the run going
+            self.failure = f"{type(e).__name__}: {e}"
+        finally:
+            if self._ws is not None:
+                try:
+                    self._send_raw('1') # Engine.IO close: the server hangs up, which ends the reader cleanly
+                    self._ws.thread.join(5)
+                    self._ws.close()
+                except Exception:
+                    pass
+
+    def _send_raw(self, text: str) -> None:
+        self._ws.send(text)
+
+    def emit(self, event: str, data=None) -> None:
+        args = [event] if data is None else [event, data]
+        self._send_raw('42' + json.dumps(args, separators=(',', ':')))
+        self.sent += 1
+        if event in REPLY_TO:
+            self._waiting = (event, time.perf_counter())
+
+    def _on_packet(self, packet) -> None:
+        if isinstance(packet, bytes):
+            packet = packet.decode()
+        self.bytes_received += len(packet)
+        if packet == '2': # Engine.IO ping
+            self._send_raw('3')
+        elif packet.startswith('44'):
+            self.failure = f"refused: {packet[2:]}"
+            self.done = True
+        elif packet.startswith('42'):
+            self.received += 1
+            event, *args = json.loads(packet[2:])
+            self._on_event(event, args[0] if args else None)
+
+    def _replied(self, reply: str) -> None:
+        if self._waiting is not None and REPLY_TO[self._waiting[0]] == reply:
+            request, sent_at = self._waiting
+            self.latencies.setdefault(request, []).append(time.perf_counter() - sent_at)
+            self._waiting = None
+
+    def _on_event(self, event: str, data) -> None:
+        if event == 'assign_player_id':
+            self.player, self.seat = data['playerId'], data['playerIndex']
+        elif event == 'state_snapshot':
+            self._on_state(data['version'], data['state'])
+        elif event == 'state_delta':
+            if self.state is None or data['base'] != self._version:
+                self.emit('state_resync')
+            else:
+                self._on_state(data['version'], apply_delta(self.state, data['ops']))
+        elif event == 'private_state':
+            self.private = data['state'] or {}
+            self._play()
+        elif event == 'action_feedback':
+            self._replied('action_feedback')
+        elif event == 'error_message':
+            self.errors += 1
+
+    def _on_state(self, version: int, state: dict) -> None:
+        self.state, self._version = state, version
+        self.emit('state_ack', {'version': version})
+        self._replied('state')
+        self._play()
+
+    def _play(self) -> None:
+        """Makes this player's move, if the latest state says it has one."""
+        state = self.state
+        if state is None or self._waiting is not None or self.player is None:
+            return
+        phase = state.get('phase')
+        if phase == 'GAME_OVER' or (phase == 'ROUND_END' and state['round_number'] >= self.rounds):
+            self.done = True
+            return
+        if self.think:
+            time.sleep(self.think * self.rng.random())
+        draft = self.private.get('draft')
+        if phase == 'WHIM_DRAFT' and draft:
+            del self.private['draft'] # Used up; the next pick's options come in a new private state
+            self.emit('submit_whim_draft_choice', {'chosen_card_index': self.rng.randrange(len(draft['options']))})
+        elif phase == 'OPS' and state.get('current_player_name') == self.player:
+            action_type, args = self.rng.choice(OPS_CHOICES)
+            self.emit('player_action', {'action_type': action_type, 'payload': {'args': args}})
+        elif phase in ('SETUP', 'ROUND_END') and self.seat == 0:
+            self.emit('start_whim_draft')
+
+
+def start_server(port: int, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """Runs the web app on 127.0.0.1:`port` in a subprocess and waits until it accepts connections."""
+    server = subprocess.Popen([sys.executable, '-m', 'webapp.loadtest', '--serve', str(port)], cwd=ROOT,
+                              env=dict(os.environ, **(env or {})),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The server exited with status {server.returncode}.")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("The server did not start in time.")
+
+
+def serve(port: int) -> None:
+    from webapp.app import app, socketio
+    socketio.run(app, host='127.0.0.1', port=port, debug=False, use_reloader=False, log_output=False)
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def run_load(url: str, clients: int, rounds: int = 2, players_per_room: int = 2, think: float = 0.0,
+             connect_rate: float = 200.0, timeout: float = 120.0, seed: int = 0,
+             server_pid: Optional[int] = None) -> dict:
+    """Plays `clients` simulated players against the server at `url` and returns the run's measurements."""
+    rng = random.Random(seed)
+    run_id = f"{rng.randrange(16 ** 6):06x}"
+    load_clients = [LoadClient(url, f"load-{run_id}-{i // players_per_room}", rounds, think,
+                               random.Random(rng.random())) for i in range(clients)]
+    memory = {'before_kb': server_rss_kb(server_pid) if server_pid else None, 'peak_kb': None}
+    finished = threading.Event()
+
+    def sample_memory():
+        while not finished.is_set():
+            rss = server_rss_kb(server_pid)
+            if rss is not None:
+                memory['peak_kb'] = max(memory['peak_kb'] or 0, rss)
+            finished.wait(0.25)
+
+    if server_pid:
+        threading.Thread(target=sample_memory, daemon=True).start()
+    start = time.monotonic()
+    deadline = start + timeout
+    threads = []
+    for client in load_clients:
+        thread = threading.Thread(target=client.run, args=(deadline,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        time.sleep(1.0 / connect_rate) # Ramp up rather than connecting everyone at once
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()) + 1)
+    elapsed = time.monotonic() - start
+    memory['after_kb'] = server_rss_kb(server_pid) if server_pid else None
+    finished.set()
+
+    latencies: Dict[str, List[float]] = {}
+    for client in load_clients:
+        for request, values in client.latencies.items():
+            latencies.setdefault(request, []).extend(values)
+    failures = [client.failure for client in load_clients if client.failure]
+    return {
+        'clients': clients,
+        'rooms': len({client.room_id for client in load_clients}),
+        'finished': sum(client.done and not client.failure for client in load_clients),
+        'failures': failures,
+        'seconds': elapsed,
+        'latency_ms': {request: {'count': len(values), 'p50': 1e3 * percentile(values, 50),
+                                 'p95': 1e3 * percentile(values, 95), 'p99': 1e3 * percentile(values, 99)}
+                       for request, values in sorted(latencies.items())},
+        'sent_per_second': sum(c.sent for c in load_clients) / elapsed,
+        'received_per_second': sum(c.received for c in load_clients) / elapsed,
+        'received_kb_per_second': sum(c.bytes_received for c in load_clients) / 1024 / elapsed,
+        'error_messages': sum(c.errors for c in load_clients),
+        'server_memory': memory,
+        'server_seconds': scrape_server_times(url),
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [f"{report['clients']} clients in {report['rooms']} rooms, {report['finished']} finished, "
+             f"{len(report['failures'])} failed, {report['seconds']:.1f}s"]
+    lines.append(f"  {'request':<26} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for request, stats in report['latency_ms'].items():
+        lines.append(f"  {request:<26} {stats['count']:>7} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f}")
+    lines.append(f"  messages: {report['sent_per_second']:.0f}/s sent, {report['received_per_second']:.0f}/s received "
+                 f"({report['received_kb_per_second']:.0f} kB/s); {report['error_messages']} error messages")
+    memory = report['server_memory']
+    if memory.get('before_kb') is not None:
+        per_room = ((memory['peak_kb'] or memory['before_kb']) - memory['before_kb']) / max(1, report['rooms'])
+        lines.append(f"  server memory: {memory['before_kb'] / 1024:.1f} MB before, {(memory['peak_kb'] or 0) / 1024:.1f} MB peak, "
+                     f"{memory['after_kb'] / 1024:.1f} MB after (~{per_room:.0f} kB per room)")
+    busiest = sorted(report['server_seconds'].items(), key=lambda item: -item[1].get('seconds', 0))
+    if busiest:
+        lines.append("  server time (from /metrics):")
+    for name, stats in busiest:
+        count = int(stats.get('count', 0))
+        lines.append(f"    {name:<26} {stats.get('seconds', 0):7.2f}s over {count:>6} calls "
+                     f"({1e3 * stats.get('seconds', 0) / max(1, count):.2f} ms each)")
+    for failure in sorted(set(report['failures']))[:5]:
+        lines.append(f"  failure: {failure}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the Water Barons web app with simulated players.")
+    parser.add_argument("--clients", type=int, default=100, help="Simulated players")
+    parser.add_argument("--rounds", type=int, default=2, help="Rounds each room plays")
+    parser.add_argument("--players-per-room", type=int, default=2, help="Seats per room")
+    parser.add_argument("--think", type=float, default=0.0, help="Most seconds a player waits before each move")
+    parser.add_argument("--connect-rate", type=float, default=200.0, help="New connections per second")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds before the run is cut short")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the players' choices")
+    parser.add_argument("--url", help="Server to load, e.g. http://127.0.0.1:5000 (default: start one)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.serve:
+        serve(args.serve)
+        return
+
+    import eventlet
+    eventlet.monkey_patch() # Clients become green threads
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        server = start_server(port, {
+            'MAX_ROOMS': str(args.clients),
+            'PLAYERS_PER_ROOM': str(args.players_per_room),
+        })
+        url = f"http://127.0.0.1:{port}"
+    try:
+        report = run_load(url, args.clients, args.rounds, args.players_per_room, args.think, args.connect_rate,
+                          args.timeout, args.seed, server.pid if server else None)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Counters and histograms for the web app, exposed in the Prometheus text format.
+
+A small stand-in for `prometheus_client`, enough for the server's own metrics:
+
+    registry = MetricsRegistry()
+    latency = registry.histogram('handler_seconds', "Time in each handler.", ('handler',))
+    with latency.time(handler='player_action'):
+        ...
+    registry.render()  # The text served at /metrics
+
+Each metric keeps one series per combination of label values.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Upper bounds of the payload size buckets, in bytes
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + ','.join(pairs) + '}'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, not {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """(sample name, formatted labels, value) for every series."""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, _format_labels(self.label_names, key), value
+
+
+class Gauge(Metric):
+    """A value read from `read()` whenever the metrics are rendered."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        super().__init__(name, help_text)
+        self.read = read
+
+    def samples(self):
+        yield self.name, '', self.read()
+
+
+class ReadCounter(Gauge):
+    """A counter kept elsewhere, read from `read()` whenever the metrics are rendered."""
+    kind = 'counter'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], list] = {}  # Labels -> [count per bucket (+Inf last), sum]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1 # The first bucket with value <= its bound
+        series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the seconds spent in the `with` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self.series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        for key, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                yield f"{self.name}_bucket", _format_labels(self.label_names + ('le',), key + (le,)), cumulative
+            yield f"{self.name}_sum", _format_labels(self.label_names, key), total
+            yield f"{self.name}_count", _format_labels(self.label_names, key), cumulative
+
+
+class MetricsRegistry:
+    """The metrics of one server process, rendered together by `render`."""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, prefix: str = 'water_barons_'):
+        self.prefix = prefix
+        self.metrics: List[Metric] = []
+
+    def _add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(self.prefix + name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+        return self._add(Gauge(self.prefix + name, help_text, read))
+
+    def read_counter(self, name: str, help_text: str, read: Callable[[], float]) -> ReadCounter:
+        return self._add(ReadCounter(self.prefix + name, help_text, read))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(self.prefix + name, help_text, label_names, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,389 @@
+"""Game rooms for the web app.
+
+Each room hosts one `GameLogic` game and is addressed by a room id chosen by
+the clients (the `room` query parameter when connecting). Sockets join a room
+as seated players until every seat is taken, then as observers. The
+`RoomManager` keeps the rooms of one server process and enforces its caps, so
+a single process can host many small games side by side.
+
+Every seat comes with a reconnect token. A socket that connects with the token
+of a free (or held) seat in its room takes that seat back, and if it also says
+which state version it last saw, it is sent only the changes since then. All
+lookups by socket or token are dictionary lookups, so the cost of an event does
+not grow with the number of sockets the process holds.
+
+With a `GameStore`, every move made in a room is journaled as it is played,
+and a room whose game is in the store (say, from before a restart) is loaded
+from it when its first socket joins. The store also takes the games of idle
+rooms off the process's hands: a room left alone for `idle_ttl` seconds, or
+the least recently used one when more than `max_resident` rooms have their
+games loaded, is evicted. Its game goes to the store and out of memory while
+its sockets, seats and tokens stay, and the next join or event in the room
+loads the game back. A manager can also use its store for eviction alone, with
+rooms that journal nothing.
+"""
+import re
+import secrets
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from water_barons.game_entities import Player
+from water_barons.game_log import LogLevel
+from water_barons.game_logic import GameLogic
+from water_barons.game_state import Phase
+from water_barons.store import GameStore, StoreError, apply_entry, start_entry, submit_entry
+from webapp.serialization import StateSerializer, card_ref
+from webapp.sync import StateSync
+
+DEFAULT_ROOM = "lobby"
+ROOM_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class RoomError(Exception):
+    """A socket could not join a room; the message is meant for the client."""
+
+
+class Room:
+    """One game and the sockets in it: seated players (by player name) and observers."""
+
+    def __init__(self, room_id: str, num_players: int = 2, log_level: LogLevel = LogLevel.DEBUG,
+                 seed: Optional[int] = None, game: Optional[GameLogic] = None, store: Optional[GameStore] = None):
+        """`game` is a game to host as it stands, e.g. one loaded from `store`; by default a new one is set up."""
+        self.room_id = room_id
+        if game is None:
+            player_names = [f"Player {i + 1}" for i in range(num_players)]
+            game = GameLogic(num_players=num_players, player_names=player_names, seed=seed, log_level=log_level)
+            game.start_game()
+        self.store = store # Journals the moves played through `start_round` and `submit`
+        self._attach(game)
+        # Seats are keyed by player name; None while nobody holds the seat
+        self.seats: Dict[str, Optional[str]] = {name: None for name in self._players}
+        self.observers: Set[str] = set()
+        self._name_of_sid: Dict[str, str] = {}  # The reverse of `seats`
+        self.tokens: Dict[str, str] = {}  # Player name -> reconnect token of the seat
+        self._held_until: Dict[str, float] = {}  # Player name -> time until which a dropped seat waits for its holder
+        self.sync = StateSync()  # Versions of the serialized state sent to the room's sockets
+        self.last_active = time.monotonic()
+
+    def _attach(self, game: GameLogic) -> None:
+        self.game: Optional[GameLogic] = game
+        self._players: Dict[str, Player] = {p.name: p for p in game.game_state.players}
+        self.serializer: Optional[StateSerializer] = StateSerializer(game.game_state)
+
+    @property
+    def resident(self) -> bool:
+        """False while the room's game is evicted (see `unload`)."""
+        return self.game is not None
+
+    def unload(self) -> GameLogic:
+        """
+        Lets go of the game and the states serialized from it, keeping the room's sockets, seats and
+        tokens, and returns the game. Nothing but `reload` may be called on the room until then.
+        """
+        game = self.game
+        self.game = None
+        self._players = {}
+        self.serializer = None
+        self.sync.reset() # Version numbers go on from here, so clients take the next state as new
+        return game
+
+    def reload(self, game: GameLogic) -> None:
+        """Hosts `game` again, as loaded back after `unload`. Every socket is sent a snapshot next."""
+        self._attach(game)
+
+    def touch(self) -> None:
+        self.last_active = time.monotonic()
+
+    @property
+    def members(self) -> List[str]:
+        """Session IDs of everyone in the room."""
+        return [sid for sid in self.seats.values() if sid is not None] + sorted(self.observers)
+
+    def is_empty(self, now: Optional[float] = None) -> bool:
+        """True if no socket is in the room and no dropped seat is still held (as of `now`)."""
+        if self.observers or self._name_of_sid:
+            return False
+        now = time.monotonic() if now is None else now
+        return all(until <= now for until in self._held_until.values())
+
+    def take_seat(self, sid: str, now: Optional[float] = None) -> Optional[Player]:
+        """Seats `sid` in the first free seat that is not held and returns its player, or None if there is none."""
+        now = time.monotonic() if now is None else now
+        for name, holder in self.seats.items():
+            if holder is None and self._held_until.get(name, 0.0) <= now:
+                self._seat(sid, name)
+                return self._players[name]
+        return None
+
+    def reclaim_seat(self, sid: str, name: str) -> Player:
+        """Seats `sid` at player `name`, held or not. A socket still in the seat becomes an observer."""
+        previous = self.seats[name]
+        if previous is not None:
+            del self._name_of_sid[previous]
+            self.observers.add(previous)
+            self.sync.add(previous) # Starts over as an observer
+        self._seat(sid, name)
+        return self._players[name]
+
+    def _seat(self, sid: str, name: str) -> None:
+        self.seats[name] = sid
+        self._name_of_sid[sid] = name
+        self._held_until.pop(name, None)
+
+    def remove(self, sid: str, hold_until: Optional[float] = None) -> Optional[str]:
+        """
+        Takes `sid` out of the room and returns the name of the player it was seated at, if any. The
+        seat is held for its token until `hold_until`, if given; otherwise anyone may take it. Works
+        on an evicted room too.
+        """
+        self.sync.remove(sid)
+        self.observers.discard(sid)
+        name = self._name_of_sid.pop(sid, None)
+        if name is not None:
+            self.seats[name] = None
+            if hold_until is not None:
+                self._held_until[name] = hold_until
+        return name
+
+    def player_for_sid(self, sid: str) -> Optional[Player]:
+        """The player seated at `sid`, or None for observers and strangers."""
+        name = self._name_of_sid.get(sid)
+        return self._players[name] if name is not None else None
+
+    def sid_for(self, player: Player) -> Optional[str]:
+        return self.seats.get(player.name)
+
+    def start_round(self) -> None:
+        """Starts the first round of the game, or the next one."""
+        entry = start_entry()
+        apply_entry(self.game, entry)
+        self._journal(entry)
+
+    def submit(self, player: Player, choice) -> bool:
+        """`GameLogic.submit`, journaled."""
+        result = self.game.submit(player, choice)
+        self._journal(submit_entry(player.name, choice))
+        return result
+
+    def _journal(self, entry: dict) -> None:
+        if self.store is not None:
+            self.store.record(self.room_id, self.game, entry)
+
+    def publish_state(self) -> int:
+        """
+        Publishes the game's public view and each player's private part as the room's latest
+        state; the player picking a Whim also gets the options. Returns the state version.
+        """
+        public, private = self.serializer.serialize_views()
+        decision = self.game.pending_decision()
+        if decision is not None and decision.phase == Phase.WHIM_DRAFT:
+            name = decision.player.name
+            draft = {'pick_num': decision.number, 'options': [card_ref(c) for c in decision.options]}
+            private[name] = dict(private[name], draft=draft)
+        return self.sync.publish(public, private)
+
+
+class RoomManager:
+    """
+    The rooms of one server process, keyed by room id, with caps on the number of rooms and
+    on the observers per room. Rooms are created on first join and dropped when their last
+    socket leaves, or once the seats of their last players stop being held for them.
+
+    A seated player who disconnects keeps the seat for `reconnect_grace` seconds; with the
+    default of 0 the seat is free at once, but its token still reclaims it while nobody
+    else has taken it.
+
+    With a `store`, the games of rooms idle for `idle_ttl` seconds, and of the least recently
+    used rooms beyond `max_resident`, are evicted to it. `on_reload(seconds)` is called with
+    the time each evicted game took to load back. With `journal` (the default) the rooms also
+    journal every move to the store and reopen the games stored there; without it the store
+    holds evicted games only.
+    """
+
+    def __init__(self, max_rooms: int = 500, players_per_room: int = 2, max_observers_per_room: int = 8,
+                 log_level: LogLevel = LogLevel.DEBUG, reconnect_grace: float = 0.0,
+                 store: Optional[GameStore] = None, idle_ttl: Optional[float] = None,
+                 max_resident: Optional[int] = None, on_reload: Optional[Callable[[float], None]] = None,
+                 journal: bool = True):
+        self.max_rooms = max_rooms
+        self.store = store
+        self.journal = journal
+        self.idle_ttl = idle_ttl
+        self.max_resident = max_resident
+        self.on_reload = on_reload
+        self._resident: "OrderedDict[str, Room]" = OrderedDict()  # Rooms with their game loaded, least recently used first
+        self._next_sweep = 0.0
+        self.evictions = 0
+        self.reloads = 0
+        self.players_per_room = players_per_room
+        self.max_observers_per_room = max_observers_per_room
+        self.log_level = log_level
+        self.reconnect_grace = reconnect_grace
+        self.rooms: Dict[str, Room] = {}
+        self._room_of_sid: Dict[str, str] = {}
+        self._seat_of_token: Dict[str, Tuple[str, str]] = {}  # Reconnect token -> (room id, player name)
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    @property
+    def resident_count(self) -> int:
+        return len(self._resident)
+
+    @property
+    def evicted_count(self) -> int:
+        return len(self.rooms) - len(self._resident)
+
+    def join(self, room_id: str, sid: str, token: Optional[str] = None,
+             version: Optional[int] = None) -> Tuple[Room, Optional[Player]]:
+        """
+        Puts `sid` in room `room_id`, creating the room if needed, and returns the room and the
+        player seated for `sid` (None for an observer). A seat's reconnect `token` (from `Room.tokens`) in
+        this room takes that seat back, and `version`, the last state version the socket saw
+        there, lets its next state message be a delta. Raises RoomError if the room id is
+        invalid, the process hosts `max_rooms` rooms already, the room has no space left or its
+        stored game cannot be loaded.
+        """
+        if not ROOM_ID_PATTERN.match(room_id or ""):
+            raise RoomError("Room ids are 1-64 letters, digits, '-' or '_'.")
+        if sid in self._room_of_sid:
+            self.leave(sid)
+        room = self.rooms.get(room_id)
+        if room is not None:
+            self.use(room)
+        seat = self._seat_of_token.get(token) if token else None
+        if room is not None and seat is not None and seat[0] == room_id:
+            player = room.reclaim_seat(sid, seat[1])
+            room.sync.add(sid, version, player.name)
+        else:
+            if room is None:
+                if len(self.rooms) >= self.max_rooms:
+                    self.drop_abandoned()
+                if len(self.rooms) >= self.max_rooms:
+                    raise RoomError("The server is hosting as many games as it can. Try again later.")
+                room = self.rooms[room_id] = self._open_room(room_id)
+                self._mark_used(room)
+            player = room.take_seat(sid)
+            if player is None:
+                if len(room.observers) >= self.max_observers_per_room:
+                    raise RoomError(f"Room '{room_id}' is full.")
+                room.observers.add(sid)
+            else:
+                self._issue_token(room, player)
+            room.sync.add(sid, player_name=player.name if player is not None else None)
+        self._room_of_sid[sid] = room_id
+        return room, player
+
+    def _open_room(self, room_id: str) -> Room:
+        """The room for `room_id`: its stored game if there is one, else a new game (stored from now on)."""
+        if self.store is None or not self.journal:
+            return Room(room_id, self.players_per_room, self.log_level)
+        try:
+            game = self.store.load(room_id)
+        except StoreError as e:
+            raise RoomError(f"Room '{room_id}' could not be loaded.") from e
+        if game is not None:
+            return Room(room_id, game=game, store=self.store)
+        room = Room(room_id, self.players_per_room, self.log_level, store=self.store)
+        self.store.create(room_id, room.game)
+        return room
+
+    def _issue_token(self, room: Room, player: Player) -> None:
+        """Gives the seat of `player` a new token; its last holder's token no longer works."""
+        self._seat_of_token.pop(room.tokens.get(player.name), None)
+        token = secrets.token_urlsafe(16)
+        room.tokens[player.name] = token
+        self._seat_of_token[token] = (room.room_id, player.name)
+
+    def leave(self, sid: str) -> Optional[Room]:
+        """Takes `sid` out of its room, dropping the room once empty. Returns the room it was in."""
+        room_id = self._room_of_sid.pop(sid, None)
+        if room_id is None:
+            return None
+        room = self.rooms[room_id]
+        now = time.monotonic()
+        room.remove(sid, hold_until=now + self.reconnect_grace if self.reconnect_grace > 0 else None)
+        if room.is_empty(now):
+            self._drop(room)
+        return room
+
+    def drop_abandoned(self) -> int:
+        """Drops the rooms nobody is in or holds a seat in any more; returns how many."""
+        now = time.monotonic()
+        abandoned = [room for room in self.rooms.values() if room.is_empty(now)]
+        for room in abandoned:
+            self._drop(room)
+        return len(abandoned)
+
+    def _drop(self, room: Room) -> None:
+        del self.rooms[room.room_id]
+        resident = self._resident.pop(room.room_id, None) is not None
+        if self.store is not None:
+            if self.journal and resident:
+                self.store.snapshot(room.room_id, room.game) # Reloads without replaying the journal
+            elif not self.journal and not resident:
+                self.store.delete(room.room_id) # Nothing loads an evicted game once its room is gone
+        for token in room.tokens.values():
+            self._seat_of_token.pop(token, None)
+
+    def room_of(self, sid: str) -> Optional[Room]:
+        """The room `sid` is in, with its game loaded back first if it was evicted."""
+        room_id = self._room_of_sid.get(sid)
+        room = self.rooms.get(room_id) if room_id is not None else None
+        if room is not None:
+            self.use(room)
+        return room
+
+    def use(self, room: Room) -> bool:
+        """
+        Marks `room` as just used, loading its game back if it was evicted and evicting idle
+        rooms now and then. False if the room is no longer hosted here.
+        """
+        if self.rooms.get(room.room_id) is not room:
+            return False
+        if not room.resident:
+            start = time.perf_counter()
+            room.reload(self.store.load(room.room_id))
+            if not self.journal:
+                self.store.delete(room.room_id) # The store holds only the games evicted now
+            self.reloads += 1
+            if self.on_reload is not None:
+                self.on_reload(time.perf_counter() - start)
+        self._mark_used(room)
+        return True
+
+    def _mark_used(self, room: Room) -> None:
+        room.touch()
+        self._resident[room.room_id] = room
+        self._resident.move_to_end(room.room_id)
+        if self.store is None:
+            return
+        if self.max_resident is not None:
+            while len(self._resident) > max(self.max_resident, 1):
+                self._evict(next(iter(self._resident.values())))
+        if self.idle_ttl is not None and room.last_active >= self._next_sweep:
+            self._next_sweep = room.last_active + self.idle_ttl / 4
+            self.evict_idle(room.last_active)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Evicts the games of rooms nobody used for `idle_ttl` seconds (as of `now`); returns how many."""
+        if self.store is None or self.idle_ttl is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        idle = []
+        for room in self._resident.values(): # Least recently used first
+            if now - room.last_active < self.idle_ttl:
+                break
+            idle.append(room)
+        for room in idle:
+            self._evict(room)
+        return len(idle)
+
+    def _evict(self, room: Room) -> None:
+        del self._resident[room.room_id]
+        if self.journal:
+            self.store.snapshot(room.room_id, room.unload())
+        else:
+            self.store.create(room.room_id, room.unload())
+        self.evictions += 1
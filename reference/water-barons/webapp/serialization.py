@@ -0,0 +1,221 @@
+"""JSON-ready views of the game state sent to web clients.
+
+Cards are sent once, in the card catalog (`card_catalog_json`, served at
+/catalog), and state payloads refer to them by their integer card ID (see
+`water_barons.cards.CARD_IDS`).
+
+`serialize_game_state` builds the whole view from scratch. `StateSerializer`
+builds the same view for one game but reuses the parts for players, impact
+tracks and demand segments that have not changed since its last call, as
+reported by the game's `ChangeJournal`.
+
+What one player sees is the public view, which has every player's
+`PRIVATE_PLAYER_FIELDS` taken out, plus their own private part
+(`serialize_game_views`, `StateSerializer.serialize_views`).
+"""
+import functools
+import hashlib
+import json
+from typing import Dict, Optional, Tuple, Union
+
+from water_barons.cards import CARD_IDS, card_definitions
+from water_barons.game_entities import Player, CardType
+from water_barons.game_state import GameState
+
+
+def serialize_card(card): # Add type hint for card later e.g. card: Card
+    if not card:
+        return None
+
+    card_data = {'name': card.name, 'description': card.description, 'cost': card.cost, 'card_type': card.card_type.name}
+
+    if card.card_type == CardType.WHIM: # Check if CardType is imported
+        # Ensure WhimCard specific attributes are accessed safely
+        card_data['trigger_condition'] = getattr(card, 'trigger_condition', '')
+        card_data['pre_round_effect'] = getattr(card, 'pre_round_effect', '')
+        card_data['post_round_fallout'] = getattr(card, 'post_round_fallout', '')
+    elif card.card_type == CardType.FACILITY:
+        card_data['base_output'] = getattr(card, 'base_output', 0)
+        card_data['impact_profile'] = {k.name: v for k,v in getattr(card, 'impact_profile', {}).items()}
+        card_data['tags'] = getattr(card, 'tags', [])
+    elif card.card_type == CardType.DISTRIBUTION:
+        card_data['impact_modifier'] = {
+            key: {k: (v.name if hasattr(v, 'name') else v) for k, v in details.items()}
+            for key, details in (getattr(card, 'impact_modifier', None) or {}).items()
+        }
+        card_data['special_effect'] = getattr(card, 'special_effect', None)
+    elif card.card_type == CardType.UPGRADE:
+        card_data['effect_description'] = getattr(card, 'effect_description', '')
+        card_data['type'] = getattr(card, 'type', '')
+    elif card.card_type == CardType.GLOBAL_EVENT:
+        card_data['trigger_track'] = card.trigger_track.name
+        card_data['trigger_threshold'] = card.trigger_threshold
+        card_data['effect_description'] = card.effect_description
+
+    return card_data
+
+
+def card_ref(card) -> Union[int, dict, None]:
+    """A card as state payloads carry it: its catalog ID, or the whole card if it has none (e.g. made up in a test)."""
+    if card is None:
+        return None
+    return card.card_id if card.card_id is not None else serialize_card(card)
+
+
+@functools.lru_cache(maxsize=1)
+def card_catalog_json() -> Tuple[bytes, str]:
+    """The card catalog as JSON bytes, {"cards": [{"id": ..., "name": ..., ...}, ...]}, and its content hash for an ETag."""
+    catalog = {'cards': [dict(serialize_card(card), id=card.card_id) for card in card_definitions()]}
+    body = json.dumps(catalog, sort_keys=True, separators=(',', ':')).encode()
+    return body, hashlib.sha256(body).hexdigest()
+
+
+def serialize_water_batch(batch) -> dict:
+    facility_id = CARD_IDS.get((CardType.FACILITY, batch['facility_name']))
+    if facility_id is not None: # The catalog has the facility's impact profile and tags
+        return {'facility_id': facility_id, 'quantity': batch['quantity']}
+    return {
+        'facility_name': batch['facility_name'],
+        'quantity': batch['quantity'],
+        'base_impact_profile': {k.name: v for k,v in batch['base_impact_profile'].items()},
+        'facility_tags': batch['facility_tags']
+    }
+
+def serialize_player(player: Player) -> dict:
+    return {
+        'name': player.name,
+        'cred_coin': player.cred_coin,
+        'reputation_stars': player.reputation_stars,
+        'total_water_produced': player.get_total_water_produced(),
+        'water_batches': [serialize_water_batch(wb) for wb in player.water_batches],
+        'facilities': [card_ref(f) for f in player.facilities],
+        'distribution_routes': [card_ref(r) for r in player.distribution_routes],
+        'r_and_d': [card_ref(tech) for tech in player.r_and_d],
+        'futures_tokens': [str(ft) for ft in player.futures_tokens], # str() is a placeholder
+        'event_options': [str(eo) for eo in player.event_options], # str() is a placeholder
+        'impact_storage': {k.name: v for k,v in player.impact_storage.items()},
+    }
+
+
+# Fields of a serialized player that only that player is shown
+PRIVATE_PLAYER_FIELDS = ('water_batches', 'futures_tokens')
+
+
+def split_player(fragment: dict) -> Tuple[dict, dict]:
+    """The public and private parts of a `serialize_player` result."""
+    public = {key: value for key, value in fragment.items() if key not in PRIVATE_PLAYER_FIELDS}
+    return public, {key: fragment[key] for key in PRIVATE_PLAYER_FIELDS}
+
+
+def serialize_impact_tracks(gs: GameState) -> dict:
+    return {
+        track_color.name: {
+            'name': track.name,
+            'level': track.level,
+            'max_level': track.max_level
+        } for track_color, track in gs.impact_tracks.items()
+    }
+
+
+def serialize_demand_segments(gs: GameState) -> dict:
+    return {
+        name: {
+            'name': seg.name,
+            'current_demand': seg.current_demand,
+            'current_price': seg.current_price,
+            'values_description': seg.values_description
+        } for name, seg in gs.demand_segments.items()
+    }
+
+
+def _assemble_game_state(gs: GameState, players: list, impact_tracks: dict, demand_segments: dict) -> dict:
+    return {
+        'round_number': gs.round_number,
+        'phase': gs.phase.name,
+        'current_player_name': gs.get_current_player().name if gs.players and gs.current_player_index < len(gs.players) else "N/A",
+        'current_player_index': gs.current_player_index,
+        'players': players,
+        'impact_tracks': impact_tracks,
+        'demand_segments': demand_segments,
+        'crowd_deck_size': len(gs.crowd_deck),
+        'whim_discard_pile_top': card_ref(gs.whim_discard_pile[-1]) if gs.whim_discard_pile else None,
+        'active_global_events': [card_ref(e) for e in gs.global_event_tiles_active],
+        'log': gs.game_log[-20:], # Last 20 log entries
+        'uninhaitable': gs.uninhaitable,
+        'card_catalog': card_catalog_json()[1], # ETag of the catalog the card IDs refer to
+    }
+
+
+def serialize_game_state(gs: GameState) -> dict:
+    if not gs:
+        return {}
+    return _assemble_game_state(gs, [serialize_player(p) for p in gs.players],
+                                serialize_impact_tracks(gs), serialize_demand_segments(gs))
+
+
+def serialize_game_views(gs: GameState) -> Tuple[dict, Dict[str, dict]]:
+    """The public view of the game and the private part of each player's view, by player name."""
+    public_players, private = [], {}
+    for player in gs.players:
+        public, private[player.name] = split_player(serialize_player(player))
+        public_players.append(public)
+    return (_assemble_game_state(gs, public_players, serialize_impact_tracks(gs), serialize_demand_segments(gs)),
+            private)
+
+
+class StateSerializer:
+    """
+    `serialize_game_state` for one game, rebuilding only the players, tracks and segments that
+    the game's change journal reports as changed. The rest of the previous result is reused,
+    so callers must treat the returned dicts as read-only.
+    """
+
+    def __init__(self, gs: GameState):
+        self.game_state = gs
+        self.journal = gs.attach_journal()
+        self._players: Dict[str, Tuple[dict, dict, dict]] = {}  # Name -> whole, public and private fragments
+        self._impact_tracks: Optional[dict] = None
+        self._demand_segments: Optional[dict] = None
+
+    def serialize(self) -> dict:
+        players = [fragments[0] for fragments in self._player_fragments()]
+        return _assemble_game_state(self.game_state, players, self._impact_tracks, self._demand_segments)
+
+    def serialize_views(self) -> Tuple[dict, Dict[str, dict]]:
+        """Like `serialize_game_views`. The dict of private parts is new on each call; the parts are not."""
+        fragments = self._player_fragments()
+        public = _assemble_game_state(self.game_state, [f[1] for f in fragments],
+                                      self._impact_tracks, self._demand_segments)
+        return public, {player.name: f[2] for player, f in zip(self.game_state.players, fragments)}
+
+    def _player_fragments(self) -> list:
+        """Brings the cached fragments up to date; returns each player's, in seat order."""
+        gs = self.game_state
+        changes = self.journal.drain()
+        if changes.everything:
+            self._players.clear()
+            self._impact_tracks = self._demand_segments = None
+        else:
+            for name in changes.players:
+                self._players.pop(name, None)
+            if changes.tracks:
+                self._impact_tracks = None
+            if changes.segments:
+                self._demand_segments = None
+
+        players = []
+        for player in gs.players:
+            fragments = self._players.get(player.name)
+            if fragments is None:
+                whole = serialize_player(player)
+                fragments = self._players[player.name] = (whole,) + split_player(whole)
+            players.append(fragments)
+        if self._impact_tracks is None:
+            self._impact_tracks = serialize_impact_tracks(gs)
+        if self._demand_segments is None:
+            self._demand_segments = serialize_demand_segments(gs)
+        return players
+
+    def close(self):
+        """Stops recording changes for this serializer."""
+        self.game_state.detach_journal()
@@ -1,5 +1,17 @@
 document.addEventListener('DOMContentLoaded', (event) => {
-    const socket = io.connect(location.protocol + '//' + document.domain + ':' + location.port);
+    // Open the page with ?room=<id> to play in a room of your own; everyone else lands in the lobby
+    const roomId = new URLSearchParams(location.search).get('room') || 'lobby';
+    // The seat's reconnect token and the latest state version we have are sent on every (re)connect,
+    // so a dropped connection gets its seat back and only the state changes it missed
+    const tokenKey = `water-barons-token:${roomId}`;
+    let stateVersions = new Map(); // Recent state versions, kept until the server stops basing deltas on them (see webapp/sync.py)
+    const socket = io.connect(location.protocol + '//' + document.domain + ':' + location.port, {
+        query: { room: roomId },
+        auth: (send) => send({
+            token: sessionStorage.getItem(tokenKey),
+            version: stateVersions.size > 0 ? Math.max(...stateVersions.keys()) : null,
+        }),
+    });
 
     socket.on('connect', () => {
         console.log('Connected to WebSocket server');
@@ -16,12 +28,93 @@ document.addEventListener('DOMContentLoaded', (event) => {
         // Could update a status area with general messages
     });
 
-    socket.on('game_state_update', (state) => {
-        console.log('Received game state update:', state);
-        updateGameInfo(state);
-        updateImpactTracks(state.impact_tracks);
-        updatePlayerDashboards(state.players); // Assuming 'players' is part of the state
-        updateGameLog(state.log);
+    // Cards arrive once from /catalog; game state refers to them by ID (see webapp/serialization.py)
+    let catalogEtag = null;
+    let catalogLoad = Promise.resolve();
+    const cardsById = new Map();
+
+    function loadCatalog(etag) {
+        if (etag !== catalogEtag) {
+            catalogEtag = etag;
+            catalogLoad = fetch('/catalog')
+                .then(response => response.json())
+                .then(catalog => { catalog.cards.forEach(card => cardsById.set(card.id, card)); });
+        }
+        return catalogLoad;
+    }
+
+    function cardOf(ref) {
+        // Cards without an ID are sent whole
+        return (ref === null || typeof ref === 'object') ? ref : cardsById.get(ref);
+    }
+
+    // The public state is the same for everyone in the room; our own seat's private part
+    // (water batches, draft options, ...) arrives separately in 'private_state'
+    let currentState = null;
+    let privateState = null;
+
+    function showState(version, state) {
+        stateVersions.set(version, state);
+        socket.emit('state_ack', { version: version });
+        currentState = state;
+        render();
+    }
+
+    function render() {
+        const state = currentState;
+        loadCatalog(state.card_catalog).then(() => {
+            const players = (state.players || []).map(player =>
+                (player.name === myPlayerId && privateState) ? { ...player, ...privateState } : player);
+            updateGameInfo(state);
+            updateImpactTracks(state.impact_tracks);
+            updatePlayerDashboards(players);
+            updateGameLog(state.log);
+        });
+    }
+
+    socket.on('private_state', (msg) => {
+        privateState = msg.state;
+        if (currentState) render();
+        catalogLoad.then(() => showDraft(privateState.draft));
+    });
+
+    function applyDelta(state, ops) {
+        for (const [kind, path, ...args] of ops) {
+            if (path.length === 0) {
+                if (kind === 'slide') { state.splice(0, args[0]); state.push(...args[1]); } else { state = args[0]; }
+                continue;
+            }
+            let parent = state;
+            path.slice(0, -1).forEach(key => { parent = parent[key]; });
+            const key = path[path.length - 1];
+            if (kind === 'set') {
+                parent[key] = args[0];
+            } else if (kind === 'del') {
+                delete parent[key];
+            } else if (kind === 'slide') {
+                parent[key].splice(0, args[0]);
+                parent[key].push(...args[1]);
+            }
+        }
+        return state;
+    }
+
+    socket.on('state_snapshot', (msg) => {
+        console.log('Received state snapshot:', msg.version);
+        stateVersions = new Map();
+        showState(msg.version, msg.state);
+    });
+
+    socket.on('state_delta', (msg) => {
+        const base = stateVersions.get(msg.base);
+        if (base === undefined) {
+            socket.emit('state_resync'); // We no longer have the state the delta is based on
+            return;
+        }
+        for (const version of stateVersions.keys()) {
+            if (version < msg.base) stateVersions.delete(version);
+        }
+        showState(msg.version, applyDelta(structuredClone(base), msg.ops));
     });
 
     function updateGameInfo(state) {
@@ -54,9 +147,9 @@ document.addEventListener('DOMContentLoaded', (event) => {
                     <p>CredCoin: ${player.cred_coin}</p>
                     <p>Reputation: ${player.reputation_stars}</p>
                     <p>Total Water: ${player.total_water_produced}</p>
-                    <p>Facilities: ${player.facilities.map(f => f ? `${f.name} (Cost: ${f.cost})` : 'Empty').join('; ')}</p>
-                    <p>Distribution: ${player.distribution_routes.map(r => r ? `${r.name} (Cost: ${r.cost})` : 'Empty').join('; ')}</p>
-                    <p>R&D Techs: ${player.r_and_d && player.r_and_d.length > 0 ? player.r_and_d.map(tech => tech.name).join(', ') : 'None'}</p>
+                    <p>Facilities: ${player.facilities.map(cardOf).map(f => f ? `${f.name} (Cost: ${f.cost})` : 'Empty').join('; ')}</p>
+                    <p>Distribution: ${player.distribution_routes.map(cardOf).map(r => r ? `${r.name} (Cost: ${r.cost})` : 'Empty').join('; ')}</p>
+                    <p>R&D Techs: ${player.r_and_d && player.r_and_d.length > 0 ? player.r_and_d.map(tech => cardOf(tech).name).join(', ') : 'None'}</p>
                     <p>Impact Storage: ${Object.entries(player.impact_storage || {}).filter(([k,v]) => v > 0).map(([k,v]) => `${k}: ${v}`).join(', ') || 'Empty'}</p>
                     <p>Futures Tokens: ${player.futures_tokens && player.futures_tokens.length > 0 ? player.futures_tokens.join(', ') : 'None'}</p>
                     <p>Event Options: ${player.event_options && player.event_options.length > 0 ? player.event_options.join(', ') : 'None'}</p>
@@ -67,7 +160,11 @@ document.addEventListener('DOMContentLoaded', (event) => {
                     batchesUl.innerHTML = '<strong>Water Batches:</strong>';
                     player.water_batches.forEach(batch => {
                         const batchLi = document.createElement('li');
-                        batchLi.textContent = `${batch.quantity} from ${batch.facility_name} (μP: ${batch.base_impact_profile.PINK || 0}, CO₂e: ${batch.base_impact_profile.GREY || 0})`;
+                        // Batches of catalog facilities carry its ID; others carry the facility's name and profile
+                        const facility = batch.facility_id !== undefined ? cardOf(batch.facility_id) : null;
+                        const name = facility ? facility.name : batch.facility_name;
+                        const profile = facility ? facility.impact_profile : batch.base_impact_profile;
+                        batchLi.textContent = `${batch.quantity} from ${name} (μP: ${profile.PINK || 0}, CO₂e: ${profile.GREY || 0})`;
                         batchesUl.appendChild(batchLi);
                     });
                     playerDiv.appendChild(batchesUl);
@@ -97,9 +194,10 @@ document.addEventListener('DOMContentLoaded', (event) => {
     socket.on('assign_player_id', (data) => {
         myPlayerId = data.playerId;
         myPlayerIndex = data.playerIndex;
-        console.log(`Assigned Player ID: ${myPlayerId}, Index: ${myPlayerIndex}`);
+        sessionStorage.setItem(tokenKey, data.reconnectToken);
+        console.log(`Assigned Player ID: ${myPlayerId}, Index: ${myPlayerIndex}, Room: ${data.roomId}`);
         // Update UI to show who "you" are, if needed
-        document.getElementById('actions').prepend(document.createTextNode(`You are: ${myPlayerId} (P${myPlayerIndex+1}) `));
+        document.getElementById('actions').prepend(document.createTextNode(`You are: ${myPlayerId} (P${myPlayerIndex+1}) in room ${data.roomId} `));
     });
 
     // Example of sending an action (to be expanded in next step)
@@ -134,14 +232,14 @@ document.addEventListener('DOMContentLoaded', (event) => {
         });
     }
 
-    socket.on('whim_draft_options', (data) => {
-        console.log('Received whim_draft_options:', data);
-        if (data.player_name === myPlayerId) {
-            whimDrafterNameSpan.textContent = data.player_name;
-            whimPickNumberSpan.textContent = data.pick_num;
+    function showDraft(draft) {
+        // Our private state has the options while it is our pick
+        if (draft) {
+            whimDrafterNameSpan.textContent = myPlayerId;
+            whimPickNumberSpan.textContent = draft.pick_num;
             whimOptionsList.innerHTML = ''; // Clear previous options
 
-            data.options.forEach((card, index) => {
+            draft.options.map(cardOf).forEach((card, index) => {
                 const listItem = document.createElement('li');
                 listItem.innerHTML = `
                     <input type="radio" name="whim_choice" value="${index}" id="whim_opt_${index}">
@@ -177,7 +275,7 @@ document.addEventListener('DOMContentLoaded', (event) => {
         } else {
             whimDraftArea.style.display = 'none'; // Hide if not this player's turn
         }
-    });
+    }
 
     if (submitWhimChoiceBtn) {
         submitWhimChoiceBtn.addEventListener('click', () => {
@@ -0,0 +1,264 @@
+"""Versioned state sync for the web app: full snapshots and deltas.
+
+Every change to a room's serialized game state gets a new version number.
+A client is sent a full snapshot when it joins or asks for a resync:
+
+    'state_snapshot'  {'version': v, 'state': {...}}
+
+and afterwards only what changed since the last version it acknowledged:
+
+    'state_delta'     {'version': v, 'base': acked_version, 'ops': [...]}
+
+Clients acknowledge each version they apply with 'state_ack' {'version': v}.
+A delta is applied to the client's copy of the `base` state; a client that
+no longer has that state sends 'state_resync' and gets a snapshot instead.
+
+Snapshots and deltas carry the public part of the state, the same for every
+socket in the room, so each is built and JSON-encoded once per version (see
+`SharedPayload`) however many sockets it goes to. A seated player's private
+part (their water batches, the draft options they are picking from, ...) is
+small and sent whole to that player's socket whenever it changes:
+
+    'private_state'   {'version': v, 'state': {...}}
+
+The ops of a delta, applied in order, are
+    ['set', path, value]           replace the value at `path`
+    ['del', path]                  remove the dict key at `path`
+    ['slide', path, drop, items]   drop `drop` items from the front of the
+                                   list at `path` and append `items`
+where a path is a list of dict keys and list indices. 'slide' keeps the
+rolling log window cheap: a new log line costs one line, not twenty.
+"""
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Versions kept per room to diff against; clients further behind get a snapshot.
+HISTORY_SIZE = 16
+
+
+def diff_states(old: Any, new: Any, path: Optional[list] = None, ops: Optional[list] = None) -> list:
+    """The ops that turn the JSON-like value `old` into `new`."""
+    path = [] if path is None else path
+    ops = [] if ops is None else ops
+    if old is new or old == new: # Reused fragments (see StateSerializer) are the same objects
+        return ops
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            if key not in old:
+                ops.append(['set', path + [key], value])
+            else:
+                diff_states(old[key], value, path + [key], ops)
+        for key in old:
+            if key not in new:
+                ops.append(['del', path + [key]])
+    elif isinstance(old, list) and isinstance(new, list):
+        _diff_lists(old, new, path, ops)
+    else:
+        ops.append(['set', path, new])
+    return ops
+
+
+def _diff_lists(old: list, new: list, path: list, ops: list) -> None:
+    if len(old) == len(new):
+        changed = [i for i in range(len(new)) if old[i] is not new[i] and old[i] != new[i]]
+        if len(changed) < len(new):
+            for i in changed:
+                diff_states(old[i], new[i], path + [i], ops)
+            return
+    # Every item differs or the length changed: look for a window that slid forward
+    for drop in range(len(old)):
+        kept = len(old) - drop
+        if kept <= len(new) and old[drop:] == new[:kept]:
+            ops.append(['slide', path, drop, new[kept:]])
+            return
+    ops.append(['set', path, new])
+
+
+def apply_delta(state: Any, ops: list) -> Any:
+    """Applies `ops` (from `diff_states`) to `state` in place and returns the result."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if not path:
+            if kind == 'set':
+                state = op[2]
+            elif kind == 'slide':
+                del state[:op[2]]
+                state.extend(op[3])
+            else:
+                raise ValueError(f"'{kind}' needs a path.")
+            continue
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        if kind == 'set':
+            parent[path[-1]] = op[2]
+        elif kind == 'del':
+            del parent[path[-1]]
+        elif kind == 'slide':
+            window = parent[path[-1]]
+            del window[:op[2]]
+            window.extend(op[3])
+        else:
+            raise ValueError(f"Unknown delta op '{kind}'.")
+    return state
+
+
+class SharedPayload(dict):
+    """A message payload sent as is to many sockets. Its JSON is encoded once, by `PacketJSON`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._encoded: Optional[str] = None
+
+    def encoded(self) -> str:
+        if self._encoded is None:
+            self._encoded = json.dumps(self, separators=(',', ':'))
+        return self._encoded
+
+
+class PacketJSON:
+    """
+    The JSON module for the Socket.IO server: like `json`, but the cached encoding of each
+    `SharedPayload` argument of a packet is spliced in rather than encoded again.
+    """
+
+    @staticmethod
+    def dumps(obj, **kwargs) -> str:
+        if isinstance(obj, list) and any(isinstance(item, SharedPayload) for item in obj):
+            return '[' + ','.join(item.encoded() if isinstance(item, SharedPayload) else json.dumps(item, **kwargs)
+                                  for item in obj) + ']'
+        return json.dumps(obj, **kwargs)
+
+    @staticmethod
+    def loads(text, **kwargs):
+        return json.loads(text, **kwargs)
+
+
+class StateSync:
+    """
+    The recent versions of one room's public state, the private parts of its players' views
+    and what each client has been sent. `publish` records a new state; `messages` says what
+    to send to whom.
+    """
+
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self.history_size = history_size
+        self.version = 0
+        self.history: "OrderedDict[int, dict]" = OrderedDict()  # version -> public state, oldest first
+        self.acked: Dict[str, Optional[int]] = {}  # sid -> acknowledged version, None before a snapshot
+        self.private: Dict[str, dict] = {}  # Player name -> private part of their current view
+        self._viewer: Dict[str, str] = {}  # sid -> player name whose private part it is sent
+        self._private_sent: Dict[str, dict] = {}  # sid -> private part it was sent last
+        self._payloads: Dict[Optional[int], SharedPayload] = {}  # Base version (None: snapshot) -> payload for the current version
+
+    @property
+    def state(self) -> Optional[dict]:
+        return self.history[self.version] if self.history else None
+
+    def publish(self, state: dict, private: Optional[Dict[str, dict]] = None) -> int:
+        """
+        Records `state` as the room's current public state (a new version if it changed) and
+        `private`, if given, as the private parts of the players' views. Returns the version.
+        """
+        if private is not None:
+            self.private = private
+        if self.history and self.history[self.version] == state:
+            return self.version
+        self.version += 1
+        self.history[self.version] = state
+        self._payloads = {}
+        while len(self.history) > self.history_size:
+            self.history.popitem(last=False)
+        return self.version
+
+    def add(self, sid: str, version: Optional[int] = None, player_name: Optional[str] = None) -> None:
+        """
+        Registers a client, seated at player `player_name` if given. Its next message is a delta if
+        it still has `version` of this room's state (say, from before a reconnect) and that version
+        is in the history, else a snapshot; its private part is sent again either way.
+        """
+        self.acked[sid] = version if version in self.history else None
+        self._private_sent.pop(sid, None)
+        if player_name is not None:
+            self._viewer[sid] = player_name
+        else:
+            self._viewer.pop(sid, None)
+
+    def resync(self, sid: str) -> None:
+        """Sends a registered client everything again: a snapshot and its private part."""
+        if sid in self.acked:
+            self.acked[sid] = None
+            self._private_sent.pop(sid, None)
+
+    def reset(self) -> None:
+        """
+        Forgets every state but keeps counting versions from the current one, so each client is
+        sent a snapshot and its private part after the next `publish`.
+        """
+        self.history.clear()
+        self._payloads = {}
+        self.private = {}
+        self._private_sent.clear()
+        for sid in self.acked:
+            self.acked[sid] = None
+
+    def remove(self, sid: str) -> None:
+        self.acked.pop(sid, None)
+        self._viewer.pop(sid, None)
+        self._private_sent.pop(sid, None)
+
+    def ack(self, sid: str, version: int) -> bool:
+        """Records that `sid` applied `version`. Unknown clients and versions are ignored."""
+        if sid not in self.acked or version not in self.history:
+            return False
+        current = self.acked[sid]
+        if current is None or version > current:
+            self.acked[sid] = version
+        return True
+
+    def snapshot(self) -> dict:
+        return {'version': self.version, 'state': self.state}
+
+    def _payload(self, base: Optional[int]) -> SharedPayload:
+        payload = self._payloads.get(base)
+        if payload is None:
+            if base is None:
+                payload = SharedPayload(self.snapshot())
+            else:
+                ops = diff_states(self.history[base], self.state)
+                payload = SharedPayload(version=self.version, base=base, ops=ops)
+            self._payloads[base] = payload
+        return payload
+
+    def messages(self, sids: Optional[List[str]] = None) -> List[Tuple[List[str], str, dict]]:
+        """
+        (sids, event, payload) for every client in `sids` (default: all registered) that is behind
+        the current version, then a 'private_state' message for each seated client whose private
+        part changed. Clients acknowledging the same version share one payload, and that payload
+        is reused until the next version.
+        """
+        if not self.history:
+            return []
+        sids = list(self.acked) if sids is None else sids
+        by_base: Dict[Optional[int], List[str]] = {}
+        for sid in sids:
+            base = self.acked.get(sid)
+            if base == self.version:
+                continue
+            if base not in self.history:
+                base = None
+            by_base.setdefault(base, []).append(sid)
+        result = []
+        for base, group in by_base.items():
+            event = 'state_snapshot' if base is None else 'state_delta'
+            result.append((group, event, self._payload(base)))
+        for sid in sids:
+            name = self._viewer.get(sid)
+            if name is None or sid not in self.acked:
+                continue
+            part = self.private.get(name)
+            if part is not None and self._private_sent.get(sid) != part:
+                self._private_sent[sid] = part
+                result.append(([sid], 'private_state', {'version': self.version, 'state': part}))
+        return result
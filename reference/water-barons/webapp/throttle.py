@@ -0,0 +1,79 @@
+"""Flow control for the web app: coalesced room broadcasts and per-socket rate limits.
+
+A burst of decisions in a room (an Ops action, the automatic sales it leads
+to, the next player's quick pass, ...) should reach the room's sockets as one
+state update, not one per decision. `BroadcastCoalescer` holds a room's
+broadcast back for a short window and sends whatever the state is by then.
+
+`RateLimiter` is a token bucket per socket: a client may send `rate` events a
+second on average, with bursts of up to `burst`. Events over the limit are
+dropped before their handler runs, so one chatty client cannot keep the server
+busy at the expense of everyone else's rooms.
+"""
+import time
+from typing import Callable, Dict, Hashable, List, Set
+
+
+class BroadcastCoalescer:
+    """
+    Calls `flush(key)` once per `window` seconds at most for each key asked for with `request`.
+    `spawn(fn, *args)` runs `fn` in the background and `sleep(seconds)` pauses it (in the
+    web app, `socketio.start_background_task` and `socketio.sleep`). A window of 0 flushes
+    at once, in the caller.
+    """
+
+    def __init__(self, window: float, flush: Callable[[Hashable], None],
+                 spawn: Callable[..., object], sleep: Callable[[float], None]):
+        self.window = window
+        self._flush = flush
+        self._spawn = spawn
+        self._sleep = sleep
+        self._pending: Set[Hashable] = set()
+        self.requested = 0  # Broadcasts asked for
+        self.flushed = 0  # Broadcasts sent
+
+    def request(self, key: Hashable) -> None:
+        self.requested += 1
+        if self.window <= 0:
+            self.flushed += 1
+            self._flush(key)
+            return
+        if key in self._pending:
+            return # The flush already on its way sends this change too
+        self._pending.add(key)
+        self._spawn(self._flush_after_window, key)
+
+    def _flush_after_window(self, key: Hashable) -> None:
+        self._sleep(self.window)
+        self._pending.discard(key)
+        self.flushed += 1
+        self._flush(key)
+
+
+class RateLimiter:
+    """A token bucket per client id: `rate` events a second on average, bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._buckets: Dict[str, List[float]] = {}  # Client id -> [tokens left, time of last refill]
+        self.dropped = 0
+
+    def allow(self, client_id: str) -> bool:
+        """Takes a token for one event from `client_id`; False if it has none left."""
+        now = self._clock()
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = self._buckets[client_id] = [float(self.burst), now]
+        else:
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] < 1.0:
+            self.dropped += 1
+            return False
+        bucket[0] -= 1.0
+        return True
+
+    def forget(self, client_id: str) -> None:
+        self._buckets.pop(client_id, None)